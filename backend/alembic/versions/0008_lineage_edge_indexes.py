@@ -0,0 +1,38 @@
+"""index lineage_edge endpoints for recursive traversal
+
+Revision ID: 0008_lineage_edge_indexes
+Revises: 0007_classification_and_glossary_links
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0008_lineage_edge_indexes"
+down_revision = "0007_classification_and_glossary_links"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Partial on Postgres: traversal only ever follows live edges
+    op.create_index(
+        "ix_lineage_edge_src",
+        "lineage_edge",
+        ["src_asset_id", "dst_asset_id"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.create_index(
+        "ix_lineage_edge_dst",
+        "lineage_edge",
+        ["dst_asset_id", "src_asset_id"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lineage_edge_dst", table_name="lineage_edge")
+    op.drop_index("ix_lineage_edge_src", table_name="lineage_edge")
@@ -0,0 +1,33 @@
+"""add lineage_closure table for impact analysis
+
+Revision ID: 0009_lineage_closure
+Revises: 0008_lineage_edge_indexes
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0009_lineage_closure"
+down_revision = "0008_lineage_edge_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "lineage_closure",
+        sa.Column("ancestor_id", sa.Integer(), sa.ForeignKey("asset.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("descendant_id", sa.Integer(), sa.ForeignKey("asset.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("min_distance", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_lineage_closure_descendant", "lineage_closure", ["descendant_id", "ancestor_id"])
+    # Existing edges are backfilled out of band: python -m backend.lineage_closure rebuild
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lineage_closure_descendant", table_name="lineage_closure")
+    op.drop_table("lineage_closure")
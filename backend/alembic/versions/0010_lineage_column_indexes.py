@@ -0,0 +1,39 @@
+"""index column-level lineage edges
+
+Revision ID: 0010_lineage_column_indexes
+Revises: 0009_lineage_closure
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0010_lineage_column_indexes"
+down_revision = "0009_lineage_closure"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # "Where does this column come from" probes (dst_asset_id, dst_column); the src side serves
+    # downstream walks. Table-level edges (dst_column IS NULL) are left out on Postgres.
+    op.create_index(
+        "ix_lineage_edge_dst_column",
+        "lineage_edge",
+        ["dst_asset_id", "dst_column"],
+        postgresql_where=sa.text("deleted_at IS NULL AND dst_column IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_lineage_edge_src_column",
+        "lineage_edge",
+        ["src_asset_id", "src_column"],
+        postgresql_where=sa.text("deleted_at IS NULL AND src_column IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lineage_edge_src_column", table_name="lineage_edge")
+    op.drop_index("ix_lineage_edge_dst_column", table_name="lineage_edge")
@@ -0,0 +1,24 @@
+"""index asset.updated_at for name index versioning
+
+Revision ID: 0011_asset_updated_at_index
+Revises: 0010_lineage_column_indexes
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0011_asset_updated_at_index"
+down_revision = "0010_lineage_column_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_asset_updated_at", "asset", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_asset_updated_at", table_name="asset")
@@ -0,0 +1,40 @@
+"""unique natural keys for assets and columns
+
+Revision ID: 0012_asset_column_natural_keys
+Revises: 0011_asset_updated_at_index
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0012_asset_column_natural_keys"
+down_revision = "0011_asset_updated_at_index"
+branch_labels = None
+depends_on = None
+
+
+def _check_no_duplicates(table: str, parent: str) -> None:
+    dup = op.get_bind().execute(
+        sa.text(f'SELECT {parent}, name FROM "{table}" GROUP BY {parent}, name HAVING count(*) > 1 LIMIT 1')
+    ).fetchone()
+    if dup:
+        raise RuntimeError(
+            f"{table} has duplicate ({parent}, name) rows, e.g. {tuple(dup)}; merge or rename them before upgrading"
+        )
+
+
+def upgrade() -> None:
+    # Worker ingestion upserts on these keys (INSERT ... ON CONFLICT)
+    _check_no_duplicates("asset", "system_id")
+    _check_no_duplicates("column", "asset_id")
+    op.create_unique_constraint("uq_asset_system_name", "asset", ["system_id", "name"])
+    op.create_unique_constraint("uq_column_asset_name", "column", ["asset_id", "name"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_column_asset_name", "column", type_="unique")
+    op.drop_constraint("uq_asset_system_name", "asset", type_="unique")
@@ -0,0 +1,29 @@
+"""track the last scan that listed each asset and column
+
+Revision ID: 0013_scan_seen_at
+Revises: 0012_asset_column_natural_keys
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0013_scan_seen_at"
+down_revision = "0012_asset_column_natural_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # NULL means never listed by a scan (created through the API, or vanished before this
+    # migration); scans only tombstone rows they listed before
+    op.add_column("asset", sa.Column("seen_at", sa.DateTime(), nullable=True))
+    op.add_column("column", sa.Column("seen_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("column", "seen_at")
+    op.drop_column("asset", "seen_at")
@@ -0,0 +1,25 @@
+"""scan_job.last_seen_query_id for keyset-paginated harvests
+
+Revision ID: 0014_scan_job_query_watermark
+Revises: 0013_scan_seen_at
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0014_scan_job_query_watermark"
+down_revision = "0013_scan_seen_at"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("scan_job", sa.Column("last_seen_query_id", sa.String(length=128), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("scan_job", "last_seen_query_id")
@@ -0,0 +1,36 @@
+"""query_parse: parse-once cache for harvested SQL, keyed by normalized statement fingerprint
+
+Revision ID: 0015_query_parse_cache
+Revises: 0014_scan_job_query_watermark
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0015_query_parse_cache"
+down_revision = "0014_scan_job_query_watermark"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "query_parse",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("fingerprint", sa.String(length=64), nullable=False),
+        sa.Column("sample_sql", sa.Text(), nullable=True),
+        sa.Column("parsed", sa.JSON().with_variant(postgresql.JSONB(), "postgresql"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("fingerprint", name="uq_query_parse_fingerprint"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("query_parse")
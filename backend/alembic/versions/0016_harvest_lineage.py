@@ -0,0 +1,27 @@
+"""lineage_edge.query_fingerprint and query_parse.lineage_at for harvest-derived lineage
+
+Revision ID: 0016_harvest_lineage
+Revises: 0015_query_parse_cache
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0016_harvest_lineage"
+down_revision = "0015_query_parse_cache"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("lineage_edge", sa.Column("query_fingerprint", sa.String(length=64), nullable=True))
+    op.add_column("query_parse", sa.Column("lineage_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("query_parse", "lineage_at")
+    op.drop_column("lineage_edge", "query_fingerprint")
@@ -0,0 +1,34 @@
+"""scan_artifact_chunk: compressed item chunks behind scan_artifact manifests
+
+Revision ID: 0017_scan_artifact_chunks
+Revises: 0016_harvest_lineage
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0017_scan_artifact_chunks"
+down_revision = "0016_harvest_lineage"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "scan_artifact_chunk",
+        sa.Column("artifact_id", sa.Integer(), sa.ForeignKey("scan_artifact.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("seq", sa.Integer(), primary_key=True),
+        sa.Column("item_count", sa.Integer(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        # Chunks are already compressed: store out of line without another pglz pass
+        op.execute("ALTER TABLE scan_artifact_chunk ALTER COLUMN data SET STORAGE EXTERNAL")
+
+
+def downgrade() -> None:
+    op.drop_table("scan_artifact_chunk")
@@ -0,0 +1,28 @@
+"""Indexes for scan history retention and per-source job listing
+
+Revision ID: 0018_scan_history_retention
+Revises: 0017_scan_artifact_chunks
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0018_scan_history_retention"
+down_revision = "0017_scan_artifact_chunks"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_scan_artifact_source_created", "scan_artifact", ["source", "created_at"])
+    op.create_index("ix_scan_job_source_id", "scan_job", ["source", "id"])
+    op.create_index("ix_scan_job_source_updated", "scan_job", ["source", "updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_scan_job_source_updated", table_name="scan_job")
+    op.drop_index("ix_scan_job_source_id", table_name="scan_job")
+    op.drop_index("ix_scan_artifact_source_created", table_name="scan_artifact")
@@ -0,0 +1,59 @@
+"""asset_visibility_role / system_visibility_role: normalized visibility for indexed filtering
+
+Revision ID: 0019_visibility_roles
+Revises: 0018_scan_history_retention
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0019_visibility_roles"
+down_revision = "0018_scan_history_retention"
+branch_labels = None
+depends_on = None
+
+_SPLIT = re.compile(r"[\s,]+")
+
+
+def _create(table: str, parent: str) -> None:
+    op.create_table(
+        table,
+        sa.Column(f"{parent}_id", sa.Integer(), sa.ForeignKey(f"{parent}.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("role", sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint(f"{parent}_id", "role"),
+    )
+    op.create_index(f"ix_{table}_role", table, ["role", f"{parent}_id"])
+
+
+def _backfill(table: str, parent: str) -> None:
+    # Same parsing as backend.visibility.parse_roles: spaces or commas, case-insensitive
+    bind = op.get_bind()
+    link = sa.table(table, sa.column(f"{parent}_id"), sa.column("role"))
+    rows = []
+    for obj_id, vis in bind.execute(sa.text(f"SELECT id, visibility FROM {parent} WHERE visibility IS NOT NULL")):
+        rows.extend({f"{parent}_id": obj_id, "role": r} for r in sorted({r for r in _SPLIT.split(vis.lower()) if r}))
+        if len(rows) >= 5000:
+            op.bulk_insert(link, rows)
+            rows = []
+    if rows:
+        op.bulk_insert(link, rows)
+
+
+def upgrade() -> None:
+    _create("system_visibility_role", "system")
+    _create("asset_visibility_role", "asset")
+    _backfill("system_visibility_role", "system")
+    _backfill("asset_visibility_role", "asset")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_asset_visibility_role_role", table_name="asset_visibility_role")
+    op.drop_table("asset_visibility_role")
+    op.drop_index("ix_system_visibility_role_role", table_name="system_visibility_role")
+    op.drop_table("system_visibility_role")
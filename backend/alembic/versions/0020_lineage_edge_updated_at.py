@@ -0,0 +1,24 @@
+"""lineage_edge.updated_at index: version probe for the lineage graph cache
+
+Revision ID: 0020_lineage_edge_updated_at
+Revises: 0019_visibility_roles
+Create Date: 2026-10-17
+
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0020_lineage_edge_updated_at"
+down_revision = "0019_visibility_roles"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_lineage_edge_updated_at", "lineage_edge", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lineage_edge_updated_at", table_name="lineage_edge")
@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Deque, Iterable, Iterator
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from .models import Asset, LineageEdge
+from .visibility import is_visible
+from .visibility_cache import IdBitmap
+
+
+def _ttl_seconds() -> float:
+    # Out-of-process writers (Celery workers, manual SQL) cannot notify this process, so after
+    # this many seconds the next request probes the tables and rebuilds if they changed.
+    try:
+        return float(os.getenv("LINEAGE_CACHE_TTL_SECONDS", "60"))
+    except ValueError:
+        return 60.0
+
+
+def _max_age_seconds() -> float:
+    # Raw SQL that leaves updated_at alone (or hard-deletes rows) does not move the probe;
+    # rebuild regardless after this
+    try:
+        return float(os.getenv("LINEAGE_CACHE_MAX_AGE_SECONDS", "3600"))
+    except ValueError:
+        return 3600.0
+
+
+def _max_patch() -> int:
+    # Commits touching more rows than this drop the graph instead of copying it per change
+    try:
+        return max(0, int(os.getenv("LINEAGE_CACHE_MAX_PATCH", "1000")))
+    except ValueError:
+        return 1000
+
+
+def _stamp(db: Session) -> tuple:
+    """
+    Version probe: (max(id), max(updated_at)) of lineage_edge and asset, four index-only
+    lookups. Moves on inserts, ORM updates (updated_at onupdate) and worker tombstones (which
+    set updated_at). ORM hard deletes drop the graph through the hooks below; other hard
+    deletes are picked up after LINEAGE_CACHE_MAX_AGE_SECONDS.
+    """
+    stamp: tuple = ()
+    for model in (LineageEdge, Asset):
+        stamp += tuple(db.execute(select(func.max(model.id), func.max(model.updated_at))).one())
+    return stamp
+
+
+class GraphSnapshot:
+    """
+    Immutable view of live table-level lineage (dst_column IS NULL) at one point in time.
+
+    - out_adj/in_adj map asset id -> array('q') of neighbour ids (one entry per live edge)
+    - ids is the sorted array('q') of live asset ids; vis holds, per id, an index into
+      vis_values (the distinct `visibility` strings), so a node costs 12 bytes. Names and
+      systems are read from the database by describe(), for the few nodes a response lists.
+    Patches build a new snapshot; readers keep using the one they started with. Only
+    built_at (the last successful probe) changes in place.
+    """
+
+    __slots__ = ("out_adj", "in_adj", "ids", "vis", "vis_values", "bind_key", "stamp", "built_at")
+
+    def __init__(
+        self,
+        out_adj: dict[int, array],
+        in_adj: dict[int, array],
+        ids: array,
+        vis: array,
+        vis_values: list[str | None],
+        bind_key: str,
+        stamp: tuple,
+        built_at: float,
+    ) -> None:
+        self.out_adj = out_adj
+        self.in_adj = in_adj
+        self.ids = ids
+        self.vis = vis
+        self.vis_values = vis_values
+        self.bind_key = bind_key
+        self.stamp = stamp
+        self.built_at = built_at
+
+    @classmethod
+    def build(cls, db: Session, bind_key: str, stamp: tuple) -> GraphSnapshot:
+        ids = array("q")
+        vis = array("I")
+        codes: dict[str | None, int] = {None: 0}
+        for aid, visibility in (
+            db.query(Asset.id, Asset.visibility)
+            .filter(Asset.deleted_at.is_(None))
+            .order_by(Asset.id)
+            .yield_per(10000)
+        ):
+            ids.append(aid)
+            vis.append(codes.setdefault(visibility, len(codes)))
+        out_adj: dict[int, array] = {}
+        in_adj: dict[int, array] = {}
+        for src, dst in (
+            db.query(LineageEdge.src_asset_id, LineageEdge.dst_asset_id)
+            .filter(LineageEdge.deleted_at.is_(None), LineageEdge.dst_column.is_(None))
+            .order_by(LineageEdge.id)
+            .yield_per(10000)
+        ):
+            out_adj.setdefault(src, array("q")).append(dst)
+            in_adj.setdefault(dst, array("q")).append(src)
+        return cls(out_adj, in_adj, ids, vis, list(codes), bind_key, stamp, time.monotonic())
+
+    def patched(self, edges: list[tuple[int, int]], assets: list[tuple[int, str | None, bool]]) -> GraphSnapshot:
+        """Copy with `edges` added and `assets` (id, visibility, deleted) applied."""
+        out_adj, in_adj = self.out_adj, self.in_adj
+        if edges:
+            out_adj, in_adj = dict(out_adj), dict(in_adj)
+            for src, dst in edges:
+                out_adj[src] = out_adj.get(src, array("q")) + array("q", [dst])
+                in_adj[dst] = in_adj.get(dst, array("q")) + array("q", [src])
+        ids, vis, vis_values = self.ids, self.vis, self.vis_values
+        if assets:
+            ids, vis, vis_values = array("q", ids), array("I", vis), list(vis_values)
+            codes = {v: n for n, v in enumerate(vis_values)}
+            for asset_id, visibility, deleted in assets:
+                j = bisect_left(ids, asset_id)
+                present = j < len(ids) and ids[j] == asset_id
+                if deleted:
+                    if present:
+                        del ids[j]
+                        del vis[j]
+                    continue
+                code = codes.get(visibility)
+                if code is None:
+                    code = codes[visibility] = len(vis_values)
+                    vis_values.append(visibility)
+                if present:
+                    vis[j] = code
+                else:
+                    # New assets usually carry the highest id: an append
+                    ids.insert(j, asset_id)
+                    vis.insert(j, code)
+        return GraphSnapshot(out_adj, in_adj, ids, vis, vis_values, self.bind_key, self.stamp, self.built_at)
+
+    # -- queries ---------------------------------------------------------------------------
+
+    def _slot(self, asset_id: int) -> int:
+        j = bisect_left(self.ids, asset_id)
+        return j if j < len(self.ids) and self.ids[j] == asset_id else -1
+
+    def visible(self, asset_id: int, roles: list[str] | None, allowed: IdBitmap | None = None) -> bool:
+        """
+        Mirror of `visibility.visibility_clause` evaluated against cached nodes, or against the
+        role set's bitmap of visible ids (visibility_cache) when one is given.
+        """
+        j = self._slot(asset_id)
+        if j < 0:
+            return False
+        if allowed is not None:
+            return asset_id in allowed
+        return not roles or is_visible(self.vis_values[self.vis[j]], roles)
+
+    def iter_edges(self, roles: list[str] | None, allowed: IdBitmap | None = None) -> Iterator[tuple[int, int]]:
+        for src in sorted(self.out_adj):
+            if not self.visible(src, roles, allowed):
+                continue
+            for dst in self.out_adj[src]:
+                if self.visible(dst, roles, allowed):
+                    yield (src, dst)
+
+    def bfs(
+        self, asset_id: int, depth: int, roles: list[str] | None, allowed: IdBitmap | None = None
+    ) -> tuple[dict[int, int], set[tuple[int, int]]]:
+        """Undirected BFS from `asset_id` up to `depth` hops over visible nodes only."""
+        visited: dict[int, int] = {asset_id: 0}
+        pairs: set[tuple[int, int]] = set()
+        if not self.visible(asset_id, roles, allowed):
+            return {}, pairs
+        q: Deque[int] = deque([asset_id])
+        empty = array("q")
+        while q:
+            node = q.popleft()
+            dist = visited[node]
+            if dist >= depth:
+                continue
+            for nbr in self.out_adj.get(node, empty):
+                if not self.visible(nbr, roles, allowed):
+                    continue
+                pairs.add((node, nbr))
+                if nbr not in visited:
+                    visited[nbr] = dist + 1
+                    q.append(nbr)
+            for nbr in self.in_adj.get(node, empty):
+                if not self.visible(nbr, roles, allowed):
+                    continue
+                pairs.add((nbr, node))
+                if nbr not in visited:
+                    visited[nbr] = dist + 1
+                    q.append(nbr)
+        return visited, pairs
+
+    def describe(self, db: Session, ids: Iterable[int]) -> list[dict]:
+        ids = list(ids)
+        found: dict[int, tuple[str, int]] = {}
+        for i in range(0, len(ids), 500):
+            for aid, name, system_id in db.query(Asset.id, Asset.name, Asset.system_id).filter(
+                Asset.id.in_(ids[i : i + 500]), Asset.deleted_at.is_(None)
+            ):
+                found[aid] = (name, system_id)
+        out = []
+        for i in ids:
+            node = found.get(i)
+            out.append({"id": i, "name": node[0] if node else str(i), "system_id": node[1] if node else None})
+        return out
+
+
+class LineageGraphCache:
+    """
+    Process-wide cache of the current GraphSnapshot.
+
+    Built lazily on first use, outside the lock: requests keep reading the previous snapshot
+    while one thread rebuilds, and the new one is swapped in unless a commit invalidated the
+    graph meanwhile. Inserts and asset changes committed through the ORM swap in a patched
+    copy; anything harder to patch drops the graph. After LINEAGE_CACHE_TTL_SECONDS the next
+    request compares the tables' version probe (_stamp) with the snapshot's and rebuilds only
+    if it moved.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._graph: GraphSnapshot | None = None
+        self._generation = 0
+
+    # -- lifecycle -------------------------------------------------------------------------
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._graph = None
+            self._generation += 1
+
+    def ensure(self, db: Session) -> GraphSnapshot:
+        bind_key = str(getattr(db.get_bind(), "url", ""))
+        graph = self._graph
+        if graph is not None and graph.bind_key == bind_key:
+            ttl = _ttl_seconds()
+            now = time.monotonic()
+            if ttl <= 0 or now - graph.built_at < ttl:
+                return graph
+            max_age = _max_age_seconds()
+            if (max_age <= 0 or now - graph.built_at < max_age) and _stamp(db) == graph.stamp:
+                graph.built_at = now
+                return graph
+            # Stale: one thread rebuilds while the others keep serving this snapshot
+            if not self._build_lock.acquire(blocking=False):
+                return graph
+        else:
+            self._build_lock.acquire()
+        try:
+            with self._lock:
+                current, generation = self._graph, self._generation
+            if current is not None and current is not graph and current.bind_key == bind_key:
+                return current  # rebuilt by another thread while we waited
+            fresh = GraphSnapshot.build(db, bind_key, _stamp(db))
+            with self._lock:
+                if self._generation == generation:
+                    self._graph = fresh
+            return fresh
+        finally:
+            self._build_lock.release()
+
+    # -- patching --------------------------------------------------------------------------
+
+    def apply(self, edges: list[tuple[int, int]], assets: list[tuple[int, str | None, bool]]) -> None:
+        with self._lock:
+            # A build in progress may have read the tables before this commit: not stored
+            self._generation += 1
+            if self._graph is None:
+                return
+            if len(edges) + len(assets) > _max_patch():
+                self._graph = None
+            else:
+                self._graph = self._graph.patched(edges, assets)
+
+
+lineage_cache = LineageGraphCache()
+
+
+def invalidate() -> None:
+    lineage_cache.invalidate()
+
+
+# ORM hooks: collect changes during flush, apply them only once the transaction commits so
+# readers never observe uncommitted edges.
+
+_PENDING_KEY = "lineage_cache_pending"
+
+
+def _pending(session: Session) -> list:
+    return session.info.setdefault(_PENDING_KEY, [])
+
+
+def _session_of(target) -> Session | None:
+    from sqlalchemy.orm import object_session
+
+    return object_session(target)
+
+
+@event.listens_for(LineageEdge, "after_insert")
+def _edge_inserted(mapper, connection, target: LineageEdge) -> None:
+    s = _session_of(target)
+    if s is None or target.deleted_at is not None or target.dst_column is not None:
+        return
+    _pending(s).append(("edge", target.src_asset_id, target.dst_asset_id))
+
+
+@event.listens_for(LineageEdge, "after_update")
+@event.listens_for(LineageEdge, "after_delete")
+def _edge_changed(mapper, connection, target: LineageEdge) -> None:
+    s = _session_of(target)
+    if s is not None:
+        _pending(s).append(("invalidate",))
+
+
+@event.listens_for(Asset, "after_insert")
+@event.listens_for(Asset, "after_update")
+def _asset_changed(mapper, connection, target: Asset) -> None:
+    s = _session_of(target)
+    if s is None:
+        return
+    _pending(s).append(("asset", target.id, target.visibility, target.deleted_at is not None))
+
+
+@event.listens_for(Asset, "after_delete")
+def _asset_deleted(mapper, connection, target: Asset) -> None:
+    s = _session_of(target)
+    if s is not None:
+        # Hard deletes cascade to edges in the database; rebuild rather than chase them
+        _pending(s).append(("invalidate",))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    changes = session.info.pop(_PENDING_KEY, None)
+    if not changes:
+        return
+    if any(change[0] == "invalidate" for change in changes):
+        lineage_cache.invalidate()
+        return
+    lineage_cache.apply(
+        [change[1:] for change in changes if change[0] == "edge"],
+        [change[1:] for change in changes if change[0] == "asset"],
+    )
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,299 @@
+"""
+Maintenance of the `lineage_closure` table (ancestor, descendant, min_distance).
+
+The closure covers live table-level lineage edges (deleted_at IS NULL, dst_column IS NULL)
+between live assets: a path never runs through a soft-deleted asset. Edge inserts extend the
+closure with one set-based upsert; edge removals and asset soft-deletes recompute only the
+pairs that could have routed through the removed edge or asset.
+
+Visibility is not part of the closure (it is shared by every user): readers filter the
+endpoints, but a visible pair may be connected only through assets the reader cannot see.
+
+ORM writes are picked up automatically through a session `after_flush` hook. Raw-SQL writers
+call `add_edges` / `remove_edges` / `remove_assets` / `restore_assets` on their connection.
+Backfill with:
+
+    python -m backend.lineage_closure rebuild
+"""
+from __future__ import annotations
+
+import argparse
+from typing import Iterable
+
+from sqlalchemy import delete, event, func, inspect, literal, select, true, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .models import Asset, LineageClosure, LineageEdge
+
+_closure = LineageClosure.__table__
+_edge = LineageEdge.__table__
+_asset = Asset.__table__
+
+_CHUNK = 1000
+
+
+def _live_edges(*where):
+    """Live table-level edges whose endpoints are both live assets."""
+    src, dst = _asset.alias("src_asset"), _asset.alias("dst_asset")
+    return (
+        select(_edge.c.src_asset_id, _edge.c.dst_asset_id)
+        .join(src, src.c.id == _edge.c.src_asset_id)
+        .join(dst, dst.c.id == _edge.c.dst_asset_id)
+        .where(
+            _edge.c.deleted_at.is_(None),
+            _edge.c.dst_column.is_(None),
+            src.c.deleted_at.is_(None),
+            dst.c.deleted_at.is_(None),
+            *where,
+        )
+    )
+
+
+def _live_assets(conn: Connection, ids: set[int]) -> set[int]:
+    out: set[int] = set()
+    ids_list = sorted(ids)
+    for i in range(0, len(ids_list), _CHUNK):
+        chunk = ids_list[i : i + _CHUNK]
+        out.update(
+            r[0] for r in conn.execute(select(_asset.c.id).where(_asset.c.id.in_(chunk), _asset.c.deleted_at.is_(None)))
+        )
+    return out
+
+
+def _upsert_min(conn: Connection, sel) -> None:
+    """INSERT ... SELECT into the closure, keeping the smaller distance on conflict."""
+    cols = ["ancestor_id", "descendant_id", "min_distance"]
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+        least = func.least
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+        least = func.min
+    stmt = dialect_insert(_closure).from_select(cols, sel)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["ancestor_id", "descendant_id"],
+        set_={"min_distance": least(_closure.c.min_distance, stmt.excluded.min_distance)},
+    )
+    conn.execute(stmt)
+
+
+def add_edges(conn: Connection, pairs: Iterable[tuple[int, int]]) -> None:
+    """Extend the closure for newly live edges u -> v (already written to lineage_edge)."""
+    pairs = [(u, v) for u, v in pairs if u != v]
+    live = _live_assets(conn, {n for pair in pairs for n in pair})
+    for u, v in pairs:
+        if u not in live or v not in live:
+            continue
+        ups = union_all(
+            select(_closure.c.ancestor_id.label("node"), _closure.c.min_distance.label("dist")).where(
+                _closure.c.descendant_id == u
+            ),
+            select(literal(u).label("node"), literal(0).label("dist")),
+        ).subquery("ups")
+        downs = union_all(
+            select(_closure.c.descendant_id.label("node"), _closure.c.min_distance.label("dist")).where(
+                _closure.c.ancestor_id == v
+            ),
+            select(literal(v).label("node"), literal(0).label("dist")),
+        ).subquery("downs")
+        sel = (
+            select(ups.c.node, downs.c.node, ups.c.dist + downs.c.dist + 1)
+            .select_from(ups.join(downs, true()))
+            # WHERE also disambiguates INSERT ... SELECT ... ON CONFLICT on SQLite
+            .where(ups.c.node != downs.c.node)
+        )
+        _upsert_min(conn, sel)
+
+
+def _descendants(conn: Connection, roots: set[int]) -> dict[int, dict[int, int]]:
+    """Level-synchronous BFS over live edges (between live assets) from every root; returns root -> {node: dist}."""
+    dist: dict[int, dict[int, int]] = {r: {} for r in roots}
+    frontier: dict[int, set[int]] = {r: {r} for r in roots}
+    level = 0
+    while frontier:
+        level += 1
+        wanted = sorted(set().union(*frontier.values()))
+        adj: dict[int, list[int]] = {}
+        for i in range(0, len(wanted), _CHUNK):
+            chunk = wanted[i : i + _CHUNK]
+            for src, dst in conn.execute(_live_edges(_edge.c.src_asset_id.in_(chunk))):
+                adj.setdefault(src, []).append(dst)
+        nxt: dict[int, set[int]] = {}
+        for r, nodes in frontier.items():
+            seen = dist[r]
+            step = set()
+            for n in nodes:
+                for m in adj.get(n, ()):
+                    if m != r and m not in seen:
+                        seen[m] = level
+                        step.add(m)
+            if step:
+                nxt[r] = step
+        frontier = nxt
+    return dist
+
+
+def _insert_rows(conn: Connection, rows: list[dict]) -> None:
+    for i in range(0, len(rows), 10000):
+        conn.execute(_closure.insert(), rows[i : i + 10000])
+
+
+def _recompute(conn: Connection, ancestors: set[int], descendants: set[int]) -> None:
+    """Drop every (ancestor, descendant) pair of the two sets, then re-derive those still connected."""
+    a_list, d_list = sorted(ancestors), sorted(descendants)
+    for i in range(0, len(a_list), _CHUNK):
+        for j in range(0, len(d_list), _CHUNK):
+            conn.execute(
+                delete(_closure).where(
+                    _closure.c.ancestor_id.in_(a_list[i : i + _CHUNK]),
+                    _closure.c.descendant_id.in_(d_list[j : j + _CHUNK]),
+                )
+            )
+    rows = [
+        {"ancestor_id": a, "descendant_id": d, "min_distance": dd}
+        for a, reach in _descendants(conn, ancestors).items()
+        for d, dd in reach.items()
+        if d in descendants
+    ]
+    _insert_rows(conn, rows)
+
+
+def _ancestors_of(conn: Connection, node: int) -> set[int]:
+    return {node} | {r[0] for r in conn.execute(select(_closure.c.ancestor_id).where(_closure.c.descendant_id == node))}
+
+
+def _descendants_of(conn: Connection, node: int) -> set[int]:
+    return {node} | {r[0] for r in conn.execute(select(_closure.c.descendant_id).where(_closure.c.ancestor_id == node))}
+
+
+def remove_edges(conn: Connection, pairs: Iterable[tuple[int, int]]) -> None:
+    """Recompute closure pairs that may have depended on edges u -> v that are no longer live."""
+    for u, v in pairs:
+        if u == v:
+            continue
+        _recompute(conn, _ancestors_of(conn, u), _descendants_of(conn, v))
+
+
+def remove_assets(conn: Connection, asset_ids: Iterable[int]) -> None:
+    """Recompute closure pairs that may have routed through assets that were just soft-deleted."""
+    for x in sorted(set(asset_ids)):
+        ancestors, descendants = _ancestors_of(conn, x), _descendants_of(conn, x)
+        if len(ancestors) > 1 or len(descendants) > 1:
+            _recompute(conn, ancestors, descendants)
+
+
+def restore_assets(conn: Connection, asset_ids: Iterable[int]) -> None:
+    """Extend the closure with the live edges of assets that were just revived."""
+    ids = sorted(set(asset_ids))
+    pairs: set[tuple[int, int]] = set()
+    for i in range(0, len(ids), _CHUNK):
+        chunk = ids[i : i + _CHUNK]
+        for cond in (_edge.c.src_asset_id.in_(chunk), _edge.c.dst_asset_id.in_(chunk)):
+            pairs.update(tuple(r) for r in conn.execute(_live_edges(cond)))
+    add_edges(conn, sorted(pairs))
+
+
+def rebuild(conn: Connection) -> int:
+    """Recompute the whole closure from live edges between live assets. Returns the number of rows written."""
+    out_adj: dict[int, list[int]] = {}
+    for src, dst in conn.execute(_live_edges()):
+        out_adj.setdefault(src, []).append(dst)
+    conn.execute(delete(_closure))
+    written = 0
+    rows: list[dict] = []
+    for root in out_adj:
+        seen: dict[int, int] = {}
+        frontier = [root]
+        level = 0
+        while frontier:
+            level += 1
+            nxt = []
+            for n in frontier:
+                for m in out_adj.get(n, ()):
+                    if m != root and m not in seen:
+                        seen[m] = level
+                        nxt.append(m)
+            frontier = nxt
+        rows.extend({"ancestor_id": root, "descendant_id": d, "min_distance": dd} for d, dd in seen.items())
+        if len(rows) >= 10000:
+            _insert_rows(conn, rows)
+            written += len(rows)
+            rows = []
+    _insert_rows(conn, rows)
+    return written + len(rows)
+
+
+# ORM hook: keep the closure in the same transaction as the edge writes
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_closure(session: Session, flush_context) -> None:
+    added: list[tuple[int, int]] = []
+    removed: list[tuple[int, int]] = []
+    for obj in session.new:
+        if isinstance(obj, LineageEdge) and obj.deleted_at is None and obj.dst_column is None:
+            added.append((obj.src_asset_id, obj.dst_asset_id))
+    for obj in session.dirty:
+        if not isinstance(obj, LineageEdge) or obj.dst_column is not None:
+            continue
+        state = inspect(obj)
+        deleted_hist = state.attrs.deleted_at.history
+        src_hist = state.attrs.src_asset_id.history
+        dst_hist = state.attrs.dst_asset_id.history
+        if not (deleted_hist.has_changes() or src_hist.has_changes() or dst_hist.has_changes()):
+            continue
+        # An expired deleted_at has no recorded prior value, so assume the edge was live.
+        # Recomputing around an edge that was not live wastes work but stays correct.
+        was_live = not deleted_hist.deleted or deleted_hist.deleted[0] is None
+        old_pair = ((src_hist.deleted or [obj.src_asset_id])[0], (dst_hist.deleted or [obj.dst_asset_id])[0])
+        if was_live:
+            removed.append(old_pair)
+        if obj.deleted_at is None:
+            added.append((obj.src_asset_id, obj.dst_asset_id))
+    for obj in session.deleted:
+        if isinstance(obj, LineageEdge) and obj.dst_column is None:
+            removed.append((obj.src_asset_id, obj.dst_asset_id))
+    # Soft-deleted / revived assets take their paths out of / back into the closure
+    dead_assets: list[int] = []
+    revived_assets: list[int] = []
+    for obj in session.dirty:
+        if not isinstance(obj, Asset):
+            continue
+        hist = inspect(obj).attrs.deleted_at.history
+        if not hist.has_changes():
+            continue
+        was_live = not hist.deleted or hist.deleted[0] is None
+        if was_live and obj.deleted_at is not None:
+            dead_assets.append(obj.id)
+        elif not was_live and obj.deleted_at is None:
+            revived_assets.append(obj.id)
+    if not added and not removed and not dead_assets and not revived_assets:
+        return
+    conn = session.connection()
+    if removed:
+        remove_edges(conn, removed)
+    if dead_assets:
+        remove_assets(conn, dead_assets)
+    if added:
+        add_edges(conn, added)
+    if revived_assets:
+        restore_assets(conn, revived_assets)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m backend.lineage_closure")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args(argv)
+    from .db import engine
+
+    if args.command == "rebuild":
+        with engine.begin() as conn:
+            n = rebuild(conn)
+        print(f"lineage_closure rebuilt: {n} rows")
+
+
+if __name__ == "__main__":
+    main()
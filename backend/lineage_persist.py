@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Iterable, Optional
+
+from sqlalchemy import event, func, tuple_
+from sqlalchemy.orm import Session, object_session
+
+from .models import Asset, LineageEdge
+from .sql_lineage import ParsedLineage
+
+# (src_asset_id, src_column, dst_asset_id, dst_column); columns are None for table-level edges
+EdgeKey = tuple[int, Optional[str], int, Optional[str]]
+
+Candidate = tuple[int, int, bool]  # (asset_id, system_id, is_exact)
+
+
+def _buckets_max() -> int:
+    try:
+        return max(0, int(os.getenv("ASSET_NAME_BUCKETS_MAX", "100000")))
+    except ValueError:
+        return 100000
+
+
+class AssetNameIndex:
+    """
+    Exact-name and tail-name lookup of live assets, newest first.
+    Strategy: try exact match first; if not found, fall back to last identifier segment.
+    Prefer the most recently created assets to avoid picking stale fixtures from other systems.
+    """
+
+    def __init__(self, rows: Iterable[tuple[int, str, int]]) -> None:
+        # rows: (id, name, system_id) ordered by id desc
+        self.by_name: dict[str, list[tuple[int, int]]] = {}
+        self.by_tail: dict[str, list[tuple[int, int]]] = {}
+        self._buckets: dict[str, dict[tuple[int | None, bool], list[tuple[int, int]]]] = {}
+        self._buckets_lock = threading.Lock()
+        for aid, name, system_id in rows:
+            self.by_name.setdefault(name, []).append((aid, system_id))
+            self.by_tail.setdefault(name.split(".")[-1], []).append((aid, system_id))
+
+    @classmethod
+    def load(cls, db: Session) -> AssetNameIndex:
+        return cls(
+            db.query(Asset.id, Asset.name, Asset.system_id)
+            .filter(Asset.deleted_at.is_(None))
+            .order_by(Asset.id.desc())
+            .yield_per(10000)
+        )
+
+    @classmethod
+    def current(cls, db: Session) -> AssetNameIndex:
+        """
+        Process-wide index, reloaded only when the asset table changed. The version probe is
+        max(updated_at), max(id) (two index-only lookups) plus a counter bumped by commits that
+        hard-delete assets through this process's ORM, since those move neither maximum.
+        ASSET_NAME_INDEX_TTL_SECONDS bounds staleness from other writes the probe misses: rows
+        committed with an older updated_at than the current maximum, and hard deletes made
+        elsewhere. The index is loaded outside the lock: while one thread reloads, the others
+        keep resolving against the previous index.
+        """
+        version = tuple(db.query(func.max(Asset.updated_at), func.max(Asset.id)).one()) + (_hard_deletes,)
+        bind_key = str(getattr(db.get_bind(), "url", ""))
+        try:
+            ttl = float(os.getenv("ASSET_NAME_INDEX_TTL_SECONDS", "300"))
+        except ValueError:
+            ttl = 300.0
+        global _current
+        with _current_lock:
+            cached = _current
+        if (
+            cached is not None
+            and cached[0] == bind_key
+            and cached[1] == version
+            and (ttl <= 0 or time.monotonic() - cached[2] < ttl)
+        ):
+            return cached[3]
+        stale = cached is not None and cached[0] == bind_key
+        # One reload at a time; with an index for this database to fall back on, don't queue up
+        if not _load_lock.acquire(blocking=not stale):
+            return cached[3]  # type: ignore[index]
+        try:
+            with _current_lock:
+                if _current is not cached and _current is not None and _current[0] == bind_key:
+                    return _current[3]  # reloaded by another thread while we waited
+            index = cls.load(db)
+            with _current_lock:
+                _current = (bind_key, version, time.monotonic(), index)
+            return index
+        finally:
+            _load_lock.release()
+
+    def candidates(self, name: str) -> list[Candidate]:
+        cands: list[Candidate] = [(aid, sid, True) for aid, sid in self.by_name.get(name, [])]
+        exact = {c[0] for c in cands}
+        for aid, sid in self.by_tail.get(name.split(".")[-1], []):
+            if aid not in exact:
+                cands.append((aid, sid, False))
+        return cands
+
+    def buckets(self, name: str) -> dict[tuple[int | None, bool], list[tuple[int, int]]]:
+        """
+        Candidates of `name` reduced to the two newest per (system_id, is_exact) and per
+        (None, is_exact), as (asset_id, position in candidates()). Memoized per name, for at
+        most ASSET_NAME_BUCKETS_MAX names (default 100000, oldest dropped first).
+        """
+        found = self._buckets.get(name)
+        if found is not None:
+            return found
+        out: dict[tuple[int | None, bool], list[tuple[int, int]]] = {}
+        # candidates() is newest-first within each exactness class, so the first two win
+        for pos, (aid, sid, exact) in enumerate(self.candidates(name)):
+            for key in ((sid, exact), (None, exact)):
+                lst = out.setdefault(key, [])
+                if len(lst) < 2:
+                    lst.append((aid, pos))
+        limit = _buckets_max()
+        with self._buckets_lock:
+            while self._buckets and len(self._buckets) >= limit:
+                del self._buckets[next(iter(self._buckets))]
+            if limit > 0:
+                self._buckets[name] = out
+        return out
+
+
+_current: tuple[str, tuple, float, AssetNameIndex] | None = None
+_current_lock = threading.Lock()
+_load_lock = threading.Lock()
+_hard_deletes = 0
+
+_DELETED_KEY = "asset_name_index_deleted"
+
+
+@event.listens_for(Asset, "after_delete")
+def _asset_deleted(mapper, connection, target: Asset) -> None:
+    s = object_session(target)
+    if s is not None:
+        s.info[_DELETED_KEY] = True
+
+
+@event.listens_for(Session, "after_bulk_delete")
+def _assets_bulk_deleted(delete_context) -> None:
+    mapper = getattr(delete_context, "mapper", None)
+    if mapper is not None and mapper.class_ is Asset:
+        delete_context.session.info[_DELETED_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _count_hard_deletes(session: Session) -> None:
+    global _hard_deletes
+    if session.info.pop(_DELETED_KEY, False):
+        with _current_lock:
+            _hard_deletes += 1
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_hard_deletes(session: Session, previous_transaction) -> None:
+    session.info.pop(_DELETED_KEY, None)
+
+
+def _best_in_buckets(tb, sb, same_system: bool) -> tuple[int, int] | None:
+    best: tuple[int, int] | None = None
+    best_key: tuple | None = None
+    for (tsys, t_exact), tl in tb.items():
+        if (tsys is None) == same_system:
+            continue
+        for s_exact in (True, False):
+            sl = sb.get((tsys, s_exact))
+            if not sl:
+                continue
+            for tid, tpos in tl:
+                for sid, spos in sl:
+                    if sid == tid:
+                        continue
+                    # Higher score wins; ties go to the earliest (target, source) candidate
+                    key = ((1 if t_exact else 0) + (1 if s_exact else 0), min(sid, tid), -tpos, -spos)
+                    if best_key is None or key > best_key:
+                        best_key = key
+                        best = (sid, tid)
+    return best
+
+
+def resolve_pair(index: AssetNameIndex, source: str, target: str) -> tuple[int, int] | None:
+    """
+    Pick the (src_id, dst_id) asset pair for a source -> target table reference.
+    Prefer same-system pairs; score by exactness then by recency of the pair (min id), falling
+    back to the globally best pair. Only the two newest candidates per system and exactness
+    can win, so the memoized buckets keep the cost independent of how many assets share a name.
+    """
+    tb, sb = index.buckets(target), index.buckets(source)
+    if not tb or not sb:
+        return None
+    return _best_in_buckets(tb, sb, True) or _best_in_buckets(tb, sb, False)
+
+
+def plan_edges(index: AssetNameIndex, parsed: ParsedLineage) -> list[EdgeKey]:
+    """Table edges for every resolvable source -> target pair, plus column edges riding on them."""
+    keys: list[EdgeKey] = []
+    resolved: dict[tuple[str, str], tuple[int, int]] = {}
+    for t in parsed.targets:
+        for s in parsed.sources:
+            pair = resolve_pair(index, s, t)
+            if pair is None:
+                continue
+            resolved[(s, t)] = pair
+            keys.append((pair[0], None, pair[1], None))
+    for c in parsed.columns:
+        pair = resolved.get((c.src_table, c.dst_table))
+        if pair:
+            keys.append((pair[0], c.src_column, pair[1], c.dst_column))
+    return keys
+
+
+def persist_edges(db: Session, keys: Iterable[EdgeKey], confidence: int = 50, predicate: str = "sqlglot") -> set[EdgeKey]:
+    """
+    Add every key without a live edge already, in one flush. Returns the keys created.
+    Existing edges are found with one query per 500 (src, dst) pairs instead of one per key.
+    The caller commits.
+    """
+    wanted = list(dict.fromkeys(keys))
+    if not wanted:
+        return set()
+    pairs = sorted({(k[0], k[2]) for k in wanted})
+    existing: set[EdgeKey] = set()
+    for i in range(0, len(pairs), 500):
+        for row in (
+            db.query(
+                LineageEdge.src_asset_id,
+                LineageEdge.src_column,
+                LineageEdge.dst_asset_id,
+                LineageEdge.dst_column,
+            )
+            .filter(tuple_(LineageEdge.src_asset_id, LineageEdge.dst_asset_id).in_(pairs[i : i + 500]))
+            .filter(LineageEdge.deleted_at.is_(None))
+        ):
+            existing.add(tuple(row))  # type: ignore[arg-type]
+    created = [k for k in wanted if k not in existing]
+    db.add_all(
+        LineageEdge(
+            src_asset_id=src,
+            src_column=src_col,
+            dst_asset_id=dst,
+            dst_column=dst_col,
+            confidence=confidence,
+            predicate=predicate,
+        )
+        for src, src_col, dst, dst_col in created
+    )
+    return set(created)
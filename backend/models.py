@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, LargeBinary, String, Text, UniqueConstraint, text
 try:
     from sqlalchemy.dialects.postgresql import JSONB as PGJSONB
 except Exception:  # pragma: no cover
@@ -32,6 +32,12 @@ class System(Base, TimestampMixin):
 
 class Asset(Base, TimestampMixin):
     __tablename__ = "asset"
+    __table_args__ = (
+        # Natural key for worker ingestion upserts (workers/ingest.py)
+        UniqueConstraint("system_id", "name", name="uq_asset_system_name"),
+        # updated_at: version probe for the in-process asset name index (backend.lineage_persist)
+        Index("ix_asset_updated_at", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     system_id: Mapped[int] = mapped_column(ForeignKey("system.id", ondelete="CASCADE"), nullable=False)
@@ -40,37 +46,96 @@ class Asset(Base, TimestampMixin):
     column_names: Mapped[str | None] = mapped_column(Text)
     # Optional visibility controls
     visibility: Mapped[str | None] = mapped_column(Text)
+    # Start time of the last scan that listed this asset; covering scans tombstone rows listed
+    # by an earlier scan but not by them (workers/ingest.py)
+    seen_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     system: Mapped[System] = relationship("System", back_populates="assets")
     columns: Mapped[list[ColumnModel]] = relationship("ColumnModel", back_populates="asset")
 
 
+class SystemVisibilityRole(Base):
+    """Normalized System.visibility: one row per allowed role (backend/visibility.py)."""
+
+    __tablename__ = "system_visibility_role"
+    __table_args__ = (Index("ix_system_visibility_role_role", "role", "system_id"),)
+
+    system_id: Mapped[int] = mapped_column(ForeignKey("system.id", ondelete="CASCADE"), primary_key=True)
+    role: Mapped[str] = mapped_column(String(255), primary_key=True)
+
+
+class AssetVisibilityRole(Base):
+    """Normalized Asset.visibility: one row per allowed role (backend/visibility.py)."""
+
+    __tablename__ = "asset_visibility_role"
+    __table_args__ = (Index("ix_asset_visibility_role_role", "role", "asset_id"),)
+
+    asset_id: Mapped[int] = mapped_column(ForeignKey("asset.id", ondelete="CASCADE"), primary_key=True)
+    role: Mapped[str] = mapped_column(String(255), primary_key=True)
+
+
 class ColumnModel(Base, TimestampMixin):
     __tablename__ = "column"
+    __table_args__ = (UniqueConstraint("asset_id", "name", name="uq_column_asset_name"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     asset_id: Mapped[int] = mapped_column(ForeignKey("asset.id", ondelete="CASCADE"), nullable=False)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     data_type: Mapped[str | None] = mapped_column(String(128))
     description: Mapped[str | None] = mapped_column(Text)
+    seen_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     asset: Mapped[Asset] = relationship("Asset", back_populates="columns")
 
 
 class LineageEdge(Base, TimestampMixin):
     __tablename__ = "lineage_edge"
+    __table_args__ = (
+        Index("ix_lineage_edge_src", "src_asset_id", "dst_asset_id", postgresql_where=text("deleted_at IS NULL")),
+        Index("ix_lineage_edge_dst", "dst_asset_id", "src_asset_id", postgresql_where=text("deleted_at IS NULL")),
+        Index(
+            "ix_lineage_edge_dst_column",
+            "dst_asset_id",
+            "dst_column",
+            postgresql_where=text("deleted_at IS NULL AND dst_column IS NOT NULL"),
+        ),
+        Index(
+            "ix_lineage_edge_src_column",
+            "src_asset_id",
+            "src_column",
+            postgresql_where=text("deleted_at IS NULL AND src_column IS NOT NULL"),
+        ),
+        # updated_at: version probe for the in-process lineage graph cache (backend.lineage_cache)
+        Index("ix_lineage_edge_updated_at", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    src_asset_id: Mapped[int] = mapped_column(ForeignKey("asset.id", ondelete="CASCADE"), nullable=False)
+    # active_history: closure maintenance needs the previous endpoints when an edge is re-pointed
+    src_asset_id: Mapped[int] = mapped_column(ForeignKey("asset.id", ondelete="CASCADE"), nullable=False, active_history=True)
     src_column: Mapped[str | None] = mapped_column(String(255))
-    dst_asset_id: Mapped[int] = mapped_column(ForeignKey("asset.id", ondelete="CASCADE"), nullable=False)
+    dst_asset_id: Mapped[int] = mapped_column(ForeignKey("asset.id", ondelete="CASCADE"), nullable=False, active_history=True)
     dst_column: Mapped[str | None] = mapped_column(String(255))
     confidence: Mapped[int] = mapped_column(Integer, default=0)
     predicate: Mapped[str | None] = mapped_column(Text)
+    # query_parse.fingerprint of the harvested statement an edge was derived from (workers/lineage_harvest.py)
+    query_fingerprint: Mapped[str | None] = mapped_column(String(64))
+
+
+class LineageClosure(Base):
+    """Transitive closure of live lineage edges; derived data, maintained by backend.lineage_closure."""
+
+    __tablename__ = "lineage_closure"
+    __table_args__ = (Index("ix_lineage_closure_descendant", "descendant_id", "ancestor_id"),)
+
+    ancestor_id: Mapped[int] = mapped_column(ForeignKey("asset.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id: Mapped[int] = mapped_column(ForeignKey("asset.id", ondelete="CASCADE"), primary_key=True)
+    min_distance: Mapped[int] = mapped_column(Integer, nullable=False)
 
 
 class ScanArtifact(Base, TimestampMixin):
     __tablename__ = "scan_artifact"
+    # Retention purges walk (source, created_at) (workers/retention.py)
+    __table_args__ = (Index("ix_scan_artifact_source_created", "source", "created_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     source: Mapped[str] = mapped_column(String(64), nullable=False)
@@ -78,8 +143,40 @@ class ScanArtifact(Base, TimestampMixin):
     payload: Mapped[dict] = mapped_column(JSON().with_variant(PGJSONB, "postgresql") if PGJSONB else JSON, nullable=False)
 
 
+class ScanArtifactChunk(Base):
+    """Compressed NDJSON slice of a scan artifact's items; the artifact payload is the manifest (workers/artifacts.py)."""
+
+    __tablename__ = "scan_artifact_chunk"
+
+    artifact_id: Mapped[int] = mapped_column(ForeignKey("scan_artifact.id", ondelete="CASCADE"), primary_key=True)
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    item_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+
+class QueryParse(Base, TimestampMixin):
+    """Parse-once cache for harvested SQL (connectors/sql_parse.py, workers/parse_cache.py)."""
+
+    __tablename__ = "query_parse"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # sha256 of the dialect and the normalized statement (literals stripped, whitespace collapsed)
+    fingerprint: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    sample_sql: Mapped[str | None] = mapped_column(Text)
+    # {"tables": [...], "targets": [...], "sources": [...]}
+    parsed: Mapped[dict] = mapped_column(JSON().with_variant(PGJSONB, "postgresql") if PGJSONB else JSON, nullable=False)
+    # Set once every source/target of the statement resolved to an asset and its edges exist
+    lineage_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
 class ScanJob(Base, TimestampMixin):
     __tablename__ = "scan_job"
+    __table_args__ = (
+        # GET /ingest/jobs?source=.. newest first
+        Index("ix_scan_job_source_id", "source", "id"),
+        # Retention purges of finished jobs (workers/retention.py)
+        Index("ix_scan_job_source_updated", "source", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     source: Mapped[str] = mapped_column(String(64), nullable=False)
@@ -87,6 +184,8 @@ class ScanJob(Base, TimestampMixin):
     status: Mapped[str] = mapped_column(String(32), default="pending")
     attempts: Mapped[int] = mapped_column(Integer, default=0)
     last_seen_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Tie-breaker for last_seen_at when harvests paginate on (end time, query id)
+    last_seen_query_id: Mapped[str | None] = mapped_column(String(128), nullable=True)
 
 
 class GlossaryTerm(Base, TimestampMixin):
@@ -0,0 +1,153 @@
+"""
+Process-wide cache of the OIDC discovery document and JWKS signing keys.
+
+get_current_user used to fetch the discovery document and the JWKS on every request. Both
+are now cached per issuer:
+
+- the discovery document (its `jwks_uri`) for OIDC_DISCOVERY_TTL_SECONDS (default 3600)
+- the signing keys, by `kid`, for OIDC_JWKS_TTL_SECONDS (default 3600)
+
+Fetches are async (httpx.AsyncClient) so a cold or slow issuer never blocks the event loop,
+and single-flight: every request that needs keys while a fetch is running awaits that same
+fetch, so a burst of requests after a restart costs one discovery and one JWKS round-trip.
+
+Once keys are older than OIDC_JWKS_REFRESH_AHEAD (default 0.8) of their TTL, they are
+refreshed in a background task while requests keep using the current set. A token whose
+`kid` is unknown forces a refresh (key rotation), at most once per
+OIDC_JWKS_MIN_REFRESH_SECONDS (default 30) so random kids cannot hammer the issuer. A failed
+refresh keeps serving the previous keys.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from jwt import PyJWK, PyJWKSet
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def discovery_url(issuer: str) -> str:
+    return issuer.rstrip("/") + "/v2.0/.well-known/openid-configuration"
+
+
+def default_jwks_uri(issuer: str) -> str:
+    # Azure exposes keys at a known path; used when discovery fails or has no jwks_uri
+    return issuer.rstrip("/") + "/discovery/v2.0/keys"
+
+
+def parse_jwks(jwks: Dict[str, Any]) -> Dict[Optional[str], PyJWK]:
+    """Signing keys of a JWKS document by kid; keys of unsupported types are skipped."""
+    keys: Dict[Optional[str], PyJWK] = {}
+    for key in PyJWKSet.from_dict(jwks).keys:
+        if key.public_key_use in (None, "sig"):
+            keys[key.key_id] = key
+    return keys
+
+
+class KeyCache:
+    def __init__(self, issuer: str):
+        self.issuer = issuer
+        self._jwks_uri: Optional[str] = None
+        self._discovery_at = 0.0
+        self._keys: Dict[Optional[str], PyJWK] = {}
+        self._keys_at = 0.0
+        self._forced_at = 0.0
+        self._inflight: Optional[tuple[asyncio.AbstractEventLoop, asyncio.Task]] = None
+        self.fetches = 0
+
+    async def _jwks_uri_for(self, client: httpx.AsyncClient, now: float) -> str:
+        if self._jwks_uri and now - self._discovery_at < _float_env("OIDC_DISCOVERY_TTL_SECONDS", 3600):
+            return self._jwks_uri
+        try:
+            resp = await client.get(discovery_url(self.issuer))
+            resp.raise_for_status()
+            uri = resp.json().get("jwks_uri")
+        except Exception:
+            uri = None
+        if uri:
+            self._jwks_uri, self._discovery_at = uri, now
+            return uri
+        return self._jwks_uri or default_jwks_uri(self.issuer)
+
+    async def _fetch(self) -> bool:
+        now = time.monotonic()
+        try:
+            async with httpx.AsyncClient(timeout=_float_env("OIDC_HTTP_TIMEOUT_SECONDS", 5.0)) as client:
+                resp = await client.get(await self._jwks_uri_for(client, now))
+                resp.raise_for_status()
+                keys = parse_jwks(resp.json())
+        except Exception:
+            return False
+        finally:
+            self.fetches += 1
+        self._keys, self._keys_at = keys, now
+        return True
+
+    def _refresh_task(self) -> asyncio.Task:
+        # Single flight per event loop: callers arriving while a fetch runs share it
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight
+        if inflight is not None and inflight[0] is loop and not inflight[1].done():
+            return inflight[1]
+        task = loop.create_task(self._fetch())
+        self._inflight = (loop, task)
+        return task
+
+    async def refresh(self) -> bool:
+        """Fetch discovery (if stale) and the JWKS. Keeps the current keys on failure."""
+        # shield: a cancelled request must not cancel the fetch other requests are awaiting
+        return await asyncio.shield(self._refresh_task())
+
+    def _lookup(self, kid: Optional[str]) -> Optional[PyJWK]:
+        key = self._keys.get(kid)
+        if key is None and kid is None and len(self._keys) == 1:
+            # Tokens without a kid are accepted when the issuer publishes a single key
+            key = next(iter(self._keys.values()))
+        return key
+
+    async def signing_key(self, kid: Optional[str]) -> Optional[PyJWK]:
+        ttl = _float_env("OIDC_JWKS_TTL_SECONDS", 3600)
+        age = time.monotonic() - self._keys_at
+        fetched = False
+        if not self._keys or age >= ttl:
+            fetched = await self.refresh()
+        elif age >= ttl * _float_env("OIDC_JWKS_REFRESH_AHEAD", 0.8):
+            # Refresh ahead of expiry without making this request wait
+            self._refresh_task()
+        key = self._lookup(kid)
+        if key is None and not fetched:
+            now = time.monotonic()
+            if now - self._forced_at >= _float_env("OIDC_JWKS_MIN_REFRESH_SECONDS", 30):
+                # Unknown kid: the issuer may have rotated its keys since the last fetch
+                self._forced_at = now
+                if await self.refresh():
+                    key = self._lookup(kid)
+        return key
+
+
+_caches: Dict[str, KeyCache] = {}
+_caches_lock = threading.Lock()
+
+
+def key_cache(issuer: str) -> KeyCache:
+    with _caches_lock:
+        cache = _caches.get(issuer)
+        if cache is None:
+            cache = _caches[issuer] = KeyCache(issuer)
+        return cache
+
+
+def clear() -> None:
+    """Forget every issuer's cached discovery document and keys (tests, config reloads)."""
+    with _caches_lock:
+        _caches.clear()
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import List, Optional
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
@@ -10,24 +11,11 @@ from ..models import Asset
 from ..schemas import AssetCreate, AssetOut, AssetUpdate, AssetSearchOut
 from ..security import get_current_user, User, require_writer
 from ..audit import audit_log
+from ..visibility import visibility_clause
 
 router = APIRouter(prefix="/assets", tags=["assets"])
 
 
-def _visibility_clause(model, user: User | None):
-    from ..security import _is_auth_disabled
-    if _is_auth_disabled() or user is None or not getattr(user, "roles", None):
-        return True
-    from sqlalchemy import or_, func, literal
-    roles = [r.lower() for r in user.roles]
-    clauses = [model.visibility.is_(None)]
-    vis_expr = func.lower(literal(' ') + func.coalesce(model.visibility, '') + literal(' '))
-    for r in roles:
-        like = f"% {r} %"
-        clauses.append(vis_expr.like(like))
-    return or_(*clauses)
-
-
 @router.get("/", response_model=List[AssetSearchOut])
 def list_assets(
     q: Optional[str] = Query(None),
@@ -36,7 +24,7 @@ def list_assets(
     db: Session = Depends(get_session),
     user: User | None = Depends(get_current_user),
 ):
-    qry = db.query(Asset).filter(Asset.deleted_at.is_(None)).filter(_visibility_clause(Asset, user))
+    qry = db.query(Asset).filter(Asset.deleted_at.is_(None)).filter(visibility_clause(Asset, user))
     if q:
         # Use Postgres FTS when available; fallback to ILIKE otherwise
         dialect = getattr(db.bind, "dialect", None)
@@ -50,6 +38,7 @@ def list_assets(
                     ),
                 )
                 .filter(Asset.deleted_at.is_(None))
+                .filter(visibility_clause(Asset, user))
                 .filter(text("asset.search_vector @@ plainto_tsquery('simple', unaccent(:q))"))
                 .params(q=q)
             )
@@ -89,17 +78,33 @@ def list_assets(
 
 @router.post("/", response_model=AssetOut, status_code=status.HTTP_201_CREATED)
 def create_asset(payload: AssetCreate, db: Session = Depends(get_session), user: User | None = Depends(require_writer)):
-    obj = Asset(
-        system_id=payload.system_id,
-        name=payload.name,
-        description=payload.description,
-    visibility=payload.visibility,
-    )
-    db.add(obj)
-    db.commit()
+    # (system_id, name) is unique across live and soft-deleted rows (uq_asset_system_name):
+    # a soft-deleted asset is revived under its old id, as a scan rediscovering it would
+    obj = db.query(Asset).filter(Asset.system_id == payload.system_id, Asset.name == payload.name).first()
+    if obj is not None and obj.deleted_at is None:
+        raise HTTPException(status_code=409, detail="Asset name already exists in this system")
+    revived = obj is not None
+    if revived:
+        obj.deleted_at = None
+        obj.description = payload.description
+        obj.visibility = payload.visibility
+    else:
+        obj = Asset(
+            system_id=payload.system_id,
+            name=payload.name,
+            description=payload.description,
+            visibility=payload.visibility,
+        )
+        db.add(obj)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Created concurrently
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Asset name already exists in this system")
     db.refresh(obj)
     try:
-        audit_log("create", "asset", obj.id, user, {"name": obj.name, "system_id": obj.system_id})
+        audit_log("create", "asset", obj.id, user, {"name": obj.name, "system_id": obj.system_id, "revived": revived})
     except Exception:
         pass
     return obj
@@ -110,7 +115,7 @@ def get_asset(asset_id: int, db: Session = Depends(get_session), user: User | No
     obj = (
         db.query(Asset)
         .filter(Asset.id == asset_id, Asset.deleted_at.is_(None))
-        .filter(_visibility_clause(Asset, user))
+        .filter(visibility_clause(Asset, user))
         .first()
     )
     if not obj:
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import List, Optional
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
@@ -10,23 +11,11 @@ from ..models import ColumnModel, Asset
 from ..schemas import ColumnCreate, ColumnOut, ColumnUpdate, ColumnSearchOut
 from ..security import get_current_user, User, require_writer
 from ..audit import audit_log
+from ..visibility import visibility_clause
 
 router = APIRouter(prefix="/columns", tags=["columns"])
 
 
-def _visibility_clause(model, user: User | None):
-    from ..security import _is_auth_disabled
-    if _is_auth_disabled() or user is None or not getattr(user, "roles", None):
-        return True
-    from sqlalchemy import or_, func, literal
-    roles = [r.lower() for r in user.roles]
-    clauses = [model.visibility.is_(None)]
-    vis_expr = func.lower(literal(' ') + func.coalesce(model.visibility, '') + literal(' '))
-    for r in roles:
-        clauses.append(vis_expr.like(f"% {r} %"))
-    return or_(*clauses)
-
-
 @router.get("/", response_model=List[ColumnSearchOut])
 def list_columns(
     q: Optional[str] = Query(None),
@@ -39,7 +28,7 @@ def list_columns(
         db.query(ColumnModel)
         .join(Asset, Asset.id == ColumnModel.asset_id)
         .filter(ColumnModel.deleted_at.is_(None), Asset.deleted_at.is_(None))
-        .filter(_visibility_clause(Asset, user))
+        .filter(visibility_clause(Asset, user))
     )
     if q:
         dialect = getattr(db.bind, "dialect", None)
@@ -53,7 +42,7 @@ def list_columns(
                 )
                 .join(Asset, Asset.id == ColumnModel.asset_id)
                 .filter(ColumnModel.deleted_at.is_(None), Asset.deleted_at.is_(None))
-                .filter(_visibility_clause(Asset, user))
+                .filter(visibility_clause(Asset, user))
                 .filter(text("\"column\".search_vector @@ plainto_tsquery('simple', unaccent(:q))"))
                 .params(q=q)
             )
@@ -86,14 +75,30 @@ def list_columns(
 
 @router.post("/", response_model=ColumnOut, status_code=status.HTTP_201_CREATED)
 def create_column(payload: ColumnCreate, db: Session = Depends(get_session), user: User | None = Depends(require_writer)):
-    obj = ColumnModel(
-        asset_id=payload.asset_id,
-        name=payload.name,
-        data_type=payload.data_type,
-        description=payload.description,
-    )
-    db.add(obj)
-    db.commit()
+    # (asset_id, name) is unique across live and soft-deleted rows (uq_column_asset_name):
+    # a soft-deleted column is revived under its old id, as a scan rediscovering it would
+    obj = db.query(ColumnModel).filter(ColumnModel.asset_id == payload.asset_id, ColumnModel.name == payload.name).first()
+    if obj is not None and obj.deleted_at is None:
+        raise HTTPException(status_code=409, detail="Column name already exists in this asset")
+    revived = obj is not None
+    if revived:
+        obj.deleted_at = None
+        obj.data_type = payload.data_type
+        obj.description = payload.description
+    else:
+        obj = ColumnModel(
+            asset_id=payload.asset_id,
+            name=payload.name,
+            data_type=payload.data_type,
+            description=payload.description,
+        )
+        db.add(obj)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Created concurrently
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Column name already exists in this asset")
     db.refresh(obj)
     # Update asset.column_names cache
     from ..models import Asset
@@ -102,7 +107,7 @@ def create_column(payload: ColumnCreate, db: Session = Depends(get_session), use
     db.query(Asset).filter(Asset.id == obj.asset_id).update({"column_names": names})
     db.commit()
     try:
-        audit_log("create", "column", obj.id, user, {"name": obj.name, "asset_id": obj.asset_id})
+        audit_log("create", "column", obj.id, user, {"name": obj.name, "asset_id": obj.asset_id, "revived": revived})
     except Exception:
         pass
     return obj
@@ -114,7 +119,7 @@ def get_column(column_id: int, db: Session = Depends(get_session), user: User |
         db.query(ColumnModel)
         .join(Asset, Asset.id == ColumnModel.asset_id)
         .filter(ColumnModel.id == column_id, ColumnModel.deleted_at.is_(None), Asset.deleted_at.is_(None))
-        .filter(_visibility_clause(Asset, user))
+        .filter(visibility_clause(Asset, user))
         .first()
     )
     if not obj:
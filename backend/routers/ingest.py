@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from sqlalchemy import func, tuple_
 from sqlalchemy.orm import Session
 
 from ..db import get_session
@@ -11,6 +12,7 @@ from ..security import get_current_user, User, require_writer
 from ..audit import audit_log
 
 import os
+import threading
 from celery import Celery
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
@@ -25,14 +27,50 @@ class IngestResponse(BaseModel):
     status: str
 
 
+_celery_app: Celery | None = None
+_celery_lock = threading.Lock()
+
+
 def _get_celery() -> Celery:
-    broker_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-    app = Celery("cdgc_lite", broker=broker_url, backend=broker_url)
-    # In tests, run tasks eagerly to avoid needing Redis
-    if os.getenv("PYTEST_CURRENT_TEST") or os.getenv("CELERY_EAGER") == "1":
-        app.conf.task_always_eager = True
-        app.conf.task_eager_propagates = True
-    return app
+    """
+    Process-wide producer app, built on first use. Kombu keeps a pool of broker connections
+    (CELERY_BROKER_POOL_LIMIT, default 10) behind it, so requests no longer connect per call.
+    """
+    global _celery_app
+    if _celery_app is not None:
+        return _celery_app
+    with _celery_lock:
+        if _celery_app is None:
+            broker_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+            app = Celery("cdgc_lite", broker=broker_url, backend=broker_url)
+            app.conf.broker_pool_limit = int(os.getenv("CELERY_BROKER_POOL_LIMIT", "10"))
+            # In tests, run tasks eagerly to avoid needing Redis
+            if os.getenv("PYTEST_CURRENT_TEST") or os.getenv("CELERY_EAGER") == "1":
+                app.conf.task_always_eager = True
+                app.conf.task_eager_propagates = True
+            _celery_app = app
+    return _celery_app
+
+
+def _dispatch(db: Session, jobs: list[ScanJob]) -> None:
+    """Enqueue run_scan for each job, publishing through one pooled broker connection."""
+    celery_app = _get_celery()
+    # If eager, invoke task inline to avoid needing Redis in tests/local
+    if celery_app.conf.task_always_eager:
+        from workers.app import run_scan as run_scan_task
+        # Ensure the worker uses the same DB as this request/session (important for tests)
+        try:
+            bind = getattr(db, "bind", None)
+            if bind is not None and getattr(bind, "url", None) is not None:
+                os.environ["DATABASE_URL"] = str(bind.url)
+        except Exception:
+            pass
+        for job in jobs:
+            run_scan_task.apply(args=(job.source, job.id)).get()
+        return
+    with celery_app.producer_or_acquire() as producer:
+        for job in jobs:
+            celery_app.send_task("workers.app.run_scan", args=[job.source, job.id], producer=producer)
 
 
 @router.post("/{source}/scan", response_model=IngestResponse, status_code=status.HTTP_202_ACCEPTED)
@@ -63,20 +101,7 @@ def enqueue_scan(
         db.refresh(job)
 
     # Enqueue Celery task
-    celery_app = _get_celery()
-    # If eager, invoke task inline to avoid needing Redis in tests/local
-    if celery_app.conf.task_always_eager:
-        from workers.app import run_scan as run_scan_task
-        # Ensure the worker uses the same DB as this request/session (important for tests)
-        try:
-            bind = getattr(db, "bind", None)
-            if bind is not None and getattr(bind, "url", None) is not None:
-                os.environ["DATABASE_URL"] = str(bind.url)
-        except Exception:
-            pass
-        run_scan_task.apply(args=(source, job.id)).get()
-    else:
-        celery_app.send_task("workers.app.run_scan", args=[source, job.id])
+    _dispatch(db, [job])
 
     # Audit log enqueue action
     try:
@@ -93,6 +118,95 @@ def enqueue_scan(
     return IngestResponse(job_id=job.id, status="enqueued")
 
 
+class BatchScanItem(BaseModel):
+    source: str
+    idempotency_key: str | None = None
+
+
+class BatchScanRequest(BaseModel):
+    scans: list[BatchScanItem] = Field(..., min_length=1, max_length=1000)
+
+
+class BatchScanResult(IngestResponse):
+    source: str
+    idempotency_key: str | None
+    reused: bool
+
+
+class BatchScanResponse(BaseModel):
+    jobs: list[BatchScanResult]
+
+
+@router.post("/scan/batch", response_model=BatchScanResponse, status_code=status.HTTP_202_ACCEPTED)
+def enqueue_scan_batch(
+    payload: BatchScanRequest,
+    db: Session = Depends(get_session),
+    user: User | None = Depends(require_writer),
+):
+    """
+    Enqueue many scans at once, with the same idempotency rules as POST /ingest/{source}/scan.
+    Existing keys are looked up in one query, new jobs are created in one transaction, and all
+    tasks are published through one broker connection. Repeated (source, key) pairs in the
+    batch map to the same job.
+    """
+    keyed = {(i.source, i.idempotency_key) for i in payload.scans if i.idempotency_key}
+    existing: dict[tuple[str, str], int] = {}
+    if keyed:
+        rows = (
+            db.query(ScanJob.source, ScanJob.idempotency_key, func.max(ScanJob.id))
+            .filter(tuple_(ScanJob.source, ScanJob.idempotency_key).in_(sorted(keyed)))
+            .group_by(ScanJob.source, ScanJob.idempotency_key)
+            .all()
+        )
+        existing = {(src, key): jid for src, key, jid in rows}
+    jobs_by_id = {j.id: j for j in db.query(ScanJob).filter(ScanJob.id.in_(existing.values()))} if existing else {}
+
+    created: dict[tuple[str, str], ScanJob] = {}
+    planned: list[tuple[BatchScanItem, ScanJob, bool]] = []
+    for item in payload.scans:
+        pair = (item.source, item.idempotency_key)
+        if item.idempotency_key and pair in existing:
+            planned.append((item, jobs_by_id[existing[pair]], True))
+            continue
+        if item.idempotency_key and pair in created:
+            planned.append((item, created[pair], True))
+            continue
+        job = ScanJob(source=item.source, idempotency_key=item.idempotency_key, status="pending")
+        db.add(job)
+        if item.idempotency_key:
+            created[pair] = job
+        planned.append((item, job, False))
+    db.commit()
+
+    # One task per distinct job, in request order
+    to_send = list({id(job): job for _, job, _ in planned}.values())
+    _dispatch(db, to_send)
+
+    try:
+        audit_log(
+            action="enqueue_scan_batch",
+            resource="scan_job",
+            resource_id=None,
+            user=user,
+            extra={"job_ids": [j.id for j in to_send]},
+        )
+    except Exception:
+        pass
+
+    return BatchScanResponse(
+        jobs=[
+            BatchScanResult(
+                job_id=job.id,
+                status="enqueued",
+                source=item.source,
+                idempotency_key=item.idempotency_key,
+                reused=reused,
+            )
+            for item, job, reused in planned
+        ]
+    )
+
+
 class JobOut(BaseModel):
     id: int
     source: str
@@ -1,20 +1,20 @@
 from __future__ import annotations
 
-from typing import List, Deque, Literal, Dict, Any
-from collections import deque
-from fastapi import APIRouter, Depends, Query, HTTPException, status
-from pydantic import BaseModel
+from typing import Annotated, List, Literal, Any
+from fastapi import APIRouter, Depends, File, Query, HTTPException, Request, UploadFile, status
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from ..db import get_session
-from ..models import LineageEdge, Asset
+from ..models import LineageEdge, LineageClosure, Asset
 from ..security import require_writer, User, get_current_user
 from ..audit import audit_log
-
-try:
-    import sqlglot
-except Exception:  # pragma: no cover
-    sqlglot = None
+from ..lineage_cache import lineage_cache
+from ..visibility import roles_for, visibility_clause
+from ..visibility_cache import visibility_bitmaps
+from ..sql_lineage import iter_parsed, parse_sql_lineage
+from ..lineage_persist import AssetNameIndex, persist_edges, plan_edges
+from .. import lineage_closure  # noqa: F401  (registers closure maintenance hooks)
 
 
 router = APIRouter(prefix="/lineage", tags=["lineage"])
@@ -25,17 +25,79 @@ class LineageGraph(BaseModel):
     edges: List[tuple[int, int]] = []
 
 
-def _visibility_clause(model, user: User | None):
-    from ..security import _is_auth_disabled
-    if _is_auth_disabled() or user is None or not getattr(user, "roles", None):
-        return True
-    from sqlalchemy import or_, func, literal
-    roles = [r.lower() for r in user.roles]
-    clauses = [model.visibility.is_(None)]
-    vis_expr = func.lower(literal(' ') + func.coalesce(model.visibility, '') + literal(' '))
-    for r in roles:
-        clauses.append(vis_expr.like(f"% {r} %"))
-    return or_(*clauses)
+def _live_edges(user: User | None):
+    """Subquery of (src, dst) for live table-level edges whose endpoints are live and visible to `user`."""
+    from sqlalchemy import select
+    from sqlalchemy.orm import aliased
+    A = aliased(Asset)
+    B = aliased(Asset)
+    return (
+        select(LineageEdge.src_asset_id.label("src"), LineageEdge.dst_asset_id.label("dst"))
+        .join(A, A.id == LineageEdge.src_asset_id)
+        .join(B, B.id == LineageEdge.dst_asset_id)
+        .where(LineageEdge.deleted_at.is_(None), A.deleted_at.is_(None), B.deleted_at.is_(None))
+        .where(LineageEdge.dst_column.is_(None))
+        .where(visibility_clause(A, user))
+        .where(visibility_clause(B, user))
+        .subquery("live_edge")
+    )
+
+
+def traverse_cte(db: Session, asset_id: int, depth: int, user: User | None) -> tuple[dict[int, int], set[tuple[int, int]]]:
+    """
+    Depth-bounded undirected walk from `asset_id` as one WITH RECURSIVE statement.
+    Works on Postgres and SQLite; only reachable nodes and their edges are returned.
+    Result matches the in-process BFS: (node -> min distance, {(src, dst)}).
+    """
+    from sqlalchemy import select, union_all, literal, null, func, case, or_, Integer
+    from sqlalchemy.orm import aliased
+
+    def step(frontier):
+        # One hop in either direction; the OR join lets both dialects probe the src and dst
+        # indexes separately. `frontier` rows are already visible, so only the far end is checked.
+        E = aliased(LineageEdge)
+        N = aliased(Asset)
+        far = case((E.src_asset_id == frontier.c.node, E.dst_asset_id), else_=E.src_asset_id)
+        q = (
+            select(E, N)
+            .select_from(frontier)
+            .join(E, or_(E.src_asset_id == frontier.c.node, E.dst_asset_id == frontier.c.node))
+            .join(N, N.id == far)
+            .where(E.deleted_at.is_(None), E.dst_column.is_(None), N.deleted_at.is_(None))
+            .where(visibility_clause(N, user))
+            .where(frontier.c.dist < depth)
+        )
+        return q, E, N
+
+    anchor = (
+        select(Asset.id.label("node"), literal(0, Integer).label("dist"))
+        .where(Asset.id == asset_id, Asset.deleted_at.is_(None))
+        .where(visibility_clause(Asset, user))
+    )
+    walk = anchor.cte("walk", recursive=True)
+    q, E, N = step(walk)
+    walk = walk.union(q.with_only_columns(N.id.label("node"), (walk.c.dist + 1).label("dist")))
+    reach = (
+        select(walk.c.node, func.min(walk.c.dist).label("dist")).group_by(walk.c.node).cte("reach")
+    )
+    q, E, N = step(reach)
+    nodes_q = select(literal(0, Integer).label("kind"), reach.c.node, reach.c.dist, null(), null())
+    edges_q = q.with_only_columns(
+        literal(1, Integer).label("kind"), null(), null(), E.src_asset_id, E.dst_asset_id
+    ).distinct()
+    visited: dict[int, int] = {}
+    pairs: set[tuple[int, int]] = set()
+    for kind, node, dist, src, dst in db.execute(union_all(nodes_q, edges_q)):
+        if kind == 0:
+            visited[node] = dist
+        else:
+            pairs.add((src, dst))
+    return visited, pairs
+
+
+def _graph_mode(mode: str | None) -> str:
+    import os
+    return (mode or os.getenv("LINEAGE_GRAPH_MODE") or "cache").strip().lower()
 
 
 @router.get("/graph")
@@ -43,127 +105,267 @@ def lineage_graph(
     asset_id: int | None = None,
     depth: int = 1,
     format: Literal["ids", "ui"] = "ids",
+    mode: Literal["cache", "cte"] | None = None,
     db: Session = Depends(get_session),
     user: User | None = Depends(get_current_user),
 ):
+    # Two execution modes (default from LINEAGE_GRAPH_MODE):
+    # - cache: process-wide adjacency cache; visibility from the role set's cached bitmap
+    # - cte: traversal pushed down to the database as a recursive CTE
+    if _graph_mode(mode) == "cte":
+        return _lineage_graph_cte(asset_id, depth, format, db, user)
+    graph = lineage_cache.ensure(db)
+    roles = roles_for(user)
+    allowed = visibility_bitmaps.allowed(db, roles)
+
     # If no asset_id is provided, return the entire edge list
     if asset_id is None:
-        # Build aliases for visibility filtering on both endpoints
-        from sqlalchemy.orm import aliased
-        A = aliased(Asset)
-        B = aliased(Asset)
-        edges = (
-            db.query(LineageEdge, A, B)
-            .join(A, A.id == LineageEdge.src_asset_id)
-            .join(B, B.id == LineageEdge.dst_asset_id)
-            .filter(LineageEdge.deleted_at.is_(None), A.deleted_at.is_(None), B.deleted_at.is_(None))
-            .filter(_visibility_clause(A, user))
-            .filter(_visibility_clause(B, user))
-        ).all()
+        pairs = list(graph.iter_edges(roles, allowed))
         nodes = set()
-        pairs: list[tuple[int, int]] = []
-        for e, a_src, a_dst in edges:
-            nodes.add(e.src_asset_id)
-            nodes.add(e.dst_asset_id)
-            pairs.append((e.src_asset_id, e.dst_asset_id))
+        for s, t in pairs:
+            nodes.add(s)
+            nodes.add(t)
         if format == "ui":
-            # Build node metadata
-            assets = {
-                a.id: a
-                for a in db.query(Asset)
-                .filter(Asset.id.in_(nodes), Asset.deleted_at.is_(None))
-                .filter(_visibility_clause(Asset, user))
-                .all()
-            }
             return {
-                "nodes": [
-                    {"id": i, "name": assets.get(i).name if assets.get(i) else str(i), "system_id": assets.get(i).system_id if assets.get(i) else None}
-                    for i in sorted(nodes)
-                ],
+                "nodes": graph.describe(db, sorted(nodes)),
                 "edges": [{"source": s, "target": t} for (s, t) in pairs],
             }
         return LineageGraph(nodes=sorted(nodes), edges=pairs)
 
     # Constrained traversal: BFS up to `depth` in both directions from the starting asset
-    # Check start asset visibility
-    visible_start = (
-        db.query(Asset.id)
-        .filter(Asset.id == asset_id, Asset.deleted_at.is_(None))
-        .filter(_visibility_clause(Asset, user))
-        .first()
-        is not None
-    )
-    if not visible_start:
+    visited, edge_set = graph.bfs(asset_id, depth, roles, allowed)
+    if not visited:
         return LineageGraph(nodes=[], edges=[])
-    # Load only edges whose src and dst are both visible
-    from sqlalchemy.orm import aliased
-    A = aliased(Asset)
-    B = aliased(Asset)
-    rows = (
-        db.query(LineageEdge, A.id, B.id)
-        .join(A, A.id == LineageEdge.src_asset_id)
-        .join(B, B.id == LineageEdge.dst_asset_id)
-        .filter(LineageEdge.deleted_at.is_(None), A.deleted_at.is_(None), B.deleted_at.is_(None))
-        .filter(_visibility_clause(A, user))
-        .filter(_visibility_clause(B, user))
-        .all()
-    )
-    edges = []
-    for e, _sid, _did in rows:
-        edges.append(e)
-    out_adj: dict[int, list[int]] = {}
-    in_adj: dict[int, list[int]] = {}
-    for e in edges:
-        out_adj.setdefault(e.src_asset_id, []).append(e.dst_asset_id)
-        in_adj.setdefault(e.dst_asset_id, []).append(e.src_asset_id)
-
-    visited: dict[int, int] = {asset_id: 0}
-    q: Deque[int] = deque([asset_id])
-    pairs: set[tuple[int, int]] = set()
-    while q:
-        node = q.popleft()
-        dist = visited[node]
-        if dist >= depth:
-            continue
-        # explore outgoing
-        for nbr in out_adj.get(node, []):
-            pairs.add((node, nbr))
-            if nbr not in visited or visited[nbr] > dist + 1:
-                visited[nbr] = dist + 1
-                q.append(nbr)
-        # explore incoming
-        for nbr in in_adj.get(node, []):
-            pairs.add((nbr, node))
-            if nbr not in visited or visited[nbr] > dist + 1:
-                visited[nbr] = dist + 1
-                q.append(nbr)
 
     if format == "ui":
         node_ids = sorted(visited.keys())
-        assets = {
-            a.id: a
-            for a in db.query(Asset)
-            .filter(Asset.id.in_(node_ids), Asset.deleted_at.is_(None))
-            .filter(_visibility_clause(Asset, user))
-            .all()
+        return {
+            "nodes": graph.describe(db, node_ids),
+            "edges": [{"source": s, "target": t} for (s, t) in sorted(edge_set)],
         }
+    return LineageGraph(nodes=sorted(visited.keys()), edges=sorted(edge_set))
+
+
+def _describe_assets(db: Session, node_ids: list[int], user: User | None) -> list[dict]:
+    assets = {
+        a.id: a
+        for a in db.query(Asset)
+        .filter(Asset.id.in_(node_ids), Asset.deleted_at.is_(None))
+        .filter(visibility_clause(Asset, user))
+        .all()
+    }
+    return [
+        {"id": i, "name": assets.get(i).name if assets.get(i) else str(i), "system_id": assets.get(i).system_id if assets.get(i) else None}
+        for i in node_ids
+    ]
+
+
+def _lineage_graph_cte(asset_id: int | None, depth: int, format: str, db: Session, user: User | None):
+    from sqlalchemy import select
+    if asset_id is None:
+        live = _live_edges(user)
+        pairs = [(s, t) for s, t in db.execute(select(live.c.src, live.c.dst))]
+        node_ids = sorted({n for p in pairs for n in p})
+        if format == "ui":
+            return {
+                "nodes": _describe_assets(db, node_ids, user),
+                "edges": [{"source": s, "target": t} for (s, t) in pairs],
+            }
+        return LineageGraph(nodes=node_ids, edges=pairs)
+
+    visited, edge_set = traverse_cte(db, asset_id, depth, user)
+    if not visited:
+        return LineageGraph(nodes=[], edges=[])
+    node_ids = sorted(visited.keys())
+    if format == "ui":
         return {
-            "nodes": [
-                {"id": i, "name": assets.get(i).name if assets.get(i) else str(i), "system_id": assets.get(i).system_id if assets.get(i) else None}
-                for i in node_ids
-            ],
-            "edges": [{"source": s, "target": t} for (s, t) in sorted(pairs)],
+            "nodes": _describe_assets(db, node_ids, user),
+            "edges": [{"source": s, "target": t} for (s, t) in sorted(edge_set)],
         }
-    return LineageGraph(nodes=sorted(visited.keys()), edges=sorted(pairs))
+    return LineageGraph(nodes=node_ids, edges=sorted(edge_set))
+
+
+class ColumnRef(BaseModel):
+    asset_id: int
+    column: str
+
+
+class ColumnEdge(BaseModel):
+    source: ColumnRef
+    target: ColumnRef
+
+
+class ColumnLineageGraph(BaseModel):
+    nodes: List[ColumnRef] = []
+    edges: List[ColumnEdge] = []
+
+
+@router.get("/columns/graph", response_model=ColumnLineageGraph)
+def column_lineage_graph(
+    asset_id: int,
+    column: str,
+    depth: int = Query(1, ge=0, le=50),
+    direction: Literal["upstream", "downstream", "both"] = "upstream",
+    db: Session = Depends(get_session),
+    user: User | None = Depends(get_current_user),
+):
+    """
+    Column-granular lineage around (asset_id, column). Each hop is one indexed probe on
+    (dst_asset_id, dst_column) upstream or (src_asset_id, src_column) downstream, so only
+    columns actually connected to the start column are expanded.
+    """
+    from sqlalchemy import tuple_
+    from sqlalchemy.orm import aliased
+
+    start = (
+        db.query(Asset.id)
+        .filter(Asset.id == asset_id, Asset.deleted_at.is_(None))
+        .filter(visibility_clause(Asset, user))
+        .first()
+    )
+    if not start:
+        return ColumnLineageGraph()
+
+    visited: set[tuple[int, str]] = {(asset_id, column)}
+    frontier = [(asset_id, column)]
+    pairs: set[tuple[int, str, int, str]] = set()
+    sides = []
+    if direction in ("upstream", "both"):
+        sides.append((LineageEdge.dst_asset_id, LineageEdge.dst_column, LineageEdge.src_asset_id))
+    if direction in ("downstream", "both"):
+        sides.append((LineageEdge.src_asset_id, LineageEdge.src_column, LineageEdge.dst_asset_id))
+    for _ in range(depth):
+        if not frontier:
+            break
+        nxt: list[tuple[int, str]] = []
+        for i in range(0, len(frontier), 500):
+            chunk = frontier[i : i + 500]
+            for near_asset, near_col, far_asset in sides:
+                Far = aliased(Asset)
+                rows = (
+                    db.query(
+                        LineageEdge.src_asset_id,
+                        LineageEdge.src_column,
+                        LineageEdge.dst_asset_id,
+                        LineageEdge.dst_column,
+                    )
+                    .join(Far, Far.id == far_asset)
+                    .filter(tuple_(near_asset, near_col).in_(chunk))
+                    .filter(LineageEdge.deleted_at.is_(None), Far.deleted_at.is_(None))
+                    .filter(visibility_clause(Far, user))
+                    .all()
+                )
+                for sa_id, sc, da_id, dc in rows:
+                    pairs.add((sa_id, sc, da_id, dc))
+                    for node in ((sa_id, sc), (da_id, dc)):
+                        if node not in visited:
+                            visited.add(node)
+                            nxt.append(node)
+        frontier = nxt
+
+    return ColumnLineageGraph(
+        nodes=[ColumnRef(asset_id=a, column=c) for a, c in sorted(visited)],
+        edges=[
+            ColumnEdge(source=ColumnRef(asset_id=sa_id, column=sc), target=ColumnRef(asset_id=da_id, column=dc))
+            for sa_id, sc, da_id, dc in sorted(pairs)
+        ],
+    )
+
+
+class ImpactAsset(BaseModel):
+    id: int
+    name: str
+    system_id: int
+    distance: int
+
+
+class ImpactResponse(BaseModel):
+    asset_id: int
+    direction: Literal["upstream", "downstream"]
+    assets: List[ImpactAsset]
+
+
+def _impact(
+    asset_id: int,
+    direction: Literal["upstream", "downstream"],
+    max_depth: int | None,
+    limit: int,
+    offset: int,
+    db: Session,
+    user: User | None,
+) -> ImpactResponse:
+    start = (
+        db.query(Asset.id)
+        .filter(Asset.id == asset_id, Asset.deleted_at.is_(None))
+        .filter(visibility_clause(Asset, user))
+        .first()
+    )
+    if not start:
+        raise HTTPException(status_code=404, detail="Not found")
+    if direction == "downstream":
+        anchor, other = LineageClosure.ancestor_id, LineageClosure.descendant_id
+    else:
+        anchor, other = LineageClosure.descendant_id, LineageClosure.ancestor_id
+    # Single indexed lookup on the closure (PK for downstream, descendant index for upstream).
+    # The closure only holds paths between live assets, but it is shared by all users:
+    # visibility is applied to the listed assets, not to the assets a path runs through.
+    q = (
+        db.query(Asset.id, Asset.name, Asset.system_id, LineageClosure.min_distance)
+        .join(LineageClosure, other == Asset.id)
+        .filter(anchor == asset_id, Asset.deleted_at.is_(None))
+        .filter(visibility_clause(Asset, user))
+    )
+    if max_depth is not None:
+        q = q.filter(LineageClosure.min_distance <= max_depth)
+    rows = q.order_by(LineageClosure.min_distance, Asset.id).limit(limit).offset(offset).all()
+    return ImpactResponse(
+        asset_id=asset_id,
+        direction=direction,
+        assets=[ImpactAsset(id=i, name=n, system_id=s, distance=d) for i, n, s, d in rows],
+    )
+
+
+@router.get("/upstream/{asset_id}", response_model=ImpactResponse)
+def lineage_upstream(
+    asset_id: int,
+    max_depth: int | None = Query(None, ge=1),
+    limit: int = Query(500, ge=1, le=5000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_session),
+    user: User | None = Depends(get_current_user),
+):
+    """Every asset that feeds `asset_id`, at any depth, nearest first."""
+    return _impact(asset_id, "upstream", max_depth, limit, offset, db, user)
+
+
+@router.get("/downstream/{asset_id}", response_model=ImpactResponse)
+def lineage_downstream(
+    asset_id: int,
+    max_depth: int | None = Query(None, ge=1),
+    limit: int = Query(500, ge=1, le=5000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_session),
+    user: User | None = Depends(get_current_user),
+):
+    """Every asset fed by `asset_id`, at any depth, nearest first."""
+    return _impact(asset_id, "downstream", max_depth, limit, offset, db, user)
 
 
 class SQLLineageRequest(BaseModel):
     sql: str
 
 
+class ColumnLineageOut(BaseModel):
+    src_table: str
+    src_column: str
+    dst_table: str
+    dst_column: str
+
+
 class SQLLineageResponse(BaseModel):
     sources: list[str]
     targets: list[str]
+    columns: list[ColumnLineageOut] = []
 
 
 @router.post("/sql", response_model=SQLLineageResponse)
@@ -173,144 +375,15 @@ def lineage_from_sql(
     db: Session = Depends(get_session),
     user: User | None = Depends(require_writer),
 ):
-    # Parse sources and targets via sqlglot where possible
-    sources: list[str] = []
-    targets: list[str] = []
-    if not sqlglot:
-        return SQLLineageResponse(sources=sources, targets=targets)
+    # Parse sources, targets and column pairs via sqlglot where possible
+    parsed = parse_sql_lineage(payload.sql)
+    sources, targets = parsed.sources, parsed.targets
+    columns = [ColumnLineageOut(**vars(c)) for c in parsed.columns]
 
-    try:
-        parsed = sqlglot.parse_one(payload.sql)
-        # Collect all referenced tables as potential sources
-        for t in parsed.find_all(sqlglot.exp.Table):
-            fq = ".".join([p for p in [t.catalog, t.db, t.name] if p])
-            if fq and fq not in sources:
-                sources.append(fq)
-
-        # Determine common targets (INSERT INTO, CREATE TABLE, CTAS)
-        for node in parsed.find_all((sqlglot.exp.Insert, sqlglot.exp.Create)):
-            # INSERT INTO target
-            if isinstance(node, sqlglot.exp.Insert):
-                tgt = node.this
-                if isinstance(tgt, sqlglot.exp.Table):
-                    fq = ".".join([p for p in [tgt.catalog, tgt.db, tgt.name] if p])
-                    if fq and fq not in targets:
-                        targets.append(fq)
-            # CREATE TABLE target
-            if isinstance(node, sqlglot.exp.Create):
-                tgt = node.this
-                if isinstance(tgt, sqlglot.exp.Table):
-                    fq = ".".join([p for p in [tgt.catalog, tgt.db, tgt.name] if p])
-                    if fq and fq not in targets:
-                        targets.append(fq)
-    except Exception:
-        # Best-effort; return what we have
-        pass
-
-    # If persisting, create LineageEdge records for all source->target combinations
+    # If persisting, create LineageEdge records for all resolvable source->target combinations
     if persist:
-        # Map asset names to IDs when possible
-        # Strategy: try exact match first; if not found, fall back to last identifier segment
-        # Prefer the most recently created assets to avoid picking stale fixtures from other tests/systems
-        assets = (
-            db.query(Asset)
-            .filter(Asset.deleted_at.is_(None))
-            .order_by(Asset.id.desc())
-            .all()
-        )
-        assets_by_name: dict[str, list[Asset]] = {}
-        assets_by_tail: dict[str, list[Asset]] = {}
-        for a in assets:
-            assets_by_name.setdefault(a.name, []).append(a)
-            tail = a.name.split(".")[-1]
-            assets_by_tail.setdefault(tail, []).append(a)
-
-        def resolve_asset_id(name: str) -> int | None:
-            # Newest exact match globally (lists are pre-sorted by id desc)
-            if assets_by_name.get(name):
-                return assets_by_name[name][0].id
-            # Fallback to newest by tail globally
-            tail = name.split(".")[-1]
-            if assets_by_tail.get(tail):
-                return assets_by_tail[tail][0].id
-            return None
-
-        created = 0
-        for t in targets:
-            # Build candidate target assets (exact and by tail)
-            t_tail = t.split(".")[-1]
-            t_cands: list[tuple[int, int, bool]] = []  # (asset_id, system_id, is_exact)
-            for a in assets_by_name.get(t, []):
-                t_cands.append((a.id, a.system_id, True))
-            for a in assets_by_tail.get(t_tail, []):
-                if (a.id, a.system_id, True) not in t_cands:
-                    t_cands.append((a.id, a.system_id, False))
-            if not t_cands:
-                continue
-
-            for s in sources:
-                s_tail = s.split(".")[-1]
-                s_cands: list[tuple[int, int, bool]] = []  # (asset_id, system_id, is_exact)
-                for a in assets_by_name.get(s, []):
-                    s_cands.append((a.id, a.system_id, True))
-                for a in assets_by_tail.get(s_tail, []):
-                    if (a.id, a.system_id, True) not in s_cands:
-                        s_cands.append((a.id, a.system_id, False))
-                if not s_cands:
-                    continue
-
-                # Prefer same-system pairs; score by exactness then by recency of the pair
-                best_pair: tuple[int, int] | None = None
-                best_score: tuple[int, int] = (-1, -1)  # (exact_score, min_pair_id)
-                for (tid, tsys, t_exact) in t_cands:
-                    for (sid, ssys, s_exact) in s_cands:
-                        if tsys != ssys:
-                            continue
-                        if sid == tid:
-                            continue
-                        exact_score = (1 if t_exact else 0) + (1 if s_exact else 0)
-                        min_pair_id = min(sid, tid)
-                        score = (exact_score, min_pair_id)
-                        if score > best_score:
-                            best_score = score
-                            best_pair = (sid, tid)
-
-                # If no same-system pair found, fall back to globally best by exactness/recency
-                if best_pair is None:
-                    for (tid, _tsys, t_exact) in t_cands:
-                        for (sid, _ssys, s_exact) in s_cands:
-                            if sid == tid:
-                                continue
-                            exact_score = (1 if t_exact else 0) + (1 if s_exact else 0)
-                            min_pair_id = min(sid, tid)
-                            score = (exact_score, min_pair_id)
-                            if score > best_score:
-                                best_score = score
-                                best_pair = (sid, tid)
-
-                if best_pair is None:
-                    continue
-
-                src_id, dst_id = best_pair
-                exists = (
-                    db.query(LineageEdge)
-                    .filter(
-                        LineageEdge.src_asset_id == src_id,
-                        LineageEdge.dst_asset_id == dst_id,
-                        LineageEdge.deleted_at.is_(None),
-                    )
-                    .first()
-                )
-                if exists:
-                    continue
-                edge = LineageEdge(
-                    src_asset_id=src_id,
-                    dst_asset_id=dst_id,
-                    confidence=50,
-                    predicate="sqlglot",
-                )
-                db.add(edge)
-                created += 1
+        index = AssetNameIndex.current(db)
+        created = len(persist_edges(db, plan_edges(index, parsed)))
         if created:
             db.commit()
         try:
@@ -318,4 +391,153 @@ def lineage_from_sql(
         except Exception:
             pass
 
-    return SQLLineageResponse(sources=sources, targets=targets)
+    return SQLLineageResponse(sources=sources, targets=targets, columns=columns)
+
+
+# Batch bodies are validated in memory before streaming starts, so their size is bounded
+SQL_BATCH_MAX_STATEMENTS = 5000
+SQL_BATCH_MAX_STATEMENT_CHARS = 1_000_000
+
+_BatchSQL = Annotated[str, Field(max_length=SQL_BATCH_MAX_STATEMENT_CHARS)]
+
+
+def _batch_max_bytes() -> int:
+    import os
+
+    try:
+        return int(os.getenv("LINEAGE_BATCH_MAX_BYTES", str(32 * 1024 * 1024)))
+    except ValueError:
+        return 32 * 1024 * 1024
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+def _limit_body(request: Request) -> None:
+    # Declared sizes are refused before the body is validated
+    try:
+        length = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        length = 0
+    if length > _batch_max_bytes():
+        raise _too_large(f"Request body exceeds {_batch_max_bytes()} bytes")
+
+
+class SQLBatchItem(BaseModel):
+    sql: _BatchSQL
+    id: str | None = None
+
+
+class SQLBatchRequest(BaseModel):
+    statements: List[SQLBatchItem | _BatchSQL] = Field(..., max_length=SQL_BATCH_MAX_STATEMENTS)
+    dialect: str | None = None
+
+
+def _batch_response(items: list[SQLBatchItem], dialect: str | None, persist: int, db: Session, user: User | None):
+    """
+    NDJSON streamed chunk by chunk as statements are parsed: one line per statement (in request
+    order), then a summary line. Names resolve against one index per batch; with persist, each
+    chunk's new edges are written in one flush and committed before its lines go out, on a
+    session of the generator's own (the request session is closed once streaming starts).
+    """
+    import json
+    from fastapi.responses import StreamingResponse
+
+    index = AssetNameIndex.current(db) if persist else None
+    bind = db.get_bind()
+
+    def lines():
+        answered = 0
+        total_created = 0
+        session = Session(bind=bind, autoflush=False) if persist else None
+        try:
+            for parsed in iter_parsed([i.sql for i in items], dialect=dialect):
+                created_by_stmt = [0] * len(parsed)
+                if session is not None:
+                    plans = [plan_edges(index, p) for p in parsed]
+                    created = persist_edges(session, [k for plan in plans for k in plan])
+                    # Credit each new edge to the first statement that produced it
+                    for n, plan in enumerate(plans):
+                        for k in plan:
+                            if k in created:
+                                created.discard(k)
+                                created_by_stmt[n] += 1
+                    if any(created_by_stmt):
+                        session.commit()
+                        total_created += sum(created_by_stmt)
+                for p, created_n in zip(parsed, created_by_stmt):
+                    line: dict[str, Any] = {
+                        "index": answered,
+                        "id": items[answered].id,
+                        "sources": p.sources,
+                        "targets": p.targets,
+                        "columns": [vars(c) for c in p.columns],
+                        "created": created_n,
+                    }
+                    if p.timed_out:
+                        line["timed_out"] = True
+                    answered += 1
+                    yield json.dumps(line, separators=(",", ":")) + "\n"
+            yield json.dumps({"summary": {"statements": answered, "created": total_created}}, separators=(",", ":")) + "\n"
+        finally:
+            if session is not None:
+                session.close()
+                try:
+                    audit_log("persist_lineage_sql_batch", "lineage_edge", None, user, {"statements": answered, "created": total_created})
+                except Exception:
+                    pass
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/sql/batch", dependencies=[Depends(_limit_body)])
+def lineage_from_sql_batch(
+    payload: SQLBatchRequest,
+    persist: int = Query(0, ge=0, le=1),
+    db: Session = Depends(get_session),
+    user: User | None = Depends(require_writer),
+):
+    """
+    Lineage for many statements at once (at most SQL_BATCH_MAX_STATEMENTS, and a body of at
+    most LINEAGE_BATCH_MAX_BYTES). Responds with NDJSON: one result line per statement (in
+    request order) followed by a summary line.
+    """
+    items = [SQLBatchItem(sql=i) if isinstance(i, str) else i for i in payload.statements]
+    return _batch_response(items, payload.dialect, persist, db, user)
+
+
+@router.post("/sql/batch/ndjson", dependencies=[Depends(_limit_body)])
+def lineage_from_sql_batch_ndjson(
+    file: UploadFile = File(...),
+    dialect: str | None = None,
+    persist: int = Query(0, ge=0, le=1),
+    db: Session = Depends(get_session),
+    user: User | None = Depends(require_writer),
+):
+    """
+    Same as /sql/batch for an uploaded NDJSON file: each line a JSON string or {"sql", "id"}
+    object. The file is bounded like a /sql/batch body.
+    """
+    import json
+
+    max_bytes = _batch_max_bytes()
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(f"Upload exceeds {max_bytes} bytes")
+    items: list[SQLBatchItem] = []
+    read = 0
+    for lineno, raw in enumerate(file.file, start=1):
+        read += len(raw)
+        if read > max_bytes:
+            raise _too_large(f"Upload exceeds {max_bytes} bytes")
+        line = raw.decode("utf-8").strip() if isinstance(raw, bytes) else raw.strip()
+        if not line:
+            continue
+        if len(items) >= SQL_BATCH_MAX_STATEMENTS:
+            raise _too_large(f"More than {SQL_BATCH_MAX_STATEMENTS} statements")
+        try:
+            obj = json.loads(line)
+            items.append(SQLBatchItem(sql=obj) if isinstance(obj, str) else SQLBatchItem(**obj))
+        except Exception:
+            raise HTTPException(status_code=422, detail=f"Invalid NDJSON at line {lineno}")
+    return _batch_response(items, dialect, persist, db, user)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import os
+from typing import Any, Callable, Dict, List, Optional
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy import text
 from sqlalchemy.orm import Session
@@ -8,21 +9,49 @@ from sqlalchemy.orm import Session
 from ..db import get_session
 from ..models import Asset, ColumnModel
 from ..security import get_current_user, User
-from sqlalchemy import or_, func, literal
+from ..visibility import roles_for, visibility_clause
+from ..visibility_cache import IdBitmap, visibility_bitmaps
 
 router = APIRouter(prefix="/search", tags=["search"])
 
 
-def _visibility_clause(model, user: User | None):
-    from ..security import _is_auth_disabled
-    if _is_auth_disabled() or user is None or not getattr(user, "roles", None):
-        return True
-    roles = [r.lower() for r in user.roles]
-    clauses = [model.visibility.is_(None)]
-    vis_expr = func.lower(literal(' ') + func.coalesce(model.visibility, '') + literal(' '))
-    for r in roles:
-        clauses.append(vis_expr.like(f"% {r} %"))
-    return or_(*clauses)
+def _max_postfilter_rows() -> int:
+    try:
+        return max(0, int(os.getenv("SEARCH_POSTFILTER_MAX_ROWS", "1000")))
+    except ValueError:
+        return 1000
+
+
+def _page(qry, vis, limit: int, offset: int, allowed: Optional[IdBitmap], asset_id: Callable[[Any], int]) -> list:
+    """
+    `limit` rows after `offset`. With a role set's bitmap of visible ids, candidates are read
+    unfiltered in growing batches and rows of other assets dropped in process (offset counts
+    visible rows only). When most matches are not visible this stops after
+    SEARCH_POSTFILTER_MAX_ROWS candidates (default 1000) and the page is read again with the
+    SQL filter `vis`.
+    """
+    if allowed is None:
+        return qry.filter(vis).limit(limit).offset(offset).all()
+    cap = _max_postfilter_rows()
+    out: list = []
+    skip, pos, batch = offset, 0, max(2 * limit, 100)
+    while pos < cap:
+        want = min(batch, cap - pos)
+        rows = qry.limit(want).offset(pos).all()
+        pos += len(rows)
+        for row in rows:
+            if asset_id(row) not in allowed:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            out.append(row)
+            if len(out) == limit:
+                return out
+        if len(rows) < want:
+            return out
+        batch *= 2
+    return qry.filter(vis).limit(limit).offset(offset).all()
 
 
 @router.get("/")
@@ -37,10 +66,13 @@ def search(
     is_pg = bool(dialect and dialect.name == "postgresql")
 
     results: Dict[str, List[Dict[str, Any]]] = {"assets": [], "columns": []}
+    # Role-restricted users: post-filter against the role set's cached bitmap when available
+    allowed = visibility_bitmaps.allowed(db, roles_for(user))
+    vis = visibility_clause(Asset, user)
 
     if is_pg:
         # Assets with highlight
-        a_rows = (
+        a_q = (
             db.query(
                 Asset,
                 text(
@@ -51,15 +83,11 @@ def search(
                 ),
             )
             .filter(Asset.deleted_at.is_(None))
-            .filter(_visibility_clause(Asset, user))
             .filter(text("asset.search_vector @@ plainto_tsquery('simple', unaccent(:q))"))
             .params(q=q)
             .order_by(text("rank DESC"), Asset.id)
-            .limit(limit)
-            .offset(offset)
-            .all()
         )
-        for a, hl, rank in a_rows:
+        for a, hl, rank in _page(a_q, vis, limit, offset, allowed, lambda row: row[0].id):
             results["assets"].append(
                 {
                     "id": a.id,
@@ -72,7 +100,7 @@ def search(
             )
 
         # Columns with highlight
-        c_rows = (
+        c_q = (
             db.query(
                 ColumnModel,
                 text(
@@ -84,15 +112,11 @@ def search(
             )
             .join(Asset, Asset.id == ColumnModel.asset_id)
             .filter(ColumnModel.deleted_at.is_(None), Asset.deleted_at.is_(None))
-            .filter(_visibility_clause(Asset, user))
             .filter(text("\"column\".search_vector @@ plainto_tsquery('simple', unaccent(:q))"))
             .params(q=q)
             .order_by(text("rank DESC"), ColumnModel.id)
-            .limit(limit)
-            .offset(offset)
-            .all()
         )
-        for c, hl, rank in c_rows:
+        for c, hl, rank in _page(c_q, vis, limit, offset, allowed, lambda row: row[0].asset_id):
             results["columns"].append(
                 {
                     "id": c.id,
@@ -106,17 +130,13 @@ def search(
             )
     else:
         like = f"%{q}%"
-        a_rows = (
+        a_q = (
             db.query(Asset)
             .filter(Asset.deleted_at.is_(None))
-            .filter(_visibility_clause(Asset, user))
             .filter((Asset.name.ilike(like)) | (Asset.description.ilike(like)))
             .order_by(Asset.id)
-            .limit(limit)
-            .offset(offset)
-            .all()
         )
-        for a in a_rows:
+        for a in _page(a_q, vis, limit, offset, allowed, lambda a: a.id):
             results["assets"].append(
                 {
                     "id": a.id,
@@ -126,18 +146,14 @@ def search(
                     "highlight": None,
                 }
             )
-        c_rows = (
+        c_q = (
             db.query(ColumnModel)
             .join(Asset, Asset.id == ColumnModel.asset_id)
             .filter(ColumnModel.deleted_at.is_(None), Asset.deleted_at.is_(None))
-            .filter(_visibility_clause(Asset, user))
             .filter((ColumnModel.name.ilike(like)) | (ColumnModel.description.ilike(like)))
             .order_by(ColumnModel.id)
-            .limit(limit)
-            .offset(offset)
-            .all()
         )
-        for c in c_rows:
+        for c in _page(c_q, vis, limit, offset, allowed, lambda c: c.asset_id):
             results["columns"].append(
                 {
                     "id": c.id,
@@ -9,30 +9,11 @@ from ..models import System
 from ..schemas import SystemCreate, SystemOut, SystemUpdate
 from ..security import get_current_user, User, require_writer
 from ..audit import audit_log
+from ..visibility import visibility_clause
 
 router = APIRouter(prefix="/systems", tags=["systems"])
 
 
-def _visibility_clause(model, user: User | None):
-    # When auth disabled or user unknown, show all
-    from ..security import _is_auth_disabled
-    if _is_auth_disabled() or user is None or not getattr(user, "roles", None):
-        return True
-    # visibility is NULL (public) OR any role matches tokens in visibility string
-    roles = [r.lower() for r in user.roles]
-    tokens = [
-        f"% {r} %" for r in roles
-    ]
-    from sqlalchemy import or_, func, literal
-    clauses = [model.visibility.is_(None)]
-    # Normalize visibility by surrounding with spaces to ease LIKE matching
-    vis_expr = func.lower(literal(' ') + func.coalesce(model.visibility, '') + literal(' '))
-    for r in roles:
-        like = f"% {r} %"
-        clauses.append(vis_expr.like(like))
-    return or_(*clauses)
-
-
 @router.get("/", response_model=List[SystemOut])
 def list_systems(
     limit: int = Query(200, ge=1, le=500),
@@ -43,7 +24,7 @@ def list_systems(
     return (
         db.query(System)
         .filter(System.deleted_at.is_(None))
-        .filter(_visibility_clause(System, user))
+        .filter(visibility_clause(System, user))
         .order_by(System.id)
         .limit(limit)
         .offset(offset)
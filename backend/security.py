@@ -6,9 +6,10 @@ import time
 from typing import Any, Dict, Optional
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-import httpx
 import jwt
-from jwt import PyJWKClient
+
+from . import token_cache
+from .oidc import key_cache
 
 
 bearer_scheme = HTTPBearer(auto_error=False)
@@ -36,22 +37,19 @@ async def get_current_user(creds: HTTPAuthorizationCredentials | None = Depends(
     issuer = os.getenv("OIDC_ISSUER")
     audience = os.getenv("OIDC_AUDIENCE")
 
-    # Prefer JWKS URL from issuer; fallback to a static PEM in env PUBLIC_JWT_KEY_PEM
-    jwks_url = issuer.rstrip("/") + "/v2.0/.well-known/openid-configuration"
-    try:
-        # Fetch OpenID configuration and JWKS URI
-        with httpx.Client(timeout=5.0) as client:
-            oidc_conf = client.get(jwks_url).json()
-            jwks_uri = oidc_conf.get("jwks_uri")
-            if not jwks_uri:
-                # Azure may expose keys at a known path; attempt direct JWKS if config resolution fails
-                jwks_uri = issuer.rstrip("/") + "/discovery/v2.0/keys"
-    except Exception:
-        jwks_uri = issuer.rstrip("/") + "/discovery/v2.0/keys"
+    # Repeat tokens skip verification until they expire (backend/token_cache.py)
+    cache_key = token_cache.token_key(token, issuer, audience)
+    cached = token_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
+    # Signing keys come from the issuer's JWKS (cached per process, see backend/oidc.py);
+    # fallback to a static PEM in env PUBLIC_JWT_KEY_PEM
     try:
-        jwk_client = PyJWKClient(jwks_uri)
-        signing_key = jwk_client.get_signing_key_from_jwt(token)
+        kid = jwt.get_unverified_header(token).get("kid")
+        signing_key = await key_cache(issuer).signing_key(kid)
+        if signing_key is None:
+            raise jwt.InvalidTokenError(f"No signing key for kid {kid!r}")
         decoded = jwt.decode(
             token,
             signing_key.key,
@@ -87,11 +85,13 @@ async def get_current_user(creds: HTTPAuthorizationCredentials | None = Depends(
         elif isinstance(val, str):
             roles.extend(val.split())
 
-    return User(
+    user = User(
         sub=decoded.get("sub") or decoded.get("oid") or "unknown",
         upn=decoded.get("upn") or decoded.get("preferred_username"),
         roles=roles,
     )
+    token_cache.put(cache_key, user, decoded.get("exp"))
+    return user
 
 
 # Simple /me helper for smoke testing auth
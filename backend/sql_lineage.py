@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional, Sequence, TypeVar
+
+try:
+    import sqlglot
+    from sqlglot import exp
+except Exception:  # pragma: no cover
+    sqlglot = None  # type: ignore
+    exp = None  # type: ignore
+
+T = TypeVar("T")
+
+
+@dataclass
+class ColumnLineage:
+    src_table: str
+    src_column: str
+    dst_table: str
+    dst_column: str
+
+
+@dataclass
+class ParsedLineage:
+    sources: list[str] = field(default_factory=list)
+    targets: list[str] = field(default_factory=list)
+    columns: list[ColumnLineage] = field(default_factory=list)
+    timed_out: bool = False
+
+
+def _fq(table) -> str:
+    return ".".join([p for p in [table.catalog, table.db, table.name] if p])
+
+
+def _target_table(node):
+    # INSERT INTO t (a, b) wraps the table in a Schema node
+    tgt = node.this
+    if isinstance(tgt, exp.Schema):
+        tgt = tgt.this
+    return tgt if isinstance(tgt, exp.Table) else None
+
+
+def _target_columns(node, query) -> list[Optional[str]]:
+    if isinstance(node.this, exp.Schema) and node.this.expressions:
+        return [getattr(e, "name", None) for e in node.this.expressions]
+    return [None if isinstance(p, exp.Star) else p.alias_or_name for p in query.selects]
+
+
+def _column_lineage(node, dst_table: str, dialect: Optional[str]) -> list[ColumnLineage]:
+    from sqlglot.lineage import lineage as sqlglot_lineage
+
+    query = node.expression
+    if not isinstance(query, (exp.Select, exp.Union)):
+        return []
+    # WITH ... INSERT / CREATE hangs the CTEs on the statement, not the query: move them over
+    # so the columns resolve through the CTEs as they do for INSERT ... WITH ... SELECT
+    if node.args.get("with") is not None and query.args.get("with") is None:
+        query = query.copy()
+        query.set("with", node.args["with"].copy())
+    out: list[ColumnLineage] = []
+    seen: set[tuple[str, str, str]] = set()
+    projections = [p.alias_or_name for p in query.selects]
+    for dst_col, proj in zip(_target_columns(node, query), projections):
+        if not dst_col or not proj or proj == "*":
+            continue
+        try:
+            root = sqlglot_lineage(proj, query, dialect=dialect)
+        except Exception:
+            # Ambiguous or unresolvable without a schema; skip this column only
+            continue
+        for n in root.walk():
+            if n.downstream or not isinstance(n.source, exp.Table):
+                continue
+            src_col = n.name.split(".")[-1]
+            key = (_fq(n.source), src_col, dst_col)
+            if src_col and src_col != "*" and key not in seen:
+                seen.add(key)
+                out.append(ColumnLineage(key[0], src_col, dst_table, dst_col))
+    return out
+
+
+def lineage_targets(parsed):
+    """
+    (statement node, target table) for every statement in `parsed` that moves data: INSERT,
+    MERGE and CREATE TABLE ... AS SELECT.
+    """
+    for node in parsed.find_all((exp.Insert, exp.Merge, exp.Create)):
+        # CREATE TABLE without AS SELECT moves no data
+        if isinstance(node, exp.Create) and not isinstance(node.expression, (exp.Select, exp.Union)):
+            continue
+        tgt = _target_table(node)
+        if tgt is not None and _fq(tgt):
+            yield node, _fq(tgt)
+
+
+def referenced_tables(parsed) -> list[str]:
+    """Every table `parsed` mentions, in first-seen order. References to its CTEs are not tables."""
+    ctes = {cte.alias_or_name for cte in parsed.find_all(exp.CTE)}
+    return list(
+        dict.fromkeys(
+            fq
+            for fq in (_fq(t) for t in parsed.find_all(exp.Table) if t.db or t.catalog or t.name not in ctes)
+            if fq
+        )
+    )
+
+
+def parse_sql_lineage(sql: str, dialect: Optional[str] = None) -> ParsedLineage:
+    """
+    Best-effort table and column lineage for one statement.
+    targets: INSERT / MERGE / CTAS targets; sources: every other referenced table;
+    columns: target column <- source column pairs for INSERT ... SELECT and CTAS.
+    """
+    result = ParsedLineage()
+    if not sqlglot:
+        return result
+    try:
+        parsed = sqlglot.parse_one(sql, dialect=dialect)
+        tables = referenced_tables(parsed)
+        for node, fq in lineage_targets(parsed):
+            if fq not in result.targets:
+                result.targets.append(fq)
+            try:
+                result.columns.extend(_column_lineage(node, fq, dialect))
+            except Exception:
+                pass
+        # A target is not its own source (INSERT INTO t SELECT ... FROM t is one table)
+        result.sources = [t for t in tables if t not in result.targets]
+    except Exception:
+        # Best-effort; return what we have
+        pass
+    return result
+
+
+# Process pool for batch parsing, shared by the batch endpoints and the harvest parser
+# (connectors.sql_parse): sqlglot is pure Python, so threads would serialize on the GIL.
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _parse_workers(env: str = "LINEAGE_PARSE_WORKERS") -> int:
+    try:
+        return max(1, int(os.getenv(env) or (os.cpu_count() or 1)))
+    except ValueError:
+        return 1
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            # spawn: forking a threaded API process can inherit held locks
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            # A worker stuck past its deadline is killed rather than waited for
+            for proc in list((getattr(_pool, "_processes", None) or {}).values()):
+                proc.terminate()
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def chunked(statements: Sequence[T], workers: int) -> list[list[T]]:
+    """About four chunks per worker, so one slow chunk does not leave the others idle."""
+    size = max(1, len(statements) // (workers * 4))
+    return [list(statements[i : i + size]) for i in range(0, len(statements), size)]
+
+
+class _Timeout(BaseException):
+    # BaseException so the parsers' best-effort `except Exception` does not swallow it
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise _Timeout()
+
+
+def call_with_timeout(fn: Callable[..., T], timeout: float, on_timeout: Callable[[], T], *args) -> T:
+    """
+    fn(*args), or on_timeout() once it has run `timeout` seconds. SIGALRM interrupts pure-Python
+    parsing; it is only available on the main thread (true for pool workers and Celery prefork
+    children), elsewhere, or with timeout <= 0, fn runs unbounded.
+    """
+    if timeout <= 0 or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        return fn(*args)
+    previous = signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn(*args)
+    except _Timeout:
+        return on_timeout()
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _finished(futures: dict) -> dict[int, list]:
+    return {i: f.result() for i, f in futures.items() if f.done() and not f.cancelled() and f.exception() is None}
+
+
+def iter_chunks(
+    fn: Callable[..., list],
+    chunks: Sequence[Sequence[T]],
+    args: tuple = (),
+    workers: int = 1,
+    deadline: Optional[Callable[[Sequence[T]], float]] = None,
+    on_timeout: Optional[Callable[[Sequence[T]], list]] = None,
+) -> Iterator[list]:
+    """
+    fn(chunk, *args) for every chunk across the shared pool, yielded in chunk order as each
+    one is ready.
+
+    With `deadline`, a chunk still running deadline(chunk) seconds after it is waited on yields
+    on_timeout(chunk) instead. The pool is then killed; chunks that already finished are kept
+    and the rest are resubmitted to a fresh pool. If the pool breaks (a worker died), the chunks
+    without a result are run inline.
+    """
+    ready: dict[int, list] = {}
+    futures: dict = {}
+    inline = False
+    for i in range(len(chunks)):
+        if i in ready:
+            yield ready.pop(i)
+            continue
+        if not inline and i not in futures:
+            try:
+                pool = _get_pool(workers)
+                futures = {j: pool.submit(fn, chunks[j], *args) for j in range(i, len(chunks)) if j not in ready}
+            except Exception:
+                _reset_pool()
+                inline = True
+        if inline:
+            yield fn(chunks[i], *args)
+            continue
+        try:
+            result = futures.pop(i).result(timeout=deadline(chunks[i]) if deadline else None)
+        except FutureTimeout:
+            result = on_timeout(chunks[i]) if on_timeout else []
+            # Keep whatever finished before the pool goes away
+            ready.update(_finished(futures))
+            futures = {}
+            _reset_pool()
+        except Exception:
+            ready.update(_finished(futures))
+            futures = {}
+            _reset_pool()
+            inline = True
+            result = fn(chunks[i], *args)
+        yield result
+
+
+def map_chunks(
+    fn: Callable[..., list],
+    chunks: Sequence[Sequence[T]],
+    args: tuple = (),
+    workers: int = 1,
+    deadline: Optional[Callable[[Sequence[T]], float]] = None,
+    on_timeout: Optional[Callable[[Sequence[T]], list]] = None,
+) -> list[list]:
+    """iter_chunks() collected into a list."""
+    return list(iter_chunks(fn, chunks, args, workers, deadline, on_timeout))
+
+
+def _parse_timeout() -> float:
+    try:
+        return max(0.0, float(os.getenv("LINEAGE_PARSE_TIMEOUT", "10")))
+    except ValueError:
+        return 10.0
+
+
+def _timed_out() -> ParsedLineage:
+    return ParsedLineage(timed_out=True)
+
+
+def _timed_out_chunk(statements: Sequence[str]) -> list[ParsedLineage]:
+    return [_timed_out() for _ in statements]
+
+
+def _parse_chunk(statements: Sequence[str], dialect: Optional[str], timeout: float = 0) -> list[ParsedLineage]:
+    return [call_with_timeout(parse_sql_lineage, timeout, _timed_out, sql, dialect) for sql in statements]
+
+
+def iter_parsed(statements: Sequence[str], dialect: Optional[str] = None, min_parallel: int = 64) -> Iterator[list[ParsedLineage]]:
+    """
+    Parse statements in order, yielding one list per chunk as soon as it is parsed. Chunks fan
+    out to a process pool (LINEAGE_PARSE_WORKERS, default cpu count) when there are enough
+    statements to amortize the IPC; small batches parse inline as one chunk.
+
+    Each statement gets LINEAGE_PARSE_TIMEOUT seconds (default 10, 0 disables) and comes back
+    empty with timed_out=True when it runs over. Inline parses are only bounded on the main
+    thread; a pool chunk that outlives its statements' combined timeouts (plus slack) is
+    recorded as timed out and the chunks still pending go to a fresh pool.
+    """
+    if not statements:
+        return
+    timeout = _parse_timeout()
+    workers = _parse_workers()
+    if workers <= 1 or len(statements) < min_parallel:
+        yield _parse_chunk(statements, dialect, timeout)
+        return
+    deadline = (lambda chunk: timeout * len(chunk) + 30) if timeout else None
+    yield from iter_chunks(
+        _parse_chunk, chunked(statements, workers), (dialect, timeout), workers, deadline, _timed_out_chunk
+    )
+
+
+def parse_many(statements: Sequence[str], dialect: Optional[str] = None, min_parallel: int = 64) -> list[ParsedLineage]:
+    """iter_parsed() flattened into one list, in statement order."""
+    return [p for chunk in iter_parsed(statements, dialect, min_parallel) for p in chunk]
@@ -0,0 +1,138 @@
+"""
+Role-based visibility of systems and assets, shared by every router.
+
+`visibility` stays the editable source of truth: NULL means public, otherwise roles separated
+by spaces or commas, matched case-insensitively. Its normalized form lives in
+`asset_visibility_role` / `system_visibility_role` (one row per (id, role), primary key
+(id, role) plus a (role, id) index), so a filter is an indexed semi-join instead of a
+`lower(' ' || visibility || ' ') LIKE '% role %'` per role that no index can serve:
+
+    visibility IS NULL OR EXISTS (SELECT 1 FROM asset_visibility_role r
+                                  WHERE r.asset_id = asset.id AND r.role IN (:roles))
+
+Role rows are kept in step with ORM writes by mapper hooks in the same flush. Rebuild them
+after raw-SQL edits of `visibility` (or once after migrating) with:
+
+    python -m backend.visibility rebuild
+"""
+from __future__ import annotations
+
+import argparse
+import re
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, event, exists, inspect, insert, select, true
+from sqlalchemy.engine import Connection
+
+from .models import Asset, AssetVisibilityRole, System, SystemVisibilityRole
+
+_SPLIT = re.compile(r"[\s,]+")
+
+# mapped class -> (role link table, its id column)
+_LINKS = {
+    Asset: (AssetVisibilityRole.__table__, AssetVisibilityRole.__table__.c.asset_id),
+    System: (SystemVisibilityRole.__table__, SystemVisibilityRole.__table__.c.system_id),
+}
+
+_CHUNK = 1000
+
+
+def parse_roles(visibility: Optional[str]) -> Optional[frozenset[str]]:
+    """Lower-cased roles allowed by a visibility string, or None when it is public (NULL)."""
+    if visibility is None:
+        return None
+    return frozenset(r for r in _SPLIT.split(visibility.lower()) if r)
+
+
+def roles_for(user) -> Optional[list[str]]:
+    """Lower-cased roles to filter by, or None when visibility filtering does not apply."""
+    from .security import _is_auth_disabled
+
+    if _is_auth_disabled() or user is None or not getattr(user, "roles", None):
+        return None
+    return sorted({r.lower() for r in user.roles})
+
+
+def is_visible(visibility: Optional[str], roles: Optional[list[str]]) -> bool:
+    """In-process equivalent of visibility_clause for one row."""
+    allowed = parse_roles(visibility)
+    return roles is None or allowed is None or not allowed.isdisjoint(roles)
+
+
+def visibility_clause(model, user):
+    """WHERE clause limiting `model` (Asset or System, or an alias of either) to rows `user` may see."""
+    roles = roles_for(user)
+    if roles is None:
+        return true()
+    link, id_col = _LINKS[inspect(model).mapper.class_]
+    return model.visibility.is_(None) | exists().where(id_col == model.id, link.c.role.in_(roles))
+
+
+def _rows(id_col, ids_and_visibility: Iterable[tuple[int, Optional[str]]]) -> list[dict]:
+    return [
+        {id_col.key: obj_id, "role": role}
+        for obj_id, vis in ids_and_visibility
+        for role in sorted(parse_roles(vis) or ())
+    ]
+
+
+def sync(conn: Connection, cls, ids_and_visibility: Iterable[tuple[int, Optional[str]]]) -> None:
+    """Replace the role rows of the given ids with those parsed from their visibility."""
+    link, id_col = _LINKS[cls]
+    items = list(ids_and_visibility)
+    for i in range(0, len(items), _CHUNK):
+        batch = items[i : i + _CHUNK]
+        conn.execute(delete(link).where(id_col.in_([obj_id for obj_id, _ in batch])))
+        rows = _rows(id_col, batch)
+        if rows:
+            conn.execute(insert(link), rows)
+
+
+def rebuild(conn: Connection) -> int:
+    """Recompute every role row from `visibility`. Returns the number of rows written."""
+    written = 0
+    for cls, (link, id_col) in _LINKS.items():
+        conn.execute(delete(link))
+        rows: list[dict] = []
+        for obj_id, vis in conn.execute(select(cls.id, cls.visibility).where(cls.visibility.is_not(None))):
+            rows.extend(_rows(id_col, [(obj_id, vis)]))
+            if len(rows) >= _CHUNK:
+                conn.execute(insert(link), rows)
+                written += len(rows)
+                rows = []
+        if rows:
+            conn.execute(insert(link), rows)
+            written += len(rows)
+    return written
+
+
+# ORM hooks: role rows are written on the flush connection, in the same transaction
+
+
+@event.listens_for(Asset, "after_insert")
+@event.listens_for(System, "after_insert")
+def _inserted(mapper, connection: Connection, target) -> None:
+    if target.visibility is not None:
+        sync(connection, mapper.class_, [(target.id, target.visibility)])
+
+
+@event.listens_for(Asset, "after_update")
+@event.listens_for(System, "after_update")
+def _updated(mapper, connection: Connection, target) -> None:
+    if inspect(target).attrs.visibility.history.has_changes():
+        sync(connection, mapper.class_, [(target.id, target.visibility)])
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m backend.visibility")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+    from .db import engine
+
+    with engine.begin() as conn:
+        n = rebuild(conn)
+    print(f"visibility role rows: {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Process-wide cache of per-role-set visibility bitmaps.
+
+Requests come from a handful of distinct role combinations, so instead of evaluating
+`visibility` row by row on every lineage walk or search page, each role set maps to an
+IdBitmap of the assets it may see: public assets (visibility NULL) plus those granted to one
+of its roles. The public ids are read once per version and shared by all role sets, so a new
+role set costs one range scan of the `asset_visibility_role` (role, asset_id) index.
+
+Lookups fail closed: an id missing from the bitmap (an asset created after it was built) is
+hidden. Every lookup first compares (max(asset.id), max(asset.updated_at)), two index lookups,
+with the stamp the bitmaps were built at, so inserts and ORM updates from any process (other
+API workers, scan workers) drop them before they are used. Commits in this process that
+change a `visibility` also bump the version, and a bitmap built while the version moved is
+used once but not stored. Raw-SQL edits that leave `updated_at` alone (which also need
+`python -m backend.visibility rebuild`) are picked up after VISIBILITY_BITMAP_TTL_SECONDS
+(default 60).
+
+Memory is bounded by VISIBILITY_BITMAP_CACHE_BYTES (default 64 MiB, 0 disables: callers fall
+back to the SQL filter), least recently used role sets first. /metrics exports
+`visibility_bitmap_cache_bytes`, `visibility_bitmap_cache_entries` and
+`visibility_bitmap_cache_total{result="hit"|"miss"}`.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import chain
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from .models import Asset, AssetVisibilityRole, System
+
+try:
+    from prometheus_client import Counter, Gauge
+
+    LOOKUPS = Counter("visibility_bitmap_cache", "Visibility bitmap cache lookups", ["result"])
+    CACHE_BYTES = Gauge("visibility_bitmap_cache_bytes", "Bytes held by cached visibility bitmaps")
+    CACHE_ENTRIES = Gauge("visibility_bitmap_cache_entries", "Role sets with a cached visibility bitmap")
+except Exception:  # pragma: no cover
+    LOOKUPS = CACHE_BYTES = CACHE_ENTRIES = None  # type: ignore
+
+_ARRAY_MAX = 4096  # ids per container kept as a sorted array; denser containers become bitmaps
+_BITMAP_BYTES = 8192  # 65536 bits
+_CONTAINER_OVERHEAD = 64
+
+
+class IdBitmap:
+    """
+    Compressed, immutable set of non-negative ids (Roaring layout): ids are grouped by their
+    high 16 bits, and each group is a sorted array('H') of low bits while it holds at most 4096
+    ids, or a fixed 8 KiB bitmap beyond that. Membership is a dict lookup plus a bisect or a
+    bit test.
+    """
+
+    __slots__ = ("_containers", "_len", "nbytes")
+
+    def __init__(self, ids: Iterable[int] = ()) -> None:
+        groups: dict[int, array] = {}
+        for i in ids:
+            lows = groups.get(i >> 16)
+            if lows is None:
+                lows = groups[i >> 16] = array("H")
+            lows.append(i & 0xFFFF)
+        self._containers: dict[int, array | bytearray] = {}
+        self._len = 0
+        self.nbytes = 0
+        for high, lows in groups.items():
+            lows = array("H", sorted(set(lows)))
+            self._len += len(lows)
+            if len(lows) <= _ARRAY_MAX:
+                self._containers[high] = lows
+                self.nbytes += len(lows) * lows.itemsize + _CONTAINER_OVERHEAD
+            else:
+                bits = bytearray(_BITMAP_BYTES)
+                for low in lows:
+                    bits[low >> 3] |= 1 << (low & 7)
+                self._containers[high] = bits
+                self.nbytes += _BITMAP_BYTES + _CONTAINER_OVERHEAD
+
+    def __contains__(self, i: int) -> bool:
+        container = self._containers.get(i >> 16)
+        if container is None:
+            return False
+        low = i & 0xFFFF
+        if isinstance(container, bytearray):
+            return bool(container[low >> 3] >> (low & 7) & 1)
+        j = bisect_left(container, low)
+        return j < len(container) and container[j] == low
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[int]:
+        for high in sorted(self._containers):
+            base = high << 16
+            container = self._containers[high]
+            if isinstance(container, bytearray):
+                for offset, byte in enumerate(container):
+                    if byte:
+                        for bit in range(8):
+                            if byte >> bit & 1:
+                                yield base | offset << 3 | bit
+            else:
+                for low in container:
+                    yield base | low
+
+
+def _max_bytes() -> int:
+    try:
+        return max(0, int(os.getenv("VISIBILITY_BITMAP_CACHE_BYTES", str(64 * 1024 * 1024))))
+    except ValueError:
+        return 64 * 1024 * 1024
+
+
+def _ttl_seconds() -> float:
+    try:
+        return float(os.getenv("VISIBILITY_BITMAP_TTL_SECONDS", "60"))
+    except ValueError:
+        return 60.0
+
+
+class VisibilityBitmapCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[frozenset[str], tuple[float, IdBitmap]]" = OrderedDict()
+        self._public: tuple[float, IdBitmap] | None = None
+        self._bind_key: str | None = None
+        self._stamp: tuple | None = None
+        self.nbytes = 0
+        self.version = 0
+
+    def _report(self) -> None:
+        if CACHE_BYTES is not None:
+            CACHE_BYTES.set(self.nbytes)
+            CACHE_ENTRIES.set(len(self._entries))
+
+    def _drop_all(self) -> None:
+        self._entries.clear()
+        self._public = None
+        self.nbytes = 0
+        self._report()
+
+    def invalidate(self) -> None:
+        """Start a new version: drop every bitmap, and discard those being built right now."""
+        with self._lock:
+            self.version += 1
+            self._drop_all()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"version": self.version, "entries": len(self._entries), "bytes": self.nbytes}
+
+    @staticmethod
+    def _current(db: Session) -> tuple:
+        # Two index lookups; moves on any insert and on any ORM update (updated_at onupdate)
+        row = db.execute(select(func.max(Asset.id), func.max(Asset.updated_at))).one()
+        return tuple(row)
+
+    def allowed(self, db: Session, roles: Optional[list[str]]) -> Optional[IdBitmap]:
+        """
+        Ids of the assets `roles` may see, or None when there is nothing to filter (roles is None,
+        see visibility.roles_for) or the cache is disabled. Ids missing from the bitmap (assets
+        created after it was built) are treated as hidden.
+        """
+        budget = _max_bytes()
+        if roles is None or budget <= 0:
+            return None
+        key = frozenset(roles)
+        bind_key = str(getattr(db.get_bind(), "url", ""))
+        stamp = self._current(db)
+        ttl = _ttl_seconds()
+        with self._lock:
+            if self._bind_key != bind_key or self._stamp != stamp:
+                # Another process (or raw SQL) wrote to asset since these bitmaps were built
+                if self._stamp is not None:
+                    self.version += 1
+                self._drop_all()
+                self._bind_key, self._stamp = bind_key, stamp
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is not None and (ttl <= 0 or now - entry[0] < ttl):
+                self._entries.move_to_end(key)
+                bitmap: Optional[IdBitmap] = entry[1]
+            else:
+                bitmap = None
+            public = self._public
+            if public is not None and ttl > 0 and now - public[0] >= ttl:
+                public = None
+            version = self.version
+        if LOOKUPS is not None:
+            LOOKUPS.labels(result="hit" if bitmap is not None else "miss").inc()
+        if bitmap is not None:
+            return bitmap
+
+        if public is None:
+            stmt = select(Asset.id).where(Asset.visibility.is_(None)).execution_options(yield_per=10000)
+            public = (now, IdBitmap(db.execute(stmt).scalars()))
+        link = AssetVisibilityRole
+        granted = db.execute(select(link.asset_id).where(link.role.in_(sorted(key)))).scalars().all()
+        bitmap = IdBitmap(chain(public[1], granted))
+        with self._lock:
+            if self.version == version and self._bind_key == bind_key and self._stamp == stamp:
+                if self._public is not public:
+                    if self._public is not None:
+                        self.nbytes -= self._public[1].nbytes
+                    self._public = public
+                    self.nbytes += public[1].nbytes
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self.nbytes -= old[1].nbytes
+                self._entries[key] = (now, bitmap)
+                self.nbytes += bitmap.nbytes
+                # Least recently used role sets go first; the shared public ids stay
+                while self.nbytes > budget and self._entries:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.nbytes -= evicted.nbytes
+                if self.nbytes > budget:
+                    self.nbytes -= self._public[1].nbytes
+                    self._public = None
+                self._report()
+        return bitmap
+
+
+visibility_bitmaps = VisibilityBitmapCache()
+
+
+# ORM hooks: note visibility changes during flush, invalidate once the transaction commits so
+# a bitmap is never rebuilt from (and stored for) uncommitted rows.
+
+_DIRTY_KEY = "visibility_bitmaps_dirty"
+
+
+@event.listens_for(Asset, "after_insert")
+@event.listens_for(System, "after_insert")
+def _inserted(mapper, connection, target) -> None:
+    s = object_session(target)
+    if s is not None and target.visibility is not None:
+        s.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(Asset, "after_update")
+@event.listens_for(System, "after_update")
+def _updated(mapper, connection, target) -> None:
+    s = object_session(target)
+    if s is not None and inspect(target).attrs.visibility.history.has_changes():
+        s.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply(session: Session) -> None:
+    if session.info.pop(_DIRTY_KEY, False):
+        visibility_bitmaps.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard(session: Session, previous_transaction) -> None:
+    session.info.pop(_DIRTY_KEY, None)
@@ -0,0 +1,57 @@
+"""
+Harvest parse throughput by process-pool size (connectors.sql_parse.parse_many).
+
+    python benchmarks/bench_harvest_parse.py --statements 20000 --workers 1 2 4 8
+
+Statements are distinct INSERT ... SELECT joins (no fingerprint repeats), so every one is
+parsed; throughput should grow roughly linearly with workers up to the core count. The first
+pooled run per size includes spawning workers and importing sqlglot, so each size is warmed
+up once before timing.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from connectors.sql_parse import parse_many  # noqa: E402
+
+
+def statements(n: int) -> list[str]:
+    return [
+        f"INSERT INTO db.mart.t{i} (a, b, c) "
+        f"SELECT x.a, y.b, SUM(z.c) FROM db.raw.x{i % 97} x "
+        f"JOIN db.raw.y{i % 89} y ON x.id = y.id LEFT JOIN db.raw.z{i % 83} z ON z.id = y.id "
+        f"WHERE x.d > {i} GROUP BY 1, 2"
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--statements", type=int, default=20_000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = ap.parse_args()
+
+    stmts = statements(args.statements)
+    print(f"cores: {os.cpu_count()}")
+    print(f"{'workers':>8} {'seconds':>9} {'stmts/s':>10} {'speedup':>8}")
+    base = None
+    for w in sorted(set(args.workers)):
+        os.environ["HARVEST_PARSE_WORKERS"] = str(w)
+        parse_many(stmts[: max(64, w * 64)], "snowflake")
+        t0 = time.perf_counter()
+        out = parse_many(stmts, "snowflake")
+        elapsed = time.perf_counter() - t0
+        assert len(out) == len(stmts)
+        base = base or elapsed
+        print(f"{w:>8} {elapsed:>9.2f} {len(stmts) / elapsed:>10.0f} {base / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
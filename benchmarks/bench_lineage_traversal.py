@@ -0,0 +1,140 @@
+"""
+Compare lineage traversal strategies for /lineage/graph.
+
+    python benchmarks/bench_lineage_traversal.py --edges 10000 100000 1000000 --depth 2
+
+Strategies:
+- python: legacy behaviour (load every live edge, build adjacency, BFS) on each request
+- cache-cold / cache-warm: process-wide adjacency cache (build + BFS / BFS only)
+- cte: recursive CTE pushed down to the database
+
+Uses a throwaway SQLite file unless --database-url is given (point it at a scratch Postgres
+database; tables are created if missing and the benchmark rows are left in place).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import deque
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from backend.db import Base  # noqa: E402
+from backend.lineage_cache import LineageGraphCache  # noqa: E402
+from backend.models import Asset, LineageEdge, System  # noqa: E402
+from backend.routers.lineage import traverse_cte  # noqa: E402
+
+
+def seed(db, n_edges: int, seed_value: int = 7) -> list[int]:
+    rnd = random.Random(seed_value)
+    now = datetime.utcnow()
+    sys_row = System(name=f"bench_{n_edges}_{time.time_ns()}")
+    db.add(sys_row)
+    db.commit()
+    n_assets = max(10, n_edges // 4)
+    first = None
+    batch = []
+    for i in range(n_assets):
+        batch.append({"system_id": sys_row.id, "name": f"t{i}", "created_at": now, "updated_at": now})
+        if len(batch) == 10000:
+            db.execute(insert(Asset), batch)
+            batch = []
+    if batch:
+        db.execute(insert(Asset), batch)
+    db.commit()
+    ids = [r[0] for r in db.query(Asset.id).filter(Asset.system_id == sys_row.id).order_by(Asset.id)]
+    first = ids[0]
+    batch = []
+    for _ in range(n_edges):
+        s, t = rnd.choice(ids), rnd.choice(ids)
+        batch.append({"src_asset_id": s, "dst_asset_id": t, "confidence": 0, "created_at": now, "updated_at": now})
+        if len(batch) == 10000:
+            db.execute(insert(LineageEdge), batch)
+            batch = []
+    if batch:
+        db.execute(insert(LineageEdge), batch)
+    db.commit()
+    return [first] + rnd.sample(ids, 9)
+
+
+def legacy_bfs(db, asset_id: int, depth: int):
+    out_adj: dict[int, list[int]] = {}
+    in_adj: dict[int, list[int]] = {}
+    for s, t in db.query(LineageEdge.src_asset_id, LineageEdge.dst_asset_id).filter(LineageEdge.deleted_at.is_(None)):
+        out_adj.setdefault(s, []).append(t)
+        in_adj.setdefault(t, []).append(s)
+    visited = {asset_id: 0}
+    q = deque([asset_id])
+    pairs = set()
+    while q:
+        node = q.popleft()
+        dist = visited[node]
+        if dist >= depth:
+            continue
+        for nbr in out_adj.get(node, []):
+            pairs.add((node, nbr))
+            if nbr not in visited:
+                visited[nbr] = dist + 1
+                q.append(nbr)
+        for nbr in in_adj.get(node, []):
+            pairs.add((nbr, node))
+            if nbr not in visited:
+                visited[nbr] = dist + 1
+                q.append(nbr)
+    return visited, pairs
+
+
+def timed(fn, starts) -> float:
+    t0 = time.perf_counter()
+    for s in starts:
+        fn(s)
+    return (time.perf_counter() - t0) / len(starts) * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--edges", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--depth", type=int, default=2)
+    ap.add_argument("--database-url", default=None)
+    args = ap.parse_args()
+
+    print(f"{'edges':>10} {'python':>10} {'cache-cold':>11} {'cache-warm':>11} {'cte':>10}  (ms/request)")
+    for n in args.edges:
+        path = None
+        url = args.database_url
+        if not url:
+            fd, path = tempfile.mkstemp(suffix=".db")
+            os.close(fd)
+            url = f"sqlite+pysqlite:///{path}"
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            starts = seed(db, n)
+            py_ms = timed(lambda s: legacy_bfs(db, s, args.depth), starts[:3])
+            cache = LineageGraphCache()
+            t0 = time.perf_counter()
+            graph = cache.ensure(db)
+            cold_ms = (time.perf_counter() - t0) * 1000
+            warm_ms = timed(lambda s: graph.bfs(s, args.depth, None), starts)
+            cte_ms = timed(lambda s: traverse_cte(db, s, args.depth, None), starts)
+            print(f"{n:>10} {py_ms:>10.1f} {cold_ms + warm_ms:>11.1f} {warm_ms:>11.2f} {cte_ms:>10.1f}")
+        finally:
+            db.close()
+            engine.dispose()
+            if path:
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
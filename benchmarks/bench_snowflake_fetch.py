@@ -0,0 +1,123 @@
+"""
+Compare the tuple and Arrow paths for turning Snowflake results into records (requires pyarrow).
+
+    python benchmarks/bench_snowflake_fetch.py --rows 1000000 --batch 50000
+
+Result sets, both synthetic:
+- columns: INFORMATION_SCHEMA.COLUMNS rows into column records
+- history: ACCOUNT_USAGE.QUERY_HISTORY rows into harvest items (query text and ISO times)
+  plus the page watermark (last QUERY_ID, END_TIME)
+
+Strategies, over the same batches:
+- tuple: rows materialized as Python tuples (what fetchmany() hands back, including the
+  connector's Arrow -> tuple conversion), then one dict per row
+- arrow: connectors.snowflake.arrow helpers on each Arrow batch (column_records; for history,
+  history_columns mapped through the connector's _history_entry and last_row)
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from datetime import datetime, timedelta  # noqa: E402
+
+import pyarrow as pa  # noqa: E402
+
+from connectors.snowflake.arrow import column_records, history_columns, last_row  # noqa: E402
+from connectors.snowflake.impl import _history_entry  # noqa: E402
+
+
+def synthetic(rows: int) -> pa.Table:
+    n_tables = max(1, rows // 20)
+    return pa.table(
+        {
+            "TABLE_CATALOG": pa.array(["ANALYTICS"] * rows),
+            "TABLE_SCHEMA": pa.array([f"S{(i // 20) % 50}" for i in range(rows)]),
+            "TABLE_NAME": pa.array([f"T{(i // 20) % n_tables}" for i in range(rows)]),
+            "COLUMN_NAME": pa.array([f"C{i % 20}" for i in range(rows)]),
+            "DATA_TYPE": pa.array(["NUMBER", "TEXT", "TIMESTAMP_NTZ", "BOOLEAN"] * (rows // 4) + ["NUMBER"] * (rows % 4)),
+        }
+    )
+
+
+def synthetic_history(rows: int) -> pa.Table:
+    t0 = datetime(2024, 1, 1)
+    return pa.table(
+        {
+            "QUERY_ID": pa.array([f"01b2-{i:012d}" for i in range(rows)]),
+            "QUERY_TEXT": pa.array([f"INSERT INTO db.mart.t{i % 97} SELECT * FROM db.raw.s{i % 89} WHERE d > {i}" for i in range(rows)]),
+            "START_TIME": pa.array([t0 + timedelta(milliseconds=i) for i in range(rows)], pa.timestamp("us")),
+            "END_TIME": pa.array([t0 + timedelta(milliseconds=i + 250) for i in range(rows)], pa.timestamp("us")),
+        }
+    )
+
+
+def history_tuple_path(batches: list[pa.Table]) -> int:
+    n = 0
+    for tbl in batches:
+        rows = list(zip(*(tbl.column(i).to_pylist() for i in range(tbl.num_columns))))
+        items = [_history_entry(text, start, end) for (_, text, start, end) in rows]
+        last_id, _, _, last_end = rows[-1]
+        n += len(items)
+    return n
+
+
+def history_arrow_path(batches: list[pa.Table]) -> int:
+    n = 0
+    for tbl in batches:
+        items = list(map(_history_entry, *history_columns(tbl)))
+        last_id, last_end = last_row(tbl, 0, 3)
+        n += len(items)
+    return n
+
+
+def tuple_path(batches: list[pa.Table]) -> int:
+    n = 0
+    for tbl in batches:
+        rows = list(zip(*(tbl.column(i).to_pylist() for i in range(tbl.num_columns))))
+        records = [
+            {"system": "snowflake", "asset": f"{catalog}.{schema}.{table}", "name": col, "data_type": dtype}
+            for (catalog, schema, table, col, dtype) in rows
+        ]
+        n += len(records)
+    return n
+
+
+def arrow_path(batches: list[pa.Table]) -> int:
+    return sum(len(column_records(tbl)) for tbl in batches)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    ap.add_argument("--batch", type=int, default=50_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    cases = {
+        "columns": (synthetic, tuple_path, arrow_path),
+        "history": (synthetic_history, history_tuple_path, history_arrow_path),
+    }
+    print(f"{'result':>8} {'rows':>10} {'tuple s':>9} {'arrow s':>9} {'speedup':>8}")
+    for case, (make, by_tuple, by_arrow) in cases.items():
+        for n in args.rows:
+            tbl = make(n)
+            batches = [tbl.slice(i, args.batch) for i in range(0, n, args.batch)]
+            best = {}
+            for name, fn in (("tuple", by_tuple), ("arrow", by_arrow)):
+                times = []
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    assert fn(batches) == n
+                    times.append(time.perf_counter() - t0)
+                best[name] = min(times)
+            print(f"{case:>8} {n:>10} {best['tuple']:>9.2f} {best['arrow']:>9.2f} {best['tuple'] / best['arrow']:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
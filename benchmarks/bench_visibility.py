@@ -0,0 +1,156 @@
+"""
+Compare role-based visibility filters on the asset table.
+
+    python benchmarks/bench_visibility.py --assets 100000 1000000 --user-roles 50
+
+Filters:
+- like: legacy `lower(' ' || coalesce(visibility, '') || ' ') LIKE '% role %'` OR-ed per role
+- link: backend.visibility.visibility_clause (EXISTS on asset_visibility_role)
+
+Queries, per filter: count of visible assets, first page (ORDER BY id LIMIT 50) and a batch
+lookup of 1000 random ids. Assets are 20% public, the rest carry 1-3 of --roles roles
+(space-separated: the legacy filter does not split on commas).
+
+Then the per-role-set bitmap used by the lineage cache and search post-filtering
+(backend.visibility_cache): build time (cold, then for a second role set) and size, and the
+cost of one in-process visibility check against the bitmap vs parsing the cached visibility
+string (is_visible).
+
+Uses a throwaway SQLite file unless --database-url is given (point it at a scratch Postgres
+database; tables are created if missing and the benchmark rows are left in place).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, func, insert, literal, or_, select  # noqa: E402
+
+from backend.db import Base  # noqa: E402
+from backend.models import Asset, System  # noqa: E402
+from backend.security import User  # noqa: E402
+from backend import visibility  # noqa: E402
+from backend.visibility_cache import VisibilityBitmapCache  # noqa: E402
+
+
+def legacy_clause(roles: list[str]):
+    vis_expr = func.lower(literal(" ") + func.coalesce(Asset.visibility, "") + literal(" "))
+    return or_(Asset.visibility.is_(None), *(vis_expr.like(f"% {r} %") for r in roles))
+
+
+def seed(conn, n_assets: int, n_roles: int, seed_value: int = 7) -> tuple[int, int]:
+    rnd = random.Random(seed_value)
+    now = datetime.utcnow()
+    system_id = conn.execute(
+        insert(System).values(name=f"bench_vis_{time.time_ns()}", created_at=now, updated_at=now).returning(System.id)
+    ).scalar_one()
+    pool = [f"role{i}" for i in range(n_roles)]
+    batch = []
+    for i in range(n_assets):
+        vis = None if rnd.random() < 0.2 else " ".join(rnd.sample(pool, rnd.randint(1, 3)))
+        batch.append({"system_id": system_id, "name": f"t{i}", "visibility": vis, "created_at": now, "updated_at": now})
+        if len(batch) == 10000:
+            conn.execute(insert(Asset), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(Asset), batch)
+    lo, hi = conn.execute(select(func.min(Asset.id), func.max(Asset.id)).where(Asset.system_id == system_id)).one()
+    return lo, hi
+
+
+def bitmap_stats(engine, user: User, lo: int, hi: int) -> None:
+    from sqlalchemy.orm import Session
+
+    with Session(engine) as db:
+        rows = db.execute(select(Asset.id, Asset.visibility).where(Asset.id.between(lo, hi))).all()
+        cache = VisibilityBitmapCache()
+        t0 = time.perf_counter()
+        allowed = cache.allowed(db, visibility.roles_for(user))
+        build_ms = (time.perf_counter() - t0) * 1000
+        # Another role set of the same version reuses the public ids
+        t0 = time.perf_counter()
+        cache.allowed(db, visibility.roles_for(user)[1:])
+        next_ms = (time.perf_counter() - t0) * 1000
+    roles = visibility.roles_for(user)
+    t0 = time.perf_counter()
+    by_string = sum(1 for _, vis in rows if visibility.is_visible(vis, roles))
+    string_ns = (time.perf_counter() - t0) / len(rows) * 1e9
+    t0 = time.perf_counter()
+    by_bitmap = sum(1 for i, _ in rows if i in allowed)
+    bitmap_ns = (time.perf_counter() - t0) / len(rows) * 1e9
+    assert by_string == by_bitmap, (by_string, by_bitmap)
+    print(
+        f"{'':>10} bitmap: build {build_ms:.0f} ms (next role set {next_ms:.0f} ms), {len(allowed)} visible ids"
+        f" in {allowed.nbytes / 1024:.0f} KiB; check {bitmap_ns:.0f} ns vs is_visible {string_ns:.0f} ns"
+    )
+
+
+def timed(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--assets", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--roles", type=int, default=500)
+    ap.add_argument("--user-roles", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--database-url", default=None)
+    args = ap.parse_args()
+
+    os.environ["AUTH_DISABLED"] = "0"
+    os.environ.setdefault("OIDC_ISSUER", "https://bench.invalid")
+    os.environ.setdefault("OIDC_AUDIENCE", "bench")
+    rnd = random.Random(11)
+    user = User(sub="bench", roles=[f"role{i}" for i in rnd.sample(range(args.roles), args.user_roles)])
+
+    print(f"{'assets':>10} {'filter':>6} {'count':>10} {'page':>10} {'ids':>10}  (ms/query)")
+    for n in args.assets:
+        path = None
+        url = args.database_url
+        if not url:
+            fd, path = tempfile.mkstemp(suffix=".db")
+            os.close(fd)
+            url = f"sqlite+pysqlite:///{path}"
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        try:
+            with engine.begin() as conn:
+                lo, hi = seed(conn, n, args.roles)
+                visibility.rebuild(conn)
+            ids = rnd.sample(range(lo, hi + 1), min(1000, hi - lo + 1))
+            filters = {"like": legacy_clause(user.roles), "link": visibility.visibility_clause(Asset, user)}
+            counts = {}
+            with engine.connect() as conn:
+                for name, clause in filters.items():
+                    live = Asset.id.between(lo, hi)
+                    counts[name] = conn.execute(select(func.count()).where(live, clause)).scalar_one()
+                    count_ms = timed(lambda: conn.execute(select(func.count()).where(live, clause)).scalar_one(), args.repeat)
+                    page_ms = timed(
+                        lambda: conn.execute(select(Asset.id).where(live, clause).order_by(Asset.id).limit(50)).all(),
+                        args.repeat,
+                    )
+                    ids_ms = timed(lambda: conn.execute(select(Asset.id).where(Asset.id.in_(ids), clause)).all(), args.repeat)
+                    print(f"{n:>10} {name:>6} {count_ms:>10.1f} {page_ms:>10.2f} {ids_ms:>10.2f}")
+            assert counts["like"] == counts["link"], counts
+            bitmap_stats(engine, user, lo, hi)
+        finally:
+            engine.dispose()
+            if path:
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional, Tuple
 from datetime import datetime
 
 
@@ -11,19 +12,86 @@ class DiscoverResult:
     columns: list[Dict[str, Any]]
 
 
+# (system name, asset name prefix); an empty prefix means the whole system
+Namespace = Tuple[str, str]
+
+
+@dataclass
+class DiscoverChunk:
+    """
+    A bounded slice of a discovery result. Columns may reference assets from earlier chunks,
+    so streamed column dicts carry their "system" alongside "asset".
+
+    covered: namespaces whose assets and columns have all been listed once the stream reaches
+    this chunk. After the stream ends, rows in covered namespaces that an earlier scan listed
+    but this one did not are tombstoned. Partial (e.g. incremental) scans cover nothing.
+
+    timings: seconds spent discovering a unit of work (e.g. one database) that finished with
+    this chunk, reported in the scan result.
+    """
+    assets: list[Dict[str, Any]]
+    columns: list[Dict[str, Any]]
+    covered: list[Namespace] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def discover_chunk_size() -> int:
+    # Upper bound on assets + columns held per chunk (DISCOVER_CHUNK_SIZE, default 50000)
+    try:
+        return max(1, int(os.getenv("DISCOVER_CHUNK_SIZE", "50000")))
+    except ValueError:
+        return 50000
+
+
 @dataclass
 class HarvestResult:
     payload: Dict[str, Any]
     last_seen_at: Optional[datetime]
 
 
+@dataclass
+class HarvestPage:
+    """
+    One bounded page of a harvest. last_seen_at / last_query_id are the watermark after this
+    page; persisting them lets a crashed harvest resume from the next page.
+    """
+    payload: Dict[str, Any]
+    last_seen_at: Optional[datetime]
+    last_query_id: Optional[str] = None
+
+
 class Connector:
     def discover(self, last_seen_at: Optional[datetime] = None) -> DiscoverResult:
         raise NotImplementedError
 
+    def discover_stream(self, last_seen_at: Optional[datetime] = None, chunk_size: Optional[int] = None) -> Iterator[DiscoverChunk]:
+        """
+        Yield the discovery result in chunks of at most `chunk_size` rows. This default slices
+        discover(), so it bounds only the writes; connectors with large catalogs override it to
+        fetch incrementally as well. It declares no coverage, so nothing is ever tombstoned.
+        """
+        size = chunk_size or discover_chunk_size()
+        res = self.discover(last_seen_at=last_seen_at)
+        systems = {a.get("name"): a.get("system") for a in res.assets}
+        for i in range(0, len(res.assets), size):
+            yield DiscoverChunk(assets=res.assets[i : i + size], columns=[])
+        for i in range(0, len(res.columns), size):
+            cols = [dict(c, system=c.get("system") or systems.get(c.get("asset"))) for c in res.columns[i : i + size]]
+            yield DiscoverChunk(assets=[], columns=cols)
+
     def harvest(self, since: Optional[datetime] = None) -> HarvestResult:
         raise NotImplementedError
 
+    def harvest_stream(
+        self, since: Optional[datetime] = None, after_query_id: Optional[str] = None, parser: Any = None
+    ) -> Iterator[HarvestPage]:
+        """
+        Yield the harvest page by page. This default returns harvest() as a single page.
+        `parser` (connectors.sql_parse.HarvestParser) is used by connectors that parse SQL.
+        """
+        res = self.harvest(since=since)
+        yield HarvestPage(payload=res.payload, last_seen_at=res.last_seen_at)
+
 
 def get_connector(source: str) -> Connector:
     source = (source or "").lower()
@@ -0,0 +1,75 @@
+"""
+Optional Arrow fetch path for Snowflake metadata and query history.
+
+When pyarrow is installed and the cursor supports `fetch_arrow_batches()` (snowflake-connector-
+python with the pandas/pyarrow extra), result sets are read as columnar batches and the
+fully-qualified names are built with Arrow compute kernels instead of formatting one Python
+tuple per row. SNOWFLAKE_ARROW=0 forces the tuple (fetchmany) path.
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Iterator, List, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except Exception:  # pragma: no cover
+    pa = None  # type: ignore
+    pc = None  # type: ignore
+
+
+def enabled(cursor) -> bool:
+    if (os.getenv("SNOWFLAKE_ARROW") or "1").strip().lower() in ("0", "false", "no", "off"):
+        return False
+    return pa is not None and hasattr(cursor, "fetch_arrow_batches")
+
+
+def iter_batches(cursor, size: int) -> Iterator["pa.Table"]:
+    """Arrow tables of at most `size` rows from the cursor's last query (zero-copy slices)."""
+    for tbl in cursor.fetch_arrow_batches() or ():
+        for offset in range(0, tbl.num_rows, size):
+            yield tbl.slice(offset, size)
+
+
+def _fq_names(tbl: "pa.Table") -> List[str]:
+    # catalog.schema.table from the first three columns, in one kernel call
+    parts = [pc.cast(tbl.column(i), pa.string()) for i in range(3)]
+    return pc.binary_join_element_wise(*parts, ".").to_pylist()
+
+
+def _iso(col) -> List[Any]:
+    if pa.types.is_timestamp(col.type):
+        # %S carries the fraction; drop a zero one to match datetime.isoformat()
+        text = pc.strftime(col, format="%Y-%m-%dT%H:%M:%S")
+        return pc.replace_substring_regex(text, pattern=r"\.0+$", replacement="").to_pylist()
+    return pc.cast(col, pa.string()).to_pylist()
+
+
+def asset_records(tbl: "pa.Table") -> List[Dict[str, Any]]:
+    """INFORMATION_SCHEMA.TABLES batch (catalog, schema, name, type, last_altered) -> asset dicts."""
+    return [
+        {"system": "snowflake", "name": name, "description": None, "type": ttype, "last_altered": altered}
+        for name, ttype, altered in zip(_fq_names(tbl), tbl.column(3).to_pylist(), _iso(tbl.column(4)))
+    ]
+
+
+def column_records(tbl: "pa.Table") -> List[Dict[str, Any]]:
+    """INFORMATION_SCHEMA.COLUMNS batch (catalog, schema, table, column, data_type) -> column dicts."""
+    return [
+        {"system": "snowflake", "asset": asset, "name": col, "data_type": dtype}
+        for asset, col, dtype in zip(_fq_names(tbl), tbl.column(3).to_pylist(), tbl.column(4).to_pylist())
+    ]
+
+
+def history_columns(tbl: "pa.Table") -> Tuple[List[Any], List[Any], List[Any]]:
+    """
+    QUERY_HISTORY batch (query_id, query_text, start_time, end_time) -> parallel lists of query
+    texts and ISO start/end times, for building items without a tuple per row.
+    """
+    return tbl.column(1).to_pylist(), _iso(tbl.column(2)), _iso(tbl.column(3))
+
+
+def last_row(tbl: "pa.Table", *columns: int) -> Tuple[Any, ...]:
+    """Values of `columns` in the batch's last row (the page watermark)."""
+    return tuple(tbl.column(i)[tbl.num_rows - 1].as_py() for i in columns)
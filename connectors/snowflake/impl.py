@@ -1,10 +1,16 @@
 from __future__ import annotations
 
 import os
-from datetime import datetime, timezone
-from typing import Any, Dict, Optional, List, Tuple
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, Optional, List, Tuple
 
-from ..base import Connector, DiscoverResult, HarvestResult
+from . import arrow
+from ..base import Connector, DiscoverChunk, DiscoverResult, HarvestPage, HarvestResult, discover_chunk_size
+from ..sql_parse import HarvestParser
 
 
 def _utcnow() -> datetime:
@@ -22,54 +28,73 @@ class SnowflakeConnector(Connector):
     Env vars (all optional for local dev):
       SNOWFLAKE_ACCOUNT, SNOWFLAKE_USER, SNOWFLAKE_PASSWORD | SNOWFLAKE_PRIVATE_KEY
       SNOWFLAKE_ROLE, SNOWFLAKE_WAREHOUSE, SNOWFLAKE_DATABASES (comma-separated, default: current DB)
+      SNOWFLAKE_DISCOVER_WORKERS (databases discovered concurrently, default 4)
+      SNOWFLAKE_ARROW=0 to read results as tuples even when pyarrow is installed
     """
 
-    def _get_conn(self):
+    def _enabled(self) -> bool:
         # Explicit feature flag to enable real Snowflake connections in non-test environments
         if (os.getenv("SNOWFLAKE_ENABLED") or "").strip().lower() not in ("1", "true", "yes", "on"):
-            return None, None
-        cfg = {
-            "account": os.getenv("SNOWFLAKE_ACCOUNT"),
-            "user": os.getenv("SNOWFLAKE_USER"),
-            "password": os.getenv("SNOWFLAKE_PASSWORD"),
-            "role": os.getenv("SNOWFLAKE_ROLE"),
-            "warehouse": os.getenv("SNOWFLAKE_WAREHOUSE"),
-        }
+            return False
         # Minimal check: account and user must exist to attempt a real connection
-        if not cfg["account"] or not cfg["user"]:
-            return None, None
+        return bool(os.getenv("SNOWFLAKE_ACCOUNT") and os.getenv("SNOWFLAKE_USER"))
+
+    def _connect(self):
+        """A new connection, or None when disabled, unconfigured or unreachable."""
+        if not self._enabled():
+            return None
         try:
             import snowflake.connector  # type: ignore
 
-            conn = snowflake.connector.connect(
-                account=cfg["account"],
-                user=cfg["user"],
-                password=cfg["password"],
-                role=cfg["role"],
-                warehouse=cfg["warehouse"],
+            return snowflake.connector.connect(
+                account=os.getenv("SNOWFLAKE_ACCOUNT"),
+                user=os.getenv("SNOWFLAKE_USER"),
+                password=os.getenv("SNOWFLAKE_PASSWORD"),
+                role=os.getenv("SNOWFLAKE_ROLE"),
+                warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
                 autocommit=True,
             )
-            dbs = [d.strip() for d in (os.getenv("SNOWFLAKE_DATABASES") or "").split(",") if d.strip()]
-            return conn, dbs
         except Exception:
             # Missing dependency or invalid credentials → fall back
+            return None
+
+    def _get_conn(self):
+        conn = self._connect()
+        if conn is None:
             return None, None
+        dbs = [d.strip() for d in (os.getenv("SNOWFLAKE_DATABASES") or "").split(",") if d.strip()]
+        return conn, dbs
 
     def discover(self, last_seen_at: Optional[datetime] = None) -> DiscoverResult:
+        assets: List[Dict[str, Any]] = []
+        columns: List[Dict[str, Any]] = []
+        for chunk in self.discover_stream(last_seen_at=last_seen_at):
+            assets.extend(chunk.assets)
+            columns.extend(chunk.columns)
+        return DiscoverResult(assets=assets, columns=columns)
+
+    def discover_stream(self, last_seen_at: Optional[datetime] = None, chunk_size: Optional[int] = None) -> Iterator[DiscoverChunk]:
+        """
+        Like discover(), but fetches INFORMATION_SCHEMA rows with fetchmany(chunk_size).
+        Several databases are discovered concurrently on SNOWFLAKE_DISCOVER_WORKERS threads
+        (default 4), each with its own connection; chunks are yielded as they arrive.
+        """
+        size = chunk_size or discover_chunk_size()
         conn, dbs = self._get_conn()
         if not conn:
             # Fallback stub
-            return DiscoverResult(
+            yield DiscoverChunk(
                 assets=[{"system": "snowflake", "name": "db.schema.table"}],
-                columns=[{"asset": "db.schema.table", "name": "id", "data_type": "NUMBER"}],
+                columns=[{"system": "snowflake", "asset": "db.schema.table", "name": "id", "data_type": "NUMBER"}],
             )
+            return
 
-        assets: List[Dict[str, Any]] = []
-        columns: List[Dict[str, Any]] = []
-
-        # If no explicit DBs configured, rely on the current DB context
-        cursor = conn.cursor()
         try:
+            workers = max(1, int(os.getenv("SNOWFLAKE_DISCOVER_WORKERS", "4")))
+        except ValueError:
+            workers = 4
+        try:
+            # If no explicit DBs configured, rely on the current DB context
             if not dbs:
                 dbs = []
                 cur2 = conn.cursor()
@@ -80,111 +105,258 @@ class SnowflakeConnector(Connector):
                         dbs = [row[0]]
                 finally:
                     cur2.close()
+            if workers == 1 or len(dbs) <= 1:
+                for db in dbs:
+                    yield from self._discover_database(conn, db, last_seen_at, size)
+                return
+        finally:
+            conn.close()
+        yield from self._discover_parallel(dbs, last_seen_at, size, min(workers, len(dbs)))
+
+    def _discover_parallel(self, dbs: List[str], last_seen_at: Optional[datetime], size: int, workers: int) -> Iterator[DiscoverChunk]:
+        # Bounded hand-off queue: producers block once the consumer falls behind, so memory stays
+        # at a few chunks per worker however large the databases are.
+        out: queue.Queue = queue.Queue(maxsize=workers * 2)
+        stop = threading.Event()
+        local = threading.local()
+        conns: List[Any] = []
+        conns_lock = threading.Lock()
+        done = object()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    out.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
 
+        def work(db: str) -> None:
+            try:
+                conn = getattr(local, "conn", None)
+                if conn is None:
+                    conn = self._connect()
+                    if conn is None:
+                        raise RuntimeError(f"Snowflake connection failed while discovering {db}")
+                    local.conn = conn
+                    with conns_lock:
+                        conns.append(conn)
+                for chunk in self._discover_database(conn, db, last_seen_at, size):
+                    if not put(chunk):
+                        return
+            except BaseException as e:
+                put(e)
+            finally:
+                put(done)
+
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snowflake-discover")
+        try:
             for db in dbs:
-                # Snowflake requires fully-qualified references; use INFORMATION_SCHEMA for metadata
-                cursor.execute(f"USE DATABASE {db}")
-
-                # Tables with last_altered for incremental discovery
-                incr_clause = ""
-                params: Tuple[Any, ...] = tuple()
-                if last_seen_at:
-                    incr_clause = " WHERE last_altered >= TO_TIMESTAMP(%s)"
-                    params = (last_seen_at,)
-                cursor.execute(
-                    """
-                    SELECT table_catalog, table_schema, table_name, table_type, last_altered
-                    FROM INFORMATION_SCHEMA.TABLES
-                    %s
-                    """ % incr_clause,
-                    params,
-                )
-                for (catalog, schema, table, ttype, last_altered) in cursor.fetchall():
-                    fq = f"{catalog}.{schema}.{table}"
-                    assets.append({
-                        "system": "snowflake",
-                        "name": fq,
-                        "description": None,
-                        "type": ttype,
-                        "last_altered": last_altered.isoformat() if hasattr(last_altered, 'isoformat') else str(last_altered),
-                    })
-
-                # Columns
-                cursor.execute(
-                    """
-                    SELECT table_catalog, table_schema, table_name, column_name, data_type
-                    FROM INFORMATION_SCHEMA.COLUMNS
-                    """
-                )
-                for (catalog, schema, table, col, dtype) in cursor.fetchall():
-                    fq = f"{catalog}.{schema}.{table}"
-                    columns.append({
-                        "asset": fq,
-                        "name": col,
-                        "data_type": dtype,
-                    })
+                pool.submit(work, db)
+            remaining = len(dbs)
+            while remaining:
+                item = out.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    yield item
         finally:
-            cursor.close()
-            conn.close()
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+            for c in conns:
+                try:
+                    c.close()
+                except Exception:
+                    pass
 
-        return DiscoverResult(assets=assets, columns=columns)
+    def _discover_database(self, conn, db: str, last_seen_at: Optional[datetime], size: int) -> Iterator[DiscoverChunk]:
+        """Tables then columns of one database; the last chunk carries its timing (and coverage)."""
+        started = time.perf_counter()
+        cursor = conn.cursor()
+        try:
+            # Snowflake requires fully-qualified references; use INFORMATION_SCHEMA for metadata
+            cursor.execute(f"USE DATABASE {db}")
+            # Canonical (case-folded) name, matching table_catalog in asset names
+            cursor.execute("select current_database()")
+            row = cursor.fetchone()
+            catalog_name = row[0] if row and row[0] else db
+
+            # Tables with last_altered for incremental discovery
+            incr_clause = ""
+            params: Tuple[Any, ...] = tuple()
+            if last_seen_at:
+                incr_clause = " WHERE last_altered >= TO_TIMESTAMP(%s)"
+                params = (last_seen_at,)
+            cursor.execute(
+                """
+                SELECT table_catalog, table_schema, table_name, table_type, last_altered
+                FROM INFORMATION_SCHEMA.TABLES
+                %s
+                """ % incr_clause,
+                params,
+            )
+            if arrow.enabled(cursor):
+                for tbl in arrow.iter_batches(cursor, size):
+                    yield DiscoverChunk(assets=arrow.asset_records(tbl), columns=[])
+            else:
+                while True:
+                    rows = cursor.fetchmany(size)
+                    if not rows:
+                        break
+                    yield DiscoverChunk(
+                        assets=[
+                            {
+                                "system": "snowflake",
+                                "name": f"{catalog}.{schema}.{table}",
+                                "description": None,
+                                "type": ttype,
+                                "last_altered": last_altered.isoformat() if hasattr(last_altered, 'isoformat') else str(last_altered),
+                            }
+                            for (catalog, schema, table, ttype, last_altered) in rows
+                        ],
+                        columns=[],
+                    )
+
+            # Columns
+            cursor.execute(
+                """
+                SELECT table_catalog, table_schema, table_name, column_name, data_type
+                FROM INFORMATION_SCHEMA.COLUMNS
+                """
+            )
+            if arrow.enabled(cursor):
+                for tbl in arrow.iter_batches(cursor, size):
+                    yield DiscoverChunk(assets=[], columns=arrow.column_records(tbl))
+            else:
+                while True:
+                    rows = cursor.fetchmany(size)
+                    if not rows:
+                        break
+                    yield DiscoverChunk(
+                        assets=[],
+                        columns=[
+                            {
+                                "system": "snowflake",
+                                "asset": f"{catalog}.{schema}.{table}",
+                                "name": col,
+                                "data_type": dtype,
+                            }
+                            for (catalog, schema, table, col, dtype) in rows
+                        ],
+                    )
+        finally:
+            cursor.close()
+        # Full listing of this database: tables that vanished can be tombstoned
+        yield DiscoverChunk(
+            assets=[],
+            columns=[],
+            covered=[] if last_seen_at else [("snowflake", f"{catalog_name}.")],
+            timings={catalog_name: round(time.perf_counter() - started, 3)},
+        )
 
     def harvest(self, since: Optional[datetime] = None) -> HarvestResult:
+        """All pages of harvest_stream() in one result (memory grows with the window)."""
+        items: List[Dict[str, Any]] = []
+        payload: Dict[str, Any] = {}
+        last_seen_at: Optional[datetime] = None
+        for page in self.harvest_stream(since=since):
+            payload = page.payload
+            items.extend(page.payload.get("items", []))
+            last_seen_at = page.last_seen_at or last_seen_at
+        return HarvestResult(payload={**payload, "items": items}, last_seen_at=last_seen_at or _utcnow())
+
+    def harvest_stream(
+        self, since: Optional[datetime] = None, after_query_id: Optional[str] = None, parser: Optional[HarvestParser] = None
+    ) -> Iterator[HarvestPage]:
+        """
+        Walk ACCOUNT_USAGE.QUERY_HISTORY from the watermark (since, after_query_id) up to the
+        start of this harvest in pages of SNOWFLAKE_HARVEST_PAGE_SIZE rows (default 10000),
+        keyset-paginated on (END_TIME, QUERY_ID). Each page carries its last (END_TIME, QUERY_ID)
+        so callers can checkpoint and resume a crashed harvest. Without `since` the window
+        starts SNOWFLAKE_HARVEST_LOOKBACK_HOURS ago (default 168).
+
+        Statements are parsed through `parser` (connectors.sql_parse.HarvestParser), which
+        parses each normalized fingerprint once; pass one with a persistent store to share
+        parses across harvests. Each page reports its cache hits/misses under "parse_cache".
+        """
+        since = _as_datetime(since)
         conn, _ = self._get_conn()
         if not conn:
             # Fallback stub
-            if since is None:
-                since_str = None
-            elif hasattr(since, "isoformat"):
-                since_str = since.isoformat() + "Z"
-            else:
-                # already a string or other type; coerce to string safely
-                since_str = str(since)
             payload: Dict[str, Any] = {
                 "type": "snowflake",
                 "harvested_at": _utcnow().isoformat() + "Z",
-                "since": since_str,
+                "since": since.isoformat() + "Z" if since else None,
                 "items": [
                     {"asset": "db.schema.table", "row_count": 1000},
                 ],
             }
-            return HarvestResult(payload=payload, last_seen_at=_utcnow())
+            yield HarvestPage(payload=payload, last_seen_at=_utcnow())
+            return
 
-        items: List[Dict[str, Any]] = []
-        max_end_time: Optional[datetime] = None
+        try:
+            page_size = max(1, int(os.getenv("SNOWFLAKE_HARVEST_PAGE_SIZE", "10000")))
+            lookback = float(os.getenv("SNOWFLAKE_HARVEST_LOOKBACK_HOURS", "168"))
+        except ValueError:
+            page_size, lookback = 10000, 168.0
+        upper = _utcnow()
+        wm_time = since or (upper - timedelta(hours=lookback))
+        # "" sorts before every QUERY_ID, so the first page includes END_TIME == since as before
+        wm_id = after_query_id or ""
+
+        # Parse each statement fingerprint once (raw text only without sqlglot)
+        parser = parser or HarvestParser(dialect="snowflake")
 
         try:
             cur = conn.cursor()
-            # Query history; restrict to finalized queries and non-null text
-            if since:
-                # Normalize 'since' if it's a string (from SQLite or external input)
-                if isinstance(since, str):
-                    try:
-                        since = datetime.fromisoformat(since.replace("Z", "+00:00"))
-                    except Exception:
-                        since = None
+            while True:
+                # Query history; restrict to finalized queries and non-null text
                 cur.execute(
                     """
-                    SELECT QUERY_TEXT, START_TIME, END_TIME
+                    SELECT QUERY_ID, QUERY_TEXT, START_TIME, END_TIME
                     FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
-                    WHERE END_TIME >= TO_TIMESTAMP(%s)
-                      AND QUERY_TEXT IS NOT NULL
-                    ORDER BY END_TIME ASC
-                    LIMIT 10000
+                    WHERE QUERY_TEXT IS NOT NULL
+                      AND END_TIME <= TO_TIMESTAMP(%s)
+                      AND (END_TIME > TO_TIMESTAMP(%s) OR (END_TIME = TO_TIMESTAMP(%s) AND QUERY_ID > %s))
+                    ORDER BY END_TIME ASC, QUERY_ID ASC
+                    LIMIT %s
                     """,
-                    (since,),
+                    (upper, wm_time, wm_time, wm_id, page_size),
                 )
-            else:
-                cur.execute(
-                    """
-                    SELECT QUERY_TEXT, START_TIME, END_TIME
-                    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
-                    WHERE QUERY_TEXT IS NOT NULL
-                    ORDER BY END_TIME DESC
-                    LIMIT 10000
-                    """
+                items: List[Dict[str, Any]] = []
+                last: Optional[Tuple[Any, Any]] = None
+                if arrow.enabled(cur):
+                    # Items straight from the column lists; the watermark from the last batch
+                    for tbl in arrow.iter_batches(cur, page_size):
+                        if tbl.num_rows:
+                            items.extend(map(_history_entry, *arrow.history_columns(tbl)))
+                            last = arrow.last_row(tbl, 0, 3)
+                else:
+                    rows = cur.fetchall()
+                    items = [_history_entry(query_text, start_time, end_time) for (_, query_text, start_time, end_time) in rows]
+                    if rows:
+                        last = (rows[-1][0], rows[-1][3])
+                if last is None:
+                    break
+                cache = parser.annotate(items)
+                last_id, last_end = last
+                wm_time, wm_id = _as_datetime(last_end) or wm_time, last_id
+                yield HarvestPage(
+                    payload={
+                        "type": "snowflake",
+                        "harvested_at": _utcnow().isoformat() + "Z",
+                        "since": since.isoformat() + "Z" if since else None,
+                        "items": items,
+                        "parse_cache": cache,
+                    },
+                    last_seen_at=wm_time,
+                    last_query_id=wm_id,
                 )
-            rows = cur.fetchall()
+                if len(items) < page_size:
+                    break
         finally:
             try:
                 cur.close()
@@ -192,47 +364,26 @@ class SnowflakeConnector(Connector):
                 pass
             conn.close()
 
-        # Parse SQL with sqlglot when available; otherwise include raw text only
-        sources: List[str] = []
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    """Naive UTC datetime from a datetime or ISO string (SQLite hands timestamps back as text)."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
         try:
-            import sqlglot
-            from sqlglot import exp
-        except Exception:
-            sqlglot = None  # type: ignore
-            exp = None  # type: ignore
-
-        for (query_text, start_time, end_time) in rows:
-            end_dt = end_time if isinstance(end_time, datetime) else None
-            if end_dt and (max_end_time is None or end_dt > max_end_time):
-                max_end_time = end_dt
-
-            entry: Dict[str, Any] = {
-                "query_text": query_text,
-                "start_time": start_time.isoformat() if hasattr(start_time, 'isoformat') else str(start_time),
-                "end_time": end_time.isoformat() if hasattr(end_time, 'isoformat') else str(end_time),
-            }
-            if sqlglot:
-                try:
-                    parsed = sqlglot.parse_one(query_text, dialect="snowflake")
-                    # Collect referenced table identifiers
-                    tbls = set()
-                    for node in parsed.find_all(exp.Table):  # type: ignore[attr-defined]
-                        name = ".".join(filter(None, [getattr(node, 'catalog', None), getattr(node, 'db', None), getattr(node, 'name', None)]))
-                        if not name:
-                            # Fallback to table name only
-                            name = getattr(node, 'name', None) or None
-                        if name:
-                            tbls.add(name)
-                    entry["tables"] = sorted(tbls)
-                except Exception:
-                    # best-effort only
-                    entry["tables"] = []
-            items.append(entry)
-
-        payload: Dict[str, Any] = {
-            "type": "snowflake",
-            "harvested_at": _utcnow().isoformat() + "Z",
-            "since": since.isoformat() + "Z" if since else None,
-            "items": items,
-        }
-        return HarvestResult(payload=payload, last_seen_at=max_end_time or _utcnow())
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _history_entry(query_text: str, start_time: Any, end_time: Any) -> Dict[str, Any]:
+    return {
+        "query_text": query_text,
+        "start_time": start_time.isoformat() if hasattr(start_time, 'isoformat') else str(start_time),
+        "end_time": end_time.isoformat() if hasattr(end_time, 'isoformat') else str(end_time),
+    }
@@ -0,0 +1,234 @@
+"""
+Parse-once cache for harvested SQL.
+
+Query history is dominated by a few thousand parameterized statements run over and over, so
+every statement is reduced to a fingerprint (literals replaced by `?`, comments dropped,
+whitespace collapsed, IN lists folded) and only the first statement of each fingerprint is
+parsed with sqlglot. Results live in a bounded in-process LRU (HARVEST_PARSE_CACHE_SIZE,
+default 50000) in front of an optional persistent store (workers/parse_cache.py keeps them in
+the `query_parse` table), so repeat statements skip parsing across scans and workers.
+
+Literals never name tables, so statements sharing a fingerprint share their parse. Identifier
+case is kept as written because the extracted table names keep it too.
+
+Tables and lineage targets are extracted by the same rules as the lineage endpoints
+(backend.sql_lineage), and cache misses are parsed in order, in chunks, on the same process
+pool, sized by HARVEST_PARSE_WORKERS (default cpu count). Each statement gets
+HARVEST_PARSE_TIMEOUT seconds (default 10, 0 disables); one that runs over is recorded with
+empty lists and "timed_out": true instead of stalling the scan. Timed-out parses stay in the
+in-process LRU only: they are never written to the store, so another worker or a later scan
+(possibly with a higher timeout) tries them again.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Sequence
+
+from backend.sql_lineage import (
+    _parse_workers,
+    call_with_timeout,
+    chunked,
+    lineage_targets,
+    map_chunks,
+    referenced_tables,
+    sqlglot,
+)
+
+
+# One left-to-right scan so quotes inside comments (and comment markers inside strings) are
+# classified by whichever token starts first
+_TOKEN = re.compile(
+    r"""(?P<string>'(?:[^'\\]|\\.|'')*')"""
+    r"""|(?P<ident>"(?:[^"]|"")*")"""
+    r"""|(?P<comment>--[^\n]*|//[^\n]*|/\*.*?\*/)"""
+    r"""|(?P<number>(?<![\w$.])\d+(?:\.\d*)?(?:[eE][-+]?\d+)?(?![\w$]))""",
+    re.S,
+)
+_WS = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def _token(m: re.Match) -> str:
+    if m.lastgroup == "ident":
+        return m.group(0)
+    return " " if m.lastgroup == "comment" else "?"
+
+
+def normalize(sql: str) -> str:
+    """Statement text with literals as `?`, comments dropped and whitespace collapsed."""
+    text = _WS.sub(" ", _TOKEN.sub(_token, sql or "")).strip().rstrip(";").strip()
+    return _IN_LIST.sub("(?)", text)
+
+
+def fingerprint(sql: str, dialect: Optional[str] = None) -> str:
+    return hashlib.sha256(f"{dialect or ''}\0{normalize(sql)}".encode("utf-8")).hexdigest()
+
+
+def parse_statement(sql: str, dialect: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Tables referenced by one statement, plus lineage for INSERT / CTAS / MERGE:
+    {"tables": [...], "targets": [...], "sources": [...]}. Unparseable SQL yields empty lists.
+    """
+    try:
+        parsed = sqlglot.parse_one(sql, dialect=dialect)
+        tables = set(referenced_tables(parsed))
+        targets = {fq for _, fq in lineage_targets(parsed)}
+    except Exception:
+        # best-effort only
+        return {"tables": [], "targets": [], "sources": []}
+    return {"tables": sorted(tables), "targets": sorted(targets), "sources": sorted(tables - targets)}
+
+
+def _timed_out() -> Dict[str, Any]:
+    return {"tables": [], "targets": [], "sources": [], "timed_out": True}
+
+
+def _parse_chunk(statements: Sequence[str], dialect: Optional[str], timeout: float) -> List[Dict[str, Any]]:
+    return [call_with_timeout(parse_statement, timeout, _timed_out, sql, dialect) for sql in statements]
+
+
+def _parse_timeout() -> float:
+    try:
+        return max(0.0, float(os.getenv("HARVEST_PARSE_TIMEOUT", "10")))
+    except ValueError:
+        return 10.0
+
+
+def _timed_out_chunk(statements: Sequence[str]) -> List[Dict[str, Any]]:
+    return [_timed_out() for _ in statements]
+
+
+def parse_many(statements: Sequence[str], dialect: Optional[str] = None, min_parallel: int = 64) -> List[Dict[str, Any]]:
+    """
+    parse_statement() for each statement, in order. With HARVEST_PARSE_WORKERS > 1 and at least
+    `min_parallel` statements, chunks are parsed on the shared pool (backend.sql_lineage.map_chunks);
+    small batches parse inline. A chunk that outlives its statements' combined timeouts (plus
+    slack) is recorded as timed out and the chunks still pending go to a fresh pool.
+    """
+    timeout = _parse_timeout()
+    workers = _parse_workers("HARVEST_PARSE_WORKERS")
+    if workers <= 1 or len(statements) < min_parallel:
+        return _parse_chunk(statements, dialect, timeout)
+    deadline = (lambda chunk: timeout * len(chunk) + 30) if timeout else None
+    chunks = map_chunks(
+        _parse_chunk, chunked(statements, workers), (dialect, timeout), workers, deadline, _timed_out_chunk
+    )
+    return [p for chunk in chunks for p in chunk]
+
+
+class ParseStore(Protocol):
+    """Persistent fingerprint -> parse mapping shared across scans."""
+
+    def load(self, fingerprints: List[str]) -> Dict[str, Dict[str, Any]]: ...
+
+    def save(self, entries: Dict[str, tuple[str, Dict[str, Any]]]) -> None: ...
+
+
+def _cache_size() -> int:
+    try:
+        return max(0, int(os.getenv("HARVEST_PARSE_CACHE_SIZE", "50000")))
+    except ValueError:
+        return 50000
+
+
+class _LRU:
+    def __init__(self) -> None:
+        self._data: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            val = self._data.get(key)
+            if val is not None:
+                self._data.move_to_end(key)
+            return val
+
+    def put(self, key: str, val: Dict[str, Any]) -> None:
+        size = _cache_size()
+        with self._lock:
+            self._data[key] = val
+            self._data.move_to_end(key)
+            while len(self._data) > size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_memory = _LRU()
+
+
+class HarvestParser:
+    """
+    Annotates harvested query-history items with their fingerprint and parse, parsing each
+    fingerprint at most once. `stats` counts items answered from a cache (memory or store)
+    versus parsed for this parser's lifetime, i.e. one harvest.
+    """
+
+    def __init__(self, store: Optional[ParseStore] = None, dialect: Optional[str] = None):
+        self.store = store
+        self.dialect = dialect
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 4) if total else None}
+
+    def annotate(self, items: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """Set "fingerprint" (and "tables", "targets", "sources" when sqlglot is installed) in place."""
+        items = list(items)
+        by_fp: Dict[str, List[Dict[str, Any]]] = {}
+        for item in items:
+            fp = fingerprint(item.get("query_text") or "", self.dialect)
+            item["fingerprint"] = fp
+            by_fp.setdefault(fp, []).append(item)
+        if sqlglot is None or not by_fp:
+            return {"hits": 0, "misses": 0}
+
+        found: Dict[str, Dict[str, Any]] = {}
+        for fp in by_fp:
+            val = _memory.get(fp)
+            if val is not None:
+                found[fp] = val
+        missing = [fp for fp in by_fp if fp not in found]
+        if missing and self.store is not None:
+            for fp, val in self.store.load(missing).items():
+                # Stored by an older version: parse again instead of skipping it for good
+                if val.get("timed_out"):
+                    continue
+                found[fp] = val
+                _memory.put(fp, val)
+
+        todo = [fp for fp in by_fp if fp not in found]
+        sqls = [by_fp[fp][0].get("query_text") or "" for fp in todo]
+        parsed: Dict[str, tuple[str, Dict[str, Any]]] = {}
+        for fp, sql, val in zip(todo, sqls, parse_many(sqls, self.dialect)):
+            found[fp] = val
+            _memory.put(fp, val)
+            # Timed-out statements cost the timeout once per process, but are not persisted
+            if not val.get("timed_out"):
+                parsed[fp] = (sql, val)
+        if parsed and self.store is not None:
+            self.store.save(parsed)
+
+        # The first item of a newly parsed fingerprint is the miss; every other item is a hit
+        misses = len(todo)
+        hits = len(items) - misses
+        self.hits += hits
+        self.misses += misses
+        for fp, group in by_fp.items():
+            for item in group:
+                item.update(found[fp])
+        return {"hits": hits, "misses": misses}
+
+
+def clear_memory() -> None:
+    """Drop the in-process tier (tests, or after the store is purged)."""
+    _memory.clear()
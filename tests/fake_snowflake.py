@@ -0,0 +1,136 @@
+"""
+Local stand-in for the `snowflake.connector` module, serving INFORMATION_SCHEMA from dicts.
+
+    install(monkeypatch, {"DB1": {"S.T": ["A", "B"]}})
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import types
+from datetime import datetime
+
+
+class FakeCursor:
+    def __init__(self, conn: "FakeConnection"):
+        self.conn = conn
+        self.rows: list[tuple] = []
+        self.pos = 0
+
+    def execute(self, sql: str, params=()):
+        text = " ".join(sql.split())
+        upper = text.upper()
+        self.rows, self.pos = [], 0
+        if upper.startswith("USE DATABASE "):
+            self.conn.database = text.split()[-1].upper()
+            self.conn.account.used.append((threading.get_ident(), id(self.conn), self.conn.database))
+            time.sleep(self.conn.account.latency)
+        elif upper == "SELECT CURRENT_DATABASE()":
+            self.rows = [(self.conn.database,)]
+        elif "INFORMATION_SCHEMA.TABLES" in upper:
+            db = self.conn.database
+            self.rows = [
+                (db, t.split(".")[0], t.split(".")[1], "BASE TABLE", datetime(2024, 1, 1, 12, 30))
+                for t in self.conn.account.dbs[db]
+            ]
+        elif "INFORMATION_SCHEMA.COLUMNS" in upper:
+            db = self.conn.database
+            self.rows = [
+                (db, t.split(".")[0], t.split(".")[1], c, "NUMBER")
+                for t, cols in self.conn.account.dbs[db].items()
+                for c in cols
+            ]
+        elif "ACCOUNT_USAGE.QUERY_HISTORY" in upper:
+            account = self.conn.account
+            account.history_queries += 1
+            if account.fail_on_page and account.history_queries == account.fail_on_page:
+                raise RuntimeError("injected QUERY_HISTORY failure")
+            end_max, wm_time, _, wm_id, limit = params
+            rows = sorted(
+                (r for r in account.history if r[3] <= end_max and (r[3] > wm_time or (r[3] == wm_time and r[0] > wm_id))),
+                key=lambda r: (r[3], r[0]),
+            )
+            self.rows = rows[:limit]
+        else:
+            raise NotImplementedError(text)
+        return self
+
+    def fetchone(self):
+        row = self.rows[self.pos] if self.pos < len(self.rows) else None
+        self.pos += 1
+        return row
+
+    def fetchmany(self, size: int):
+        out = self.rows[self.pos : self.pos + size]
+        self.pos += len(out)
+        return out
+
+    def fetchall(self):
+        return self.fetchmany(len(self.rows))
+
+    def close(self):
+        pass
+
+
+class FakeArrowCursor(FakeCursor):
+    """Cursor of a connector installed with the pyarrow extra: results in Arrow batches."""
+
+    def fetch_arrow_batches(self):
+        import pyarrow as pa
+
+        rows, self.pos = self.rows[self.pos :], len(self.rows)
+        batch = self.conn.account.arrow_batch
+        for i in range(0, len(rows), batch):
+            part = rows[i : i + batch]
+            yield pa.table({f"C{j}": [r[j] for r in part] for j in range(len(part[0]))})
+
+
+class FakeConnection:
+    def __init__(self, account: "FakeAccount"):
+        self.account = account
+        self.database = next(iter(account.dbs), None)
+        self.closed = False
+
+    def cursor(self):
+        return FakeArrowCursor(self) if self.account.arrow_batch else FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAccount:
+    def __init__(self, dbs: dict[str, dict[str, list[str]]], latency: float = 0.0, arrow_batch: int = 0):
+        self.dbs = {k.upper(): v for k, v in dbs.items()}
+        self.latency = latency
+        self.arrow_batch = arrow_batch
+        self.connections: list[FakeConnection] = []
+        # QUERY_HISTORY rows: (query_id, query_text, start_time, end_time)
+        self.history: list[tuple[str, str, datetime, datetime]] = []
+        self.history_queries = 0
+        self.fail_on_page = 0
+        self.used: list[tuple[int, int, str]] = []
+
+    def connect(self, **kwargs) -> FakeConnection:
+        conn = FakeConnection(self)
+        self.connections.append(conn)
+        return conn
+
+
+def install(monkeypatch, dbs: dict[str, dict[str, list[str]]], latency: float = 0.0, arrow_batch: int = 0) -> FakeAccount:
+    """
+    Register the fake module and enable the connector for every database in `dbs`. With
+    `arrow_batch`, cursors also serve fetch_arrow_batches() in batches of that many rows.
+    """
+    account = FakeAccount(dbs, latency, arrow_batch)
+    pkg = types.ModuleType("snowflake")
+    connector = types.ModuleType("snowflake.connector")
+    connector.connect = account.connect  # type: ignore[attr-defined]
+    pkg.connector = connector  # type: ignore[attr-defined]
+    monkeypatch.setitem(sys.modules, "snowflake", pkg)
+    monkeypatch.setitem(sys.modules, "snowflake.connector", connector)
+    monkeypatch.setenv("SNOWFLAKE_ENABLED", "1")
+    monkeypatch.setenv("SNOWFLAKE_ACCOUNT", "fake")
+    monkeypatch.setenv("SNOWFLAKE_USER", "fake")
+    monkeypatch.setenv("SNOWFLAKE_DATABASES", ",".join(dbs))
+    return account
@@ -0,0 +1,81 @@
+"""
+Local OIDC issuer for auth tests: serves a discovery document and a JWKS over HTTP on
+127.0.0.1 and mints RS256 tokens with its keys. Keys can be rotated; requests are counted.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+
+class StubIssuer:
+    def __init__(self, audience: str = "api://cdgc-lite", latency: float = 0.0):
+        self.audience = audience
+        self.latency = latency
+        self.keys: dict[str, Any] = {}
+        self.published: list[str] = []
+        self.hits: dict[str, int] = {"discovery": 0, "jwks": 0}
+        self._lock = threading.Lock()
+        issuer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802
+                if self.path.endswith("/.well-known/openid-configuration"):
+                    kind, body = "discovery", {"issuer": issuer.url, "jwks_uri": issuer.url + "/keys"}
+                elif self.path.endswith("/keys"):
+                    kind, body = "jwks", issuer.jwks()
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                with issuer._lock:
+                    issuer.hits[kind] += 1
+                if issuer.latency:
+                    time.sleep(issuer.latency)
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/tenant"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.rotate()
+
+    def rotate(self, keep_old: bool = False) -> str:
+        """Publish a new signing key (optionally alongside the current ones); returns its kid."""
+        kid = f"k{len(self.keys) + 1}"
+        self.keys[kid] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.published = (self.published if keep_old else []) + [kid]
+        return kid
+
+    def jwks(self) -> dict:
+        keys = []
+        for kid in self.published:
+            jwk = json.loads(RSAAlgorithm.to_jwk(self.keys[kid].public_key()))
+            keys.append({**jwk, "kid": kid, "use": "sig", "alg": "RS256"})
+        return {"keys": keys}
+
+    def token(self, kid: str | None = None, ttl: int = 300, header_kid: str | None = None, **claims) -> str:
+        """A token signed with `kid` (default: newest key); `header_kid` overrides the advertised kid."""
+        kid = kid or self.published[-1]
+        now = int(time.time())
+        body = {"iss": self.url, "aud": self.audience, "sub": "user-1", "iat": now, "exp": now + ttl, **claims}
+        return jwt.encode(body, self.keys[kid], algorithm="RS256", headers={"kid": header_kid or kid})
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from backend.models import ScanArtifactChunk
+from workers import artifacts
+from workers.artifacts import iter_items, read_manifest, write_artifact
+
+
+def test_chunked_artifact_round_trip(db_session: Session, monkeypatch):
+    monkeypatch.setenv("ARTIFACT_CHUNK_ITEMS", "4")
+    monkeypatch.setenv("ARTIFACT_CODEC", "gzip")
+    items = [{"query_text": f"SELECT {i} FROM db.s.t WHERE note = '{'x' * 200}'"} for i in range(10)]
+    conn = db_session.connection()
+    aid = write_artifact(conn, "snowflake", {"type": "snowflake", "items": items}, datetime.utcnow())
+
+    manifest = read_manifest(conn, aid)
+    assert manifest["type"] == "snowflake" and "items" not in manifest
+    m = manifest["manifest"]
+    assert (m["codec"], m["chunks"], m["items"]) == ("gzip", 3, 10)
+    assert m["stored_bytes"] < m["raw_bytes"]
+    counts = [c.item_count for c in db_session.query(ScanArtifactChunk).filter_by(artifact_id=aid).order_by(ScanArtifactChunk.seq)]
+    assert counts == [4, 4, 2]
+    assert list(iter_items(conn, aid)) == items
+    db_session.rollback()
+
+
+def test_reader_streams_one_chunk_at_a_time(db_session: Session, monkeypatch):
+    monkeypatch.setenv("ARTIFACT_CHUNK_ITEMS", "2")
+    conn = db_session.connection()
+    aid = write_artifact(conn, "snowflake", {"items": list(range(6))}, datetime.utcnow())
+    seen = []
+    real = artifacts._decompress
+    monkeypatch.setattr(artifacts, "_decompress", lambda codec, data: seen.append(1) or real(codec, data))
+    it = iter_items(conn, aid)
+    assert [next(it), next(it), next(it)] == [0, 1, 2]
+    assert len(seen) == 2
+    db_session.rollback()
+
+
+def test_legacy_inline_artifacts_are_readable(db_session: Session):
+    conn = db_session.connection()
+    conn.execute(
+        text("INSERT INTO scan_artifact(source, payload, created_at, updated_at) VALUES ('pg', :p, :now, :now)"),
+        {"p": json.dumps({"type": "pg", "items": [{"asset": "a"}]}), "now": datetime.utcnow()},
+    )
+    aid = conn.execute(text("SELECT max(id) FROM scan_artifact")).scalar()
+    assert list(iter_items(conn, aid)) == [{"asset": "a"}]
+    assert read_manifest(conn, aid) == {"type": "pg"}
+    db_session.rollback()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import random
+
+from sqlalchemy.orm import Session
+
+from backend.lineage_persist import AssetNameIndex, resolve_pair
+from backend.models import System, Asset
+
+
+def _brute_force(index: AssetNameIndex, source: str, target: str):
+    # Reference: the original O(|t|*|s|) pairing over every candidate
+    t_cands, s_cands = index.candidates(target), index.candidates(source)
+    for same_system in (True, False):
+        best, best_score = None, (-1, -1)
+        for tid, tsys, t_exact in t_cands:
+            for sid, ssys, s_exact in s_cands:
+                if sid == tid or (same_system and tsys != ssys):
+                    continue
+                score = (int(t_exact) + int(s_exact), min(sid, tid))
+                if score > best_score:
+                    best, best_score = (sid, tid), score
+        if best:
+            return best
+    return None
+
+
+def test_resolve_pair_matches_exhaustive_pairing():
+    rnd = random.Random(3)
+    names = ["a", "b", "db.a", "db.b", "x.db.a", "c"]
+    rows = [(i, rnd.choice(names), rnd.randint(1, 4)) for i in range(300, 0, -1)]
+    index = AssetNameIndex(rows)
+    for s in names + ["missing"]:
+        for t in names:
+            assert resolve_pair(index, s, t) == _brute_force(index, s, t), (s, t)
+
+
+def test_current_index_reloads_on_asset_change(db_session: Session):
+    sys = System(name="name_index_sys")
+    db_session.add(sys)
+    db_session.commit()
+    first = AssetNameIndex.current(db_session)
+    assert AssetNameIndex.current(db_session) is first
+
+    db_session.add(Asset(system_id=sys.id, name="name_index_new"))
+    db_session.commit()
+    second = AssetNameIndex.current(db_session)
+    assert second is not first
+    assert second.candidates("name_index_new")
+
+    # Hard deletes move neither maximum; committed ORM deletes bump the version instead
+    old, mid = Asset(system_id=sys.id, name="name_index_old"), Asset(system_id=sys.id, name="name_index_mid")
+    db_session.add_all([old, mid, Asset(system_id=sys.id, name="name_index_newer")])
+    db_session.commit()
+    third = AssetNameIndex.current(db_session)
+    db_session.delete(old)
+    db_session.commit()
+    fourth = AssetNameIndex.current(db_session)
+    assert fourth is not third and not fourth.by_name.get("name_index_old")
+    db_session.query(Asset).filter(Asset.name == "name_index_mid").delete()
+    db_session.commit()
+    fifth = AssetNameIndex.current(db_session)
+    assert fifth is not fourth and not fifth.by_name.get("name_index_mid")
+    # ...but a rolled-back one does not
+    db_session.query(Asset).filter(Asset.name == "name_index_newer").delete()
+    db_session.rollback()
+    assert AssetNameIndex.current(db_session) is fifth
+
+
+def test_current_index_reloads_outside_the_lock(db_session: Session, monkeypatch):
+    import threading
+
+    first = AssetNameIndex.current(db_session)
+    sys = System(name="name_index_lock_sys")
+    db_session.add(sys)
+    db_session.add(Asset(system=sys, name="name_index_lock"))
+    db_session.commit()
+
+    started, release = threading.Event(), threading.Event()
+    real = AssetNameIndex.load.__func__
+
+    def slow_load(cls, db):
+        started.set()
+        release.wait(10)
+        return real(cls, db)
+
+    monkeypatch.setattr(AssetNameIndex, "load", classmethod(slow_load))
+    result: list = []
+
+    def reload() -> None:
+        with Session(db_session.bind) as db:
+            result.append(AssetNameIndex.current(db))
+
+    reloader = threading.Thread(target=reload)
+    reloader.start()
+    assert started.wait(10)
+    # Another resolver is not blocked behind the reload: it keeps the previous index
+    assert AssetNameIndex.current(db_session) is first
+    release.set()
+    reloader.join(10)
+    assert result[0] is not first and result[0].by_name.get("name_index_lock")
+
+
+def test_bucket_memo_is_bounded(monkeypatch):
+    monkeypatch.setenv("ASSET_NAME_BUCKETS_MAX", "2")
+    index = AssetNameIndex([(3, "a", 1), (2, "b", 1), (1, "c", 1)])
+    for name in ("a", "b", "c", "missing"):
+        index.buckets(name)
+    assert list(index._buckets) == ["c", "missing"]
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+
+from sqlalchemy.orm import Session
+
+from backend.models import System, Asset, ColumnModel
+from connectors.base import Connector, DiscoverChunk, DiscoverResult, HarvestResult
+from workers import app as worker_app
+
+
+class _ListConnector(Connector):
+    def discover(self, last_seen_at=None):
+        return DiscoverResult(
+            assets=[{"system": "list_sys", "name": f"t{i}"} for i in range(3)],
+            columns=[{"asset": f"t{i}", "name": f"c{j}"} for i in range(3) for j in range(2)],
+        )
+
+
+def test_default_discover_stream_slices_and_tags_system():
+    chunks = list(_ListConnector().discover_stream(chunk_size=4))
+    assert [(len(c.assets), len(c.columns)) for c in chunks] == [(3, 0), (0, 4), (0, 2)]
+    assert all(col["system"] == "list_sys" for c in chunks for col in c.columns)
+
+
+class _StreamingConnector(Connector):
+    """Columns of `wide` span two chunks; each chunk checks the previous one was committed."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def _committed_columns(self) -> int:
+        with Session(self.engine) as s:
+            return s.query(ColumnModel).join(Asset).join(System).filter(System.name == "stream_sys").count()
+
+    def discover_stream(self, last_seen_at=None, chunk_size=None):
+        yield DiscoverChunk(assets=[{"system": "stream_sys", "name": "wide"}], columns=[])
+        yield DiscoverChunk(
+            assets=[], columns=[{"system": "stream_sys", "asset": "wide", "name": f"c{i}"} for i in range(3)]
+        )
+        assert self._committed_columns() == 3
+        yield DiscoverChunk(
+            assets=[], columns=[{"system": "stream_sys", "asset": "wide", "name": f"c{i}"} for i in range(3, 5)]
+        )
+
+    def harvest(self, since=None):
+        return HarvestResult(payload={"type": "stream"}, last_seen_at=None)
+
+
+def test_run_scan_commits_per_chunk(db_session: Session, monkeypatch):
+    os.environ["DATABASE_URL"] = str(db_session.bind.url)
+    monkeypatch.setattr(worker_app, "get_connector", lambda source: _StreamingConnector(db_session.bind))
+    worker_app.run_scan.apply(args=("stream", None)).get()
+
+    wide = db_session.query(Asset).join(System).filter(System.name == "stream_sys", Asset.name == "wide").one()
+    assert wide.column_names == "c0,c1,c2,c3,c4"
+
+
+class _CoveringConnector(Connector):
+    def __init__(self, tables: dict[str, list[str]], covered):
+        self.tables, self.covered = tables, covered
+
+    def discover_stream(self, last_seen_at=None, chunk_size=None):
+        yield DiscoverChunk(
+            assets=[{"system": "tomb_sys", "name": t} for t in self.tables],
+            columns=[{"system": "tomb_sys", "asset": t, "name": c} for t, cols in self.tables.items() for c in cols],
+        )
+        yield DiscoverChunk(assets=[], columns=[], covered=self.covered)
+
+    def harvest(self, since=None):
+        return HarvestResult(payload={"type": "tomb"}, last_seen_at=None)
+
+
+def test_scan_tombstones_only_covered_namespaces(db_session: Session, monkeypatch):
+    os.environ["DATABASE_URL"] = str(db_session.bind.url)
+
+    def scan(tables, covered):
+        monkeypatch.setattr(worker_app, "get_connector", lambda source: _CoveringConnector(tables, covered))
+        return worker_app.run_scan.apply(args=("tomb", None)).get()
+
+    scan({"DB1.s.a": ["x", "y"], "DB1.s.b": ["z"], "DB2.s.c": ["w"]}, [("tomb_sys", "DB1.")])
+    sys = db_session.query(System).filter(System.name == "tomb_sys").one()
+    manual = Asset(system_id=sys.id, name="DB1.s.manual")  # never listed by a scan
+    db_session.add(manual)
+    db_session.commit()
+
+    # Incremental scan listing a subset and covering nothing: no tombstones
+    assert scan({"DB1.s.a": ["x"]}, [])["tombstoned"] == {"assets": 0, "columns": 0}
+
+    # Full listing of DB1 without b and a.y; DB2 is not covered, so c survives
+    result = scan({"DB1.s.a": ["x"]}, [("tomb_sys", "DB1.")])
+    assert result["tombstoned"] == {"assets": 1, "columns": 2}
+
+    db_session.expire_all()
+    live = {
+        a.name: a.column_names
+        for a in db_session.query(Asset).filter(Asset.system_id == sys.id, Asset.deleted_at.is_(None))
+    }
+    assert live == {"DB1.s.a": "x", "DB2.s.c": "w", "DB1.s.manual": None}
+    b = db_session.query(Asset).filter(Asset.system_id == sys.id, Asset.name == "DB1.s.b").one()
+    assert db_session.query(ColumnModel).filter(ColumnModel.asset_id == b.id, ColumnModel.deleted_at.is_(None)).count() == 0
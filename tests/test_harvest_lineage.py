@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from backend.models import Asset, LineageClosure, LineageEdge, ScanJob, System
+from connectors.sql_parse import clear_memory, fingerprint
+from fake_snowflake import install
+from workers.app import run_scan
+
+T0 = datetime.utcnow() - timedelta(hours=1)
+
+HISTORY = [f"insert into hl.s.clean select * from hl.s.raw where d = {i}" for i in range(5)] + [
+    "CREATE TABLE HL.S.MART AS SELECT * FROM HL.S.CLEAN",
+    "MERGE INTO HL.S.MART USING HL.S.MISSING m ON MART.ID = m.ID WHEN MATCHED THEN UPDATE SET MART.ID = m.ID",
+    "SELECT * FROM HL.S.MART",
+]
+
+
+def _scan(db_session: Session) -> dict:
+    job = ScanJob(source="snowflake", status="pending", last_seen_at=T0)
+    db_session.add(job)
+    db_session.commit()
+    return run_scan.apply(args=("snowflake", job.id)).get()
+
+
+def test_harvest_derives_deduplicated_edges(db_session: Session, monkeypatch):
+    os.environ["DATABASE_URL"] = str(db_session.bind.url)
+    clear_memory()
+    account = install(monkeypatch, {"HL": {"S.RAW": ["ID"], "S.CLEAN": ["ID"], "S.MART": ["ID"]}})
+    account.history = [(f"q{i}", sql, T0, T0 + timedelta(seconds=i)) for i, sql in enumerate(HISTORY)]
+
+    first = _scan(db_session)
+    assert first["lineage"] == {"statements": 3, "created": 2, "unresolved": 1}
+
+    sid = db_session.query(System.id).filter_by(name="snowflake").scalar()
+    ids = {a.name: a.id for a in db_session.query(Asset).filter(Asset.system_id == sid, Asset.name.like("HL.S.%"))}
+    edges = db_session.query(LineageEdge).filter(LineageEdge.predicate == "harvest").all()
+    got = {(e.src_asset_id, e.dst_asset_id): e for e in edges}
+    assert set(got) == {(ids["HL.S.RAW"], ids["HL.S.CLEAN"]), (ids["HL.S.CLEAN"], ids["HL.S.MART"])}
+    assert all(e.confidence == 90 and e.dst_column is None for e in edges)
+    assert got[(ids["HL.S.RAW"], ids["HL.S.CLEAN"])].query_fingerprint == fingerprint(HISTORY[0], "snowflake")
+    # The closure picked up the two-hop path
+    assert db_session.get(LineageClosure, (ids["HL.S.RAW"], ids["HL.S.MART"])).min_distance == 2
+
+    # Overlapping re-harvest: resolved statements are skipped, only the MERGE is retried
+    second = _scan(db_session)
+    assert second["lineage"] == {"statements": 1, "created": 0, "unresolved": 1}
+    assert db_session.query(LineageEdge).filter(LineageEdge.predicate == "harvest").count() == 2
+
+    # Leave the shared database without edges for the global graph tests
+    for e in db_session.query(LineageEdge).filter(LineageEdge.predicate == "harvest"):
+        db_session.delete(e)
+    db_session.commit()
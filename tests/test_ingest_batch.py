@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from celery import Celery
+
+from backend.models import ScanJob
+from backend.routers import ingest
+
+
+def test_batch_enqueue_reuses_idempotency_keys(client, db_session):
+    first = client.post("/ingest/snowflake/scan", json={"idempotency_key": "batch-k1"}).json()["job_id"]
+    before = db_session.query(ScanJob).count()
+
+    r = client.post(
+        "/ingest/scan/batch",
+        json={
+            "scans": [
+                {"source": "snowflake", "idempotency_key": "batch-k1"},
+                {"source": "snowflake", "idempotency_key": "batch-k2"},
+                {"source": "snowflake", "idempotency_key": "batch-k2"},
+                {"source": "s3"},
+            ]
+        },
+    )
+    assert r.status_code == 202
+    jobs = r.json()["jobs"]
+    assert jobs[0]["job_id"] == first and jobs[0]["reused"] is True
+    assert jobs[1]["job_id"] == jobs[2]["job_id"] and [j["reused"] for j in jobs[1:3]] == [False, True]
+    assert jobs[3]["reused"] is False and jobs[3]["job_id"] not in {first, jobs[1]["job_id"]}
+    assert db_session.query(ScanJob).count() == before + 2
+    db_session.expire_all()
+    assert db_session.get(ScanJob, jobs[3]["job_id"]).status == "success"
+
+
+def test_batch_publishes_through_one_producer(client, monkeypatch):
+    app = Celery("cdgc_lite_test", broker="memory://")
+    sent = []
+    monkeypatch.setattr(app, "send_task", lambda name, args=None, producer=None, **kw: sent.append((args, producer)))
+    monkeypatch.setattr(ingest, "_celery_app", app)
+    assert ingest._get_celery() is app
+
+    r = client.post("/ingest/scan/batch", json={"scans": [{"source": "s3"}, {"source": "postgres"}]})
+    assert r.status_code == 202
+    assert [a[0] for a, _ in sent] == ["s3", "postgres"]
+    assert sent[0][1] is not None and sent[0][1] is sent[1][1]
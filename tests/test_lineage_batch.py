@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import io
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from backend.models import System, Asset, LineageEdge
+from backend.sql_lineage import parse_many, parse_sql_lineage
+
+
+def _lines(r) -> list[dict]:
+    return [json.loads(line) for line in r.text.splitlines() if line]
+
+
+def test_lineage_sql_batch_persists_in_one_pass(client: TestClient, db_session: Session):
+    sys = System(name="batch_sys")
+    db_session.add(sys)
+    db_session.commit()
+    raw, stg, mart = (Asset(system_id=sys.id, name=n) for n in ("batch_raw", "batch_stg", "batch_mart"))
+    db_session.add_all([raw, stg, mart])
+    db_session.commit()
+
+    payload = {
+        "statements": [
+            {"id": "stg", "sql": "create table batch_stg as select * from batch_raw"},
+            "insert into batch_mart select * from batch_stg",
+            # duplicate of the first statement: no new edge
+            {"id": "dup", "sql": "create table batch_stg as select * from batch_raw"},
+            "not sql at all",
+        ]
+    }
+    r = client.post("/lineage/sql/batch", params={"persist": 1}, json=payload)
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = _lines(r)
+    assert [x.get("id") for x in lines[:4]] == ["stg", None, "dup", None]
+    assert [x["created"] for x in lines[:4]] == [1, 1, 0, 0]
+    assert lines[-1] == {"summary": {"statements": 4, "created": 2}}
+
+    pairs = {
+        (e.src_asset_id, e.dst_asset_id)
+        for e in db_session.query(LineageEdge).filter(LineageEdge.dst_asset_id.in_([stg.id, mart.id]))
+    }
+    assert pairs == {(raw.id, stg.id), (stg.id, mart.id)}
+
+    ndjson = "\n".join([json.dumps("insert into batch_mart select * from batch_raw"), json.dumps({"sql": "select 1", "id": "x"})])
+    r = client.post(
+        "/lineage/sql/batch/ndjson",
+        params={"persist": 1},
+        files={"file": ("q.ndjson", io.BytesIO(ndjson.encode()), "application/x-ndjson")},
+    )
+    assert r.status_code == 200, r.text
+    lines = _lines(r)
+    assert lines[0]["created"] == 1 and lines[1]["id"] == "x"
+    assert lines[-1]["summary"]["created"] == 1
+
+
+def test_parse_many_process_pool_preserves_order(monkeypatch):
+    monkeypatch.setenv("LINEAGE_PARSE_WORKERS", "2")
+    stmts = [f"insert into t{i} select * from s{i}" for i in range(20)]
+    parsed = parse_many(stmts, min_parallel=1)
+    assert parsed == [parse_sql_lineage(s) for s in stmts]
+
+
+def test_parse_sql_lineage_matches_harvest_rules():
+    merge = parse_sql_lineage("merge into t using u on t.id = u.id when matched then update set t.v = u.v")
+    assert merge.targets == ["t"] and merge.sources == ["u"]
+    # The target is not its own source
+    upsert = parse_sql_lineage("insert into t select * from t join s on t.id = s.id")
+    assert upsert.targets == ["t"] and upsert.sources == ["s"]
+
+
+def _sleepy_chunk(chunk: list[float]) -> list[int]:
+    import os
+    import time
+
+    time.sleep(max(chunk))
+    return [os.getpid()] * len(chunk)
+
+
+def test_map_chunks_resubmits_after_timeout():
+    import os
+
+    from backend.sql_lineage import map_chunks
+
+    out = map_chunks(
+        _sleepy_chunk, [[0.0], [60.0], [0.0], [0.0]], workers=1, deadline=lambda c: 2.0, on_timeout=lambda c: [-1]
+    )
+    assert out[1] == [-1]
+    # Chunks queued behind the stuck one ran on a fresh pool, not inline
+    first, rest = out[0][0], {out[2][0], out[3][0]}
+    assert len(rest) == 1 and first not in rest and os.getpid() not in rest
+
+
+def test_lineage_sql_batch_is_bounded(client: TestClient, monkeypatch):
+    from backend.routers import lineage
+
+    monkeypatch.setattr(lineage, "SQL_BATCH_MAX_STATEMENTS", 2)
+    ndjson = "\n".join(json.dumps(f"select {i}") for i in range(3)).encode()
+    r = client.post("/lineage/sql/batch/ndjson", files={"file": ("q.ndjson", io.BytesIO(ndjson), "application/x-ndjson")})
+    assert r.status_code == 413
+
+    too_many = {"statements": ["select 1"] * (lineage.SQLBatchRequest.model_fields["statements"].metadata[0].max_length + 1)}
+    assert client.post("/lineage/sql/batch", json=too_many).status_code == 422
+
+    monkeypatch.setenv("LINEAGE_BATCH_MAX_BYTES", "64")
+    assert client.post("/lineage/sql/batch", json={"statements": ["select 1"] * 20}).status_code == 413
+    r = client.post("/lineage/sql/batch/ndjson", files={"file": ("q.ndjson", io.BytesIO(b'"select 1"\n' * 10), "text/plain")})
+    assert r.status_code == 413
+    assert client.post("/lineage/sql/batch", json={"statements": ["select 1"]}).status_code == 200
+
+
+def test_cte_names_are_not_sources():
+    expected = [("s", "a", "t", "a")]
+    for sql in (
+        "with c as (select a from s) insert into t select a from c",
+        "insert into t with c as (select a from s) select a from c",
+        "with c as (select a from s) create table t as select a from c",
+        "create table t as with c as (select a from s) select a from c",
+    ):
+        parsed = parse_sql_lineage(sql)
+        assert (parsed.sources, parsed.targets) == (["s"], ["t"]), sql
+        assert [(c.src_table, c.src_column, c.dst_table, c.dst_column) for c in parsed.columns] == expected, sql
+    # A schema-qualified table named like a CTE is still a table
+    assert parse_sql_lineage("with c as (select a from s) insert into t select a from x.c").sources == ["x.c", "s"]
+
+
+def test_batch_streams_and_commits_chunk_by_chunk(client: TestClient, db_session: Session, monkeypatch):
+    from backend.routers import lineage
+    from backend.sql_lineage import ParsedLineage
+
+    sys = System(name="batch_stream_sys")
+    db_session.add(sys)
+    db_session.commit()
+    src, dst = Asset(system_id=sys.id, name="batch_stream_src"), Asset(system_id=sys.id, name="batch_stream_dst")
+    db_session.add_all([src, dst])
+    db_session.commit()
+
+    seen: list[int] = []
+
+    def chunks(statements, dialect=None):
+        yield [parse_sql_lineage(statements[0])]
+        # The first chunk's edge is committed before the second chunk is parsed
+        with Session(db_session.bind) as other:
+            seen.append(other.query(LineageEdge).filter(LineageEdge.dst_asset_id == dst.id).count())
+        yield [ParsedLineage(timed_out=True)]
+
+    monkeypatch.setattr(lineage, "iter_parsed", chunks)
+    r = client.post(
+        "/lineage/sql/batch", params={"persist": 1}, json={"statements": ["insert into batch_stream_dst select * from batch_stream_src", "x"]}
+    )
+    assert r.status_code == 200, r.text
+    lines = _lines(r)
+    assert seen == [1]
+    assert lines[0]["created"] == 1 and "timed_out" not in lines[0]
+    assert lines[1]["timed_out"] is True and lines[1]["sources"] == []
+    assert lines[-1] == {"summary": {"statements": 2, "created": 1}}
+
+
+def test_batch_parse_times_out_per_statement(monkeypatch):
+    import time
+
+    from backend import sql_lineage
+
+    real = sql_lineage.parse_sql_lineage
+
+    def slow(sql, dialect=None):
+        if "pathological" in sql:
+            time.sleep(30)
+        return real(sql, dialect)
+
+    monkeypatch.setattr(sql_lineage, "parse_sql_lineage", slow)
+    monkeypatch.setenv("LINEAGE_PARSE_WORKERS", "1")
+    monkeypatch.setenv("LINEAGE_PARSE_TIMEOUT", "0.2")
+    t0 = time.perf_counter()
+    out = parse_many(["insert into t select * from pathological", "insert into t select * from s"])
+    assert time.perf_counter() - t0 < 5
+    assert out[0].timed_out and out[0].sources == []
+    assert out[1].sources == ["s"] and not out[1].timed_out
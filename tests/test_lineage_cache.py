@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from backend.lineage_cache import lineage_cache
+from backend.lineage_closure import add_edges
+from backend.models import System, Asset, LineageEdge
+
+
+def _edges(client: TestClient, asset_id: int, depth: int = 1) -> list[tuple[int, int]]:
+    r = client.get(f"/lineage/graph?asset_id={asset_id}&depth={depth}")
+    assert r.status_code == 200
+    return [tuple(e) for e in r.json()["edges"]]
+
+
+def test_lineage_cache_tracks_committed_changes(client: TestClient, db_session: Session):
+    sys = System(name="cache_sys")
+    db_session.add(sys)
+    db_session.commit()
+    a = Asset(system_id=sys.id, name="cache_a")
+    b = Asset(system_id=sys.id, name="cache_b")
+    c = Asset(system_id=sys.id, name="cache_c")
+    db_session.add_all([a, b, c])
+    db_session.commit()
+    e1 = LineageEdge(src_asset_id=a.id, dst_asset_id=b.id)
+    db_session.add(e1)
+    db_session.commit()
+
+    assert _edges(client, a.id) == [(a.id, b.id)]
+
+    # Inserted edge is patched into the warm cache
+    db_session.add(LineageEdge(src_asset_id=a.id, dst_asset_id=c.id))
+    db_session.commit()
+    assert set(_edges(client, a.id)) == {(a.id, b.id), (a.id, c.id)}
+
+    # Soft-deleted edge disappears
+    e1.deleted_at = datetime.utcnow()
+    db_session.commit()
+    assert _edges(client, a.id) == [(a.id, c.id)]
+
+    # Deleted asset is excluded from traversal
+    assert client.delete(f"/assets/{c.id}").status_code == 204
+    assert _edges(client, a.id) == []
+
+
+def test_lineage_cache_visibility_filter(db_session: Session):
+    sys = System(name="cache_vis_sys")
+    db_session.add(sys)
+    db_session.commit()
+    a = Asset(system_id=sys.id, name="vis_a")
+    b = Asset(system_id=sys.id, name="vis_b", visibility="Editors")
+    c = Asset(system_id=sys.id, name="vis_c", visibility="admins")
+    db_session.add_all([a, b, c])
+    db_session.commit()
+    db_session.add_all([
+        LineageEdge(src_asset_id=a.id, dst_asset_id=b.id),
+        LineageEdge(src_asset_id=a.id, dst_asset_id=c.id),
+    ])
+    db_session.commit()
+
+    graph = lineage_cache.ensure(db_session)
+    visited, pairs = graph.bfs(a.id, 1, ["editors"])
+    assert set(visited) == {a.id, b.id}
+    assert pairs == {(a.id, b.id)}
+
+    visited, _ = graph.bfs(c.id, 1, ["editors"])
+    assert visited == {}
+
+
+def test_lineage_cache_probes_before_rebuilding(db_session: Session, monkeypatch):
+    sys = System(name="cache_probe_sys")
+    db_session.add(sys)
+    db_session.commit()
+    a = Asset(system_id=sys.id, name="probe_a")
+    b = Asset(system_id=sys.id, name="probe_b")
+    db_session.add_all([a, b])
+    db_session.commit()
+
+    lineage_cache.invalidate()
+    graph = lineage_cache.ensure(db_session)
+    monkeypatch.setenv("LINEAGE_CACHE_TTL_SECONDS", "0.001")
+    import time
+
+    time.sleep(0.01)
+    # Expired but unchanged: the probe keeps the snapshot
+    assert lineage_cache.ensure(db_session) is graph
+
+    # Written like a harvest worker does (no ORM hooks): the probe moves and a new snapshot replaces it
+    now = datetime.utcnow()
+    with db_session.bind.begin() as conn:
+        conn.execute(
+            LineageEdge.__table__.insert().values(
+                src_asset_id=a.id, dst_asset_id=b.id, confidence=0, created_at=now, updated_at=now
+            )
+        )
+        add_edges(conn, [(a.id, b.id)])
+    time.sleep(0.01)
+    fresh = lineage_cache.ensure(db_session)
+    assert fresh is not graph
+    assert fresh.bfs(a.id, 1, None)[1] == {(a.id, b.id)} and graph.bfs(a.id, 1, None)[1] == set()
+
+    # ORM commits swap in a patched copy; the snapshot a reader holds does not change under it
+    c = Asset(system_id=sys.id, name="probe_c", visibility="ops")
+    db_session.add(c)
+    db_session.commit()
+    patched = lineage_cache.ensure(db_session)
+    assert patched is not fresh and not fresh.visible(c.id, None)
+    assert patched.visible(c.id, ["ops"]) and not patched.visible(c.id, ["hr"])
+    assert patched.describe(db_session, [c.id, 10**9]) == [
+        {"id": c.id, "name": "probe_c", "system_id": sys.id},
+        {"id": 10**9, "name": str(10**9), "system_id": None},
+    ]
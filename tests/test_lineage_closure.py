@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend import lineage_closure
+from backend.models import System, Asset, LineageEdge, LineageClosure
+
+
+def _closure(db: Session) -> set[tuple[int, int, int]]:
+    return set(db.execute(select(LineageClosure.ancestor_id, LineageClosure.descendant_id, LineageClosure.min_distance)))
+
+
+def test_closure_maintained_and_served(client: TestClient, db_session: Session):
+    sys = System(name="closure_sys")
+    db_session.add(sys)
+    db_session.commit()
+    a, b, c, d = (Asset(system_id=sys.id, name=f"cl_{n}") for n in "abcd")
+    db_session.add_all([a, b, c, d])
+    db_session.commit()
+    # a -> b -> c -> d, plus shortcut a -> c
+    ab = LineageEdge(src_asset_id=a.id, dst_asset_id=b.id)
+    bc = LineageEdge(src_asset_id=b.id, dst_asset_id=c.id)
+    cd = LineageEdge(src_asset_id=c.id, dst_asset_id=d.id)
+    ac = LineageEdge(src_asset_id=a.id, dst_asset_id=c.id)
+    db_session.add_all([ab, bc, cd])
+    db_session.commit()
+    db_session.add(ac)
+    db_session.commit()
+
+    r = client.get(f"/lineage/downstream/{a.id}")
+    assert r.status_code == 200
+    assert [(x["id"], x["distance"]) for x in r.json()["assets"]] == [(b.id, 1), (c.id, 1), (d.id, 2)]
+
+    r = client.get(f"/lineage/upstream/{d.id}?max_depth=2")
+    assert [(x["id"], x["distance"]) for x in r.json()["assets"]] == [(c.id, 1), (a.id, 2), (b.id, 2)]
+
+    # Removing the shortcut lengthens a's paths; removing b -> c cuts b off from c and d
+    ac.deleted_at = datetime.utcnow()
+    db_session.commit()
+    r = client.get(f"/lineage/downstream/{a.id}")
+    assert [(x["id"], x["distance"]) for x in r.json()["assets"]] == [(b.id, 1), (c.id, 2), (d.id, 3)]
+    bc.deleted_at = datetime.utcnow()
+    db_session.commit()
+    assert client.get(f"/lineage/downstream/{b.id}").json()["assets"] == []
+    assert [x["id"] for x in client.get(f"/lineage/upstream/{d.id}").json()["assets"]] == [c.id]
+
+    # Incremental maintenance agrees with a full rebuild
+    incremental = _closure(db_session)
+    lineage_closure.rebuild(db_session.connection())
+    db_session.commit()
+    assert _closure(db_session) == incremental
+
+    assert client.get("/lineage/upstream/999999").status_code == 404
+
+
+def test_closure_skips_deleted_assets(client: TestClient, db_session: Session):
+    from workers.ingest import tombstone_unseen, upsert_discovery
+
+    sys = System(name="closure_del_sys")
+    db_session.add(sys)
+    db_session.commit()
+    a, b, c = (Asset(system_id=sys.id, name=f"cld_{n}") for n in "abc")
+    db_session.add_all([a, b, c])
+    db_session.commit()
+    db_session.add_all([LineageEdge(src_asset_id=a.id, dst_asset_id=b.id), LineageEdge(src_asset_id=b.id, dst_asset_id=c.id)])
+    db_session.commit()
+
+    def downstream() -> list[tuple[int, int]]:
+        return [(x["id"], x["distance"]) for x in client.get(f"/lineage/downstream/{a.id}").json()["assets"]]
+
+    assert downstream() == [(b.id, 1), (c.id, 2)]
+    # Soft-deleting b cuts the path through it, like /lineage/graph
+    assert client.delete(f"/assets/{b.id}").status_code == 204
+    assert downstream() == []
+    db_session.refresh(b)
+    b.deleted_at = None
+    db_session.commit()
+    assert downstream() == [(b.id, 1), (c.id, 2)]
+
+    # Tombstoned by a scan: same, in the scan's transaction
+    now = datetime.utcnow()
+    conn = db_session.connection()
+    conn.execute(Asset.__table__.update().where(Asset.id.in_([a.id, c.id])).values(seen_at=now))
+    conn.execute(Asset.__table__.update().where(Asset.id == b.id).values(seen_at=datetime(2000, 1, 1)))
+    assert tombstone_unseen(conn, [("closure_del_sys", "")], now, now)["assets"] == 1
+    db_session.commit()
+    assert downstream() == []
+    # ... and revived by the next scan that lists it
+    upsert_discovery(db_session.connection(), [{"system": "closure_del_sys", "name": "cld_b"}], [], now)
+    db_session.commit()
+    assert downstream() == [(b.id, 1), (c.id, 2)]
+
+    incremental = _closure(db_session)
+    lineage_closure.rebuild(db_session.connection())
+    db_session.commit()
+    assert _closure(db_session) == incremental
@@ -56,3 +56,31 @@ def test_lineage_graph_depth(client: TestClient, db_session: Session):
     assert set(g["nodes"]) == {a.id, b.id, c.id, d.id}
     edges = [tuple(e) for e in g["edges"]]
     assert (a.id, b.id) in edges and (b.id, c.id) in edges and (b.id, d.id) in edges
+
+
+def test_lineage_graph_cte_matches_cache(client: TestClient, db_session: Session):
+    # Cycle plus a branch: p -> q -> r -> p, r -> s
+    sys = db_session.query(System).filter_by(name="lg_cte_sys").first() or System(name="lg_cte_sys")
+    if not getattr(sys, "id", None):
+        db_session.add(sys)
+        db_session.commit()
+        db_session.refresh(sys)
+    p, q, r, s = (Asset(system_id=sys.id, name=n) for n in ("p", "q", "r", "s"))
+    db_session.add_all([p, q, r, s])
+    db_session.commit()
+    db_session.add_all([
+        LineageEdge(src_asset_id=p.id, dst_asset_id=q.id),
+        LineageEdge(src_asset_id=q.id, dst_asset_id=r.id),
+        LineageEdge(src_asset_id=r.id, dst_asset_id=p.id),
+        LineageEdge(src_asset_id=r.id, dst_asset_id=s.id),
+    ])
+    db_session.commit()
+
+    for depth in (0, 1, 2, 5):
+        by_cache = client.get(f"/lineage/graph?asset_id={p.id}&depth={depth}&mode=cache").json()
+        by_cte = client.get(f"/lineage/graph?asset_id={p.id}&depth={depth}&mode=cte").json()
+        assert by_cte == by_cache
+    assert set(by_cte["nodes"]) == {p.id, q.id, r.id, s.id}
+
+    body = client.get(f"/lineage/graph?asset_id={s.id}&depth=1&mode=cte&format=ui").json()
+    assert {n["name"] for n in body["nodes"]} == {"r", "s"}
@@ -44,3 +44,33 @@ def test_lineage_sql_persist_creates_edge(client: TestClient, db_session: Sessio
         .count()
     )
     assert count == 1
+
+
+def test_lineage_sql_persist_column_edges(client: TestClient, db_session: Session):
+    sys = System(name="col_lineage_sys")
+    db_session.add(sys)
+    db_session.commit()
+    orders = Asset(system_id=sys.id, name="col_orders")
+    fees = Asset(system_id=sys.id, name="col_fees")
+    report = Asset(system_id=sys.id, name="col_report")
+    db_session.add_all([orders, fees, report])
+    db_session.commit()
+
+    sql = (
+        "insert into col_report (order_id, total) "
+        "select o.id, o.amount + f.fee as total from col_orders o join col_fees f on f.order_id = o.id"
+    )
+    r = client.post("/lineage/sql", params={"persist": 1}, json={"sql": sql})
+    assert r.status_code == 200, r.text
+    cols = {(c["src_table"], c["src_column"], c["dst_column"]) for c in r.json()["columns"]}
+    assert ("col_orders", "amount", "total") in cols and ("col_fees", "fee", "total") in cols
+
+    r = client.get("/lineage/columns/graph", params={"asset_id": report.id, "column": "total"})
+    assert r.status_code == 200
+    body = r.json()
+    edges = {(e["source"]["asset_id"], e["source"]["column"], e["target"]["column"]) for e in body["edges"]}
+    assert edges == {(orders.id, "amount", "total"), (fees.id, "fee", "total")}
+
+    # Column edges do not leak into the table-level graph as duplicate pairs
+    g = client.get(f"/lineage/graph?asset_id={report.id}&depth=1").json()
+    assert sorted(tuple(e) for e in g["edges"]) == sorted([(orders.id, report.id), (fees.id, report.id)])
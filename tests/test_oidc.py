@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+from backend import oidc, token_cache
+from backend.main import app
+from stub_issuer import StubIssuer
+
+
+@pytest.fixture()
+def issuer(monkeypatch, client):
+    stub = StubIssuer()
+    monkeypatch.setenv("AUTH_DISABLED", "0")
+    monkeypatch.setenv("OIDC_ISSUER", stub.url)
+    monkeypatch.setenv("OIDC_AUDIENCE", stub.audience)
+    oidc.clear()
+    token_cache.clear()
+    yield stub
+    oidc.clear()
+    token_cache.clear()
+    stub.close()
+
+
+def _me(client, token):
+    return client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+
+def test_discovery_and_keys_are_fetched_once(issuer, client):
+    for i in range(5):
+        r = _me(client, issuer.token(sub=f"u{i}", roles=["writer"]))
+        assert r.status_code == 200 and r.json()["sub"] == f"u{i}" and r.json()["roles"] == ["writer"]
+    assert issuer.hits == {"discovery": 1, "jwks": 1}
+    assert _me(client, issuer.token(aud="someone-else")).status_code == 401
+
+
+def test_unknown_kid_refreshes_keys(issuer, client, monkeypatch):
+    monkeypatch.setenv("OIDC_JWKS_MIN_REFRESH_SECONDS", "0")
+    assert _me(client, issuer.token()).status_code == 200
+    new_kid = issuer.rotate()
+    assert _me(client, issuer.token(kid=new_kid)).status_code == 200
+    assert issuer.hits["jwks"] == 2 and issuer.hits["discovery"] == 1
+    # The retired key is gone from the refreshed set (for tokens not verified before)
+    assert _me(client, issuer.token(kid="k1", sub="not-seen-before")).status_code == 401
+
+
+def test_unknown_kid_refresh_is_rate_limited(issuer, client, monkeypatch):
+    monkeypatch.setenv("OIDC_JWKS_MIN_REFRESH_SECONDS", "60")
+    assert _me(client, issuer.token()).status_code == 200
+    other = StubIssuer()
+    try:
+        forged = [other.token(header_kid=f"x{i}", iss=issuer.url) for i in range(3)]
+    finally:
+        other.close()
+    assert [_me(client, t).status_code for t in forged] == [401, 401, 401]
+    assert issuer.hits["jwks"] == 2
+
+
+def test_keys_refresh_in_background_before_expiry(issuer, monkeypatch):
+    monkeypatch.setenv("OIDC_JWKS_TTL_SECONDS", "0.5")
+    monkeypatch.setenv("OIDC_JWKS_REFRESH_AHEAD", "0.2")
+    # One long-lived event loop, as under uvicorn, so the background task can finish
+    with TestClient(app) as client:
+        assert _me(client, issuer.token()).status_code == 200
+        time.sleep(0.2)
+        assert _me(client, issuer.token(sub="second")).status_code == 200
+        deadline = time.monotonic() + 5
+        while issuer.hits["jwks"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    assert issuer.hits["jwks"] == 2
+
+
+def _cache_count(client, result: str) -> float:
+    for line in client.get("/metrics").text.splitlines():
+        if line.startswith(f'auth_token_cache_total{{result="{result}"}}'):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def test_repeat_tokens_skip_verification(issuer, client, monkeypatch):
+    import backend.security as security
+
+    hits, misses = _cache_count(client, "hit"), _cache_count(client, "miss")
+    token = issuer.token(roles=["reader"])
+    assert _me(client, token).json()["roles"] == ["reader"]
+
+    def boom(*args, **kwargs):
+        raise AssertionError("verified again")
+
+    monkeypatch.setattr(security.jwt, "decode", boom)
+    for _ in range(3):
+        assert _me(client, token).json()["sub"] == "user-1"
+    assert _cache_count(client, "hit") - hits == 3
+    assert _cache_count(client, "miss") - misses == 1
+
+
+def test_cached_token_expires(issuer, client):
+    token = issuer.token(ttl=2)
+    assert _me(client, token).status_code == 200
+    time.sleep(3.1)
+    assert _me(client, token).status_code == 401
+
+
+def test_cold_start_herd_fetches_keys_once(issuer):
+    import asyncio
+
+    import httpx
+
+    issuer.latency = 0.3
+    tokens = [issuer.token(sub=f"herd{i}") for i in range(20)]
+
+    async def herd():
+        ticks = 0
+
+        async def ticker():
+            # Keeps running while the key fetch is in flight: the loop is not blocked
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick = asyncio.create_task(ticker())
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            responses = await asyncio.gather(
+                *(c.get("/auth/me", headers={"Authorization": f"Bearer {t}"}) for t in tokens)
+            )
+        tick.cancel()
+        return responses, ticks
+
+    responses, ticks = asyncio.run(herd())
+    assert [r.json()["sub"] for r in responses] == [f"herd{i}" for i in range(20)]
+    assert issuer.hits == {"discovery": 1, "jwks": 1}
+    assert ticks >= 20
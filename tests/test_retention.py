@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from backend.models import ScanArtifact, ScanArtifactChunk, ScanJob
+from workers.app import purge_scan_history
+from workers.artifacts import write_artifact
+from workers.retention import retention_policy
+
+
+def test_retention_policy_spec(monkeypatch):
+    monkeypatch.setenv("X_RETENTION", "Snowflake=7, s3=0, *=30, bogus=x")
+    assert retention_policy("X_RETENTION", "1") == {"snowflake": 7, "s3": 0, "*": 30}
+    monkeypatch.setenv("X_RETENTION", "14")
+    assert retention_policy("X_RETENTION", "1") == {"*": 14}
+
+
+def test_purge_expires_old_history_per_source(db_session: Session, monkeypatch):
+    os.environ["DATABASE_URL"] = str(db_session.bind.url)
+    monkeypatch.setenv("SCAN_ARTIFACT_RETENTION_DAYS", "ret_a=7,*=0")
+    monkeypatch.setenv("SCAN_JOB_RETENTION_DAYS", "ret_a=7,ret_b=1")
+    monkeypatch.setenv("RETENTION_BATCH_SIZE", "2")
+    now = datetime.utcnow()
+    old, recent = now - timedelta(days=10), now - timedelta(days=3)
+
+    conn = db_session.connection()
+    old_ids = [write_artifact(conn, "ret_a", {"items": [1, 2, 3]}, old) for _ in range(5)]
+    keep_ids = [write_artifact(conn, "ret_a", {"items": [1]}, recent), write_artifact(conn, "ret_b", {"items": [1]}, old)]
+    jobs = [
+        ScanJob(source="ret_a", status="success", updated_at=old),
+        ScanJob(source="ret_a", status="running", updated_at=old),
+        ScanJob(source="ret_a", status="failed", updated_at=recent),
+        ScanJob(source="ret_b", status="failed", updated_at=recent),
+    ]
+    db_session.add_all(jobs)
+    db_session.commit()
+
+    result = purge_scan_history.apply().get()
+    assert result["artifacts"] == {"ret_a": 5}
+    assert result["jobs"] == {"ret_a": 1, "ret_b": 1}
+
+    db_session.expire_all()
+    assert not db_session.query(ScanArtifact).filter(ScanArtifact.id.in_(old_ids)).count()
+    assert not db_session.query(ScanArtifactChunk).filter(ScanArtifactChunk.artifact_id.in_(old_ids)).count()
+    assert db_session.query(ScanArtifact).filter(ScanArtifact.id.in_(keep_ids)).count() == 2
+    left = {(j.source, j.status) for j in db_session.query(ScanJob).filter(ScanJob.source.in_(["ret_a", "ret_b"]))}
+    assert left == {("ret_a", "running"), ("ret_a", "failed")}
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import time
+
+from connectors.snowflake.impl import SnowflakeConnector
+from fake_snowflake import install
+
+
+def _dbs(n: int) -> dict[str, dict[str, list[str]]]:
+    return {f"DB{i}": {f"S.T{j}": ["ID", "NAME"] for j in range(3)} for i in range(n)}
+
+
+def test_parallel_discovery_merges_all_databases(monkeypatch):
+    account = install(monkeypatch, _dbs(6), latency=0.05)
+    monkeypatch.setenv("SNOWFLAKE_DISCOVER_WORKERS", "3")
+
+    t0 = time.perf_counter()
+    chunks = list(SnowflakeConnector().discover_stream(chunk_size=2))
+    elapsed = time.perf_counter() - t0
+
+    assets = {a["name"] for c in chunks for a in c.assets}
+    columns = [col for c in chunks for col in c.columns]
+    assert len(assets) == 18 and len(columns) == 36
+    assert {ns for c in chunks for ns in c.covered} == {("snowflake", f"DB{i}.") for i in range(6)}
+    timings = {k: v for c in chunks for k, v in c.timings.items()}
+    assert set(timings) == {f"DB{i}" for i in range(6)} and all(v >= 0.05 for v in timings.values())
+
+    # One connection per worker thread (plus the listing connection), all closed
+    workers = {(thread, conn) for thread, conn, _ in account.used}
+    assert len({t for t, _ in workers}) == len(workers) <= 3
+    assert len(account.connections) == len(workers) + 1
+    assert all(c.closed for c in account.connections)
+    assert elapsed < 6 * 0.05
+
+
+def test_single_worker_discovers_serially(monkeypatch):
+    account = install(monkeypatch, _dbs(2))
+    monkeypatch.setenv("SNOWFLAKE_DISCOVER_WORKERS", "1")
+    res = SnowflakeConnector().discover()
+    assert len(res.assets) == 6 and len(account.connections) == 1
+
+
+def test_worker_errors_reach_the_consumer(monkeypatch):
+    import pytest
+
+    account = install(monkeypatch, _dbs(3))
+    del account.dbs["DB1"]  # USE DATABASE succeeds, the metadata query fails
+    with pytest.raises(KeyError):
+        list(SnowflakeConnector().discover_stream())
+    assert all(c.closed for c in account.connections)
+
+
+def test_arrow_batches_match_tuple_path(monkeypatch):
+    import pytest
+
+    pytest.importorskip("pyarrow")
+    monkeypatch.setenv("SNOWFLAKE_DISCOVER_WORKERS", "1")
+    install(monkeypatch, _dbs(2))
+    expected = SnowflakeConnector().discover()
+
+    install(monkeypatch, _dbs(2), arrow_batch=4)
+    chunks = list(SnowflakeConnector().discover_stream(chunk_size=3))
+    assert max(len(c.assets) + len(c.columns) for c in chunks) <= 3
+    assert [a for c in chunks for a in c.assets] == expected.assets
+    assert [col for c in chunks for col in c.columns] == expected.columns
+    assert expected.assets[0]["last_altered"] == "2024-01-01T12:30:00"
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from backend.models import ScanArtifact, ScanJob
+from connectors.snowflake.impl import SnowflakeConnector
+from fake_snowflake import install
+from workers.app import run_scan
+from workers.artifacts import iter_items
+
+T0 = datetime.utcnow() - timedelta(hours=1)
+
+
+def _history(n: int) -> list[tuple[str, str, datetime, datetime]]:
+    # Three queries share every END_TIME, so ties straddle page boundaries
+    return [(f"q{i:04d}", f"SELECT {i} FROM db.s.t{i % 5}", T0, T0 + timedelta(seconds=i // 3)) for i in range(n)]
+
+
+def test_harvest_pages_walk_the_whole_window(monkeypatch):
+    account = install(monkeypatch, {"DB": {}})
+    account.history = _history(25)
+    monkeypatch.setenv("SNOWFLAKE_HARVEST_PAGE_SIZE", "4")
+
+    pages = list(SnowflakeConnector().harvest_stream(since=T0))
+    texts = [item["query_text"] for p in pages for item in p.payload["items"]]
+    assert texts == [h[1] for h in account.history]
+    assert [len(p.payload["items"]) for p in pages] == [4] * 6 + [1]
+    assert (pages[-1].last_seen_at, pages[-1].last_query_id) == (account.history[-1][3], "q0024")
+
+
+def test_arrow_history_matches_tuple_path(monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setenv("SNOWFLAKE_HARVEST_PAGE_SIZE", "4")
+    account = install(monkeypatch, {"DB": {}})
+    account.history = _history(11)
+    expected = [(p.payload["items"], p.last_seen_at, p.last_query_id) for p in SnowflakeConnector().harvest_stream(since=T0)]
+
+    # Three-row batches: a page spans two of them, and its watermark comes from the last one
+    account = install(monkeypatch, {"DB": {}}, arrow_batch=3)
+    account.history = _history(11)
+    pages = [(p.payload["items"], p.last_seen_at, p.last_query_id) for p in SnowflakeConnector().harvest_stream(since=T0)]
+    assert pages == expected and len(pages) == 3
+
+
+def test_crashed_harvest_resumes_from_checkpoint(db_session: Session, monkeypatch):
+    os.environ["DATABASE_URL"] = str(db_session.bind.url)
+    account = install(monkeypatch, {"DB": {}})
+    account.history = _history(10)
+    monkeypatch.setenv("SNOWFLAKE_HARVEST_PAGE_SIZE", "3")
+    job = ScanJob(source="snowflake", status="pending", last_seen_at=T0)
+    db_session.add(job)
+    db_session.commit()
+    first_artifact = (db_session.query(ScanArtifact.id).order_by(ScanArtifact.id.desc()).first() or (0,))[0]
+
+    account.fail_on_page = 3
+    with pytest.raises(RuntimeError):
+        run_scan.apply(args=("snowflake", job.id)).get()
+    db_session.expire_all()
+    job = db_session.get(ScanJob, job.id)
+    assert job.status == "failed" and job.last_seen_query_id == "q0005"
+
+    account.fail_on_page = 0
+    run_scan.apply(args=("snowflake", job.id)).get()
+    db_session.expire_all()
+    assert db_session.get(ScanJob, job.id).status == "success"
+    ids = [i for (i,) in db_session.query(ScanArtifact.id).filter(ScanArtifact.id > first_artifact).order_by(ScanArtifact.id)]
+    conn = db_session.connection()
+    texts = [item["query_text"] for i in ids for item in iter_items(conn, i)]
+    assert texts == [h[1] for h in account.history]
+
+
+def test_empty_harvest_keeps_watermark(db_session: Session, monkeypatch):
+    os.environ["DATABASE_URL"] = str(db_session.bind.url)
+    account = install(monkeypatch, {"DB": {}})
+    account.history = _history(3)
+    job = ScanJob(source="snowflake", status="pending", last_seen_at=account.history[-1][3], last_seen_query_id="q0002")
+    db_session.add(job)
+    db_session.commit()
+
+    run_scan.apply(args=("snowflake", job.id)).get()
+    db_session.expire_all()
+    job = db_session.get(ScanJob, job.id)
+    # Nothing new: the watermark stays put so late-arriving history is still picked up
+    assert job.status == "success"
+    assert (job.last_seen_at, job.last_seen_query_id) == (account.history[-1][3], "q0002")
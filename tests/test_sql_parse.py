@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from backend.models import QueryParse, ScanJob
+from connectors.sql_parse import HarvestParser, clear_memory, fingerprint, normalize, parse_statement
+from fake_snowflake import install
+from workers.app import run_scan
+
+
+def test_fingerprint_ignores_literals_comments_and_whitespace():
+    a = "SELECT * FROM db.s.orders WHERE id = 42 AND note = 'it''s -- fine' -- trailing"
+    b = "SELECT *\n  FROM db.s.orders\nWHERE id = 7 AND note = 'x'  /* why */ ;"
+    assert normalize(a) == normalize(b) == "SELECT * FROM db.s.orders WHERE id = ? AND note = ?"
+    assert fingerprint("SELECT 1 FROM t WHERE x IN (1, 2, 3)") == fingerprint("SELECT 1 FROM t WHERE x IN (4)")
+    # Identifiers (including digits inside them and quoted names) are kept
+    assert fingerprint("SELECT a FROM t1") != fingerprint("SELECT a FROM t2")
+    assert fingerprint('SELECT a FROM "T"') != fingerprint('SELECT a FROM "t"')
+
+
+def test_parse_statement_lineage_targets():
+    assert parse_statement("INSERT INTO db.s.dst SELECT * FROM db.s.src", "snowflake") == {
+        "tables": ["db.s.dst", "db.s.src"],
+        "targets": ["db.s.dst"],
+        "sources": ["db.s.src"],
+    }
+    ctas = parse_statement("CREATE TABLE db.s.c AS SELECT a FROM db.s.x JOIN db.s.y USING (a)", "snowflake")
+    assert ctas["targets"] == ["db.s.c"] and ctas["sources"] == ["db.s.x", "db.s.y"]
+    merge = parse_statement(
+        "MERGE INTO db.s.t USING db.s.u ON t.id = u.id WHEN MATCHED THEN UPDATE SET t.v = u.v", "snowflake"
+    )
+    assert merge["targets"] == ["db.s.t"] and merge["sources"] == ["db.s.u"]
+    cte = parse_statement("WITH c AS (SELECT * FROM db.s.src) INSERT INTO db.s.dst SELECT * FROM c", "snowflake")
+    assert cte == {"tables": ["db.s.dst", "db.s.src"], "targets": ["db.s.dst"], "sources": ["db.s.src"]}
+    assert parse_statement("SELECT * FROM db.s.x", "snowflake")["targets"] == []
+    assert parse_statement("this is not sql ((", "snowflake")["tables"] == []
+
+
+def test_parser_parses_each_fingerprint_once(monkeypatch):
+    import connectors.sql_parse as sql_parse
+
+    clear_memory()
+    calls = []
+    real = sql_parse.parse_statement
+    monkeypatch.setattr(sql_parse, "parse_statement", lambda sql, dialect=None: calls.append(sql) or real(sql, dialect))
+    items = [{"query_text": f"SELECT * FROM db.s.t WHERE id = {i}"} for i in range(50)]
+    items.append({"query_text": "SELECT * FROM db.s.other"})
+    parser = HarvestParser(dialect="snowflake")
+    assert parser.annotate(items) == {"hits": 49, "misses": 2}
+    assert len(calls) == 2 and all(it["tables"] for it in items)
+    assert parser.annotate([{"query_text": "SELECT * FROM db.s.t WHERE id = 999"}]) == {"hits": 1, "misses": 0}
+    assert parser.stats == {"hits": 50, "misses": 2, "hit_rate": round(50 / 52, 4)}
+
+
+def test_parse_cache_persists_across_scans(db_session: Session, monkeypatch):
+    os.environ["DATABASE_URL"] = str(db_session.bind.url)
+    clear_memory()
+    account = install(monkeypatch, {"DB": {}})
+    t0 = datetime.utcnow() - timedelta(hours=1)
+    account.history = [
+        (f"q{i:03d}", f"INSERT INTO pc.s.dst SELECT * FROM pc.s.src WHERE d = '{i}'", t0, t0 + timedelta(seconds=i))
+        for i in range(20)
+    ]
+    job = ScanJob(source="snowflake", status="pending", last_seen_at=t0)
+    db_session.add(job)
+    db_session.commit()
+
+    first = run_scan.apply(args=("snowflake", job.id)).get()
+    assert first["parse_cache"] == {"hits": 19, "misses": 1, "hit_rate": 0.95}
+    row = db_session.query(QueryParse).filter_by(fingerprint=fingerprint(account.history[0][1], "snowflake")).one()
+    assert row.parsed["targets"] == ["pc.s.dst"]
+
+    # A fresh process (empty memory tier) answers from the table
+    clear_memory()
+    job2 = ScanJob(source="snowflake", status="pending", last_seen_at=t0)
+    db_session.add(job2)
+    db_session.commit()
+    second = run_scan.apply(args=("snowflake", job2.id)).get()
+    assert second["parse_cache"] == {"hits": 20, "misses": 0, "hit_rate": 1.0}
+
+
+def test_parse_many_pool_preserves_order(monkeypatch):
+    from connectors.sql_parse import parse_many
+
+    monkeypatch.setenv("HARVEST_PARSE_WORKERS", "2")
+    stmts = [f"INSERT INTO db.s.t{i} SELECT * FROM db.s.src{i % 7}" for i in range(40)]
+    assert parse_many(stmts, "snowflake", min_parallel=1) == [parse_statement(s, "snowflake") for s in stmts]
+
+
+def test_slow_statement_times_out(monkeypatch):
+    import time
+
+    import connectors.sql_parse as sql_parse
+
+    real = sql_parse.parse_statement
+
+    def slow(sql, dialect=None):
+        if "pathological" in sql:
+            time.sleep(30)
+        return real(sql, dialect)
+
+    monkeypatch.setattr(sql_parse, "parse_statement", slow)
+    monkeypatch.setenv("HARVEST_PARSE_WORKERS", "1")
+    monkeypatch.setenv("HARVEST_PARSE_TIMEOUT", "0.2")
+    t0 = time.perf_counter()
+    out = sql_parse.parse_many(["SELECT * FROM db.s.pathological", "SELECT * FROM db.s.ok"], "snowflake")
+    assert time.perf_counter() - t0 < 5
+    assert out[0] == {"tables": [], "targets": [], "sources": [], "timed_out": True}
+    assert out[1]["tables"] == ["db.s.ok"]
+
+
+def test_timed_out_parses_are_not_persisted(monkeypatch):
+    import connectors.sql_parse as sql_parse
+
+    clear_memory()
+
+    class Store:
+        saved: dict = {}
+
+        def load(self, fingerprints):
+            # An older version persisted a timeout: parsed again rather than trusted
+            return {fp: {"tables": [], "targets": [], "sources": [], "timed_out": True} for fp in fingerprints}
+
+        def save(self, entries):
+            self.saved.update(entries)
+
+    monkeypatch.setattr(
+        sql_parse, "parse_many", lambda sqls, dialect=None: [sql_parse._timed_out() if "slow" in s else parse_statement(s) for s in sqls]
+    )
+    store = Store()
+    parser = HarvestParser(store, "snowflake")
+    items = [{"query_text": "SELECT * FROM db.s.slow"}, {"query_text": "SELECT * FROM db.s.fast"}]
+    assert parser.annotate(items) == {"hits": 0, "misses": 2}
+    assert items[0]["timed_out"] and [sql for sql, _ in store.saved.values()] == ["SELECT * FROM db.s.fast"]
+    # Still answered from memory within this process
+    assert parser.annotate([{"query_text": "SELECT * FROM db.s.slow"}]) == {"hits": 1, "misses": 0}
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from sqlalchemy.orm import Session
+
+from workers import db as worker_db
+from workers.app import run_scan
+
+
+def test_run_scan_reuses_process_engine(db_session: Session):
+    os.environ["DATABASE_URL"] = str(db_session.bind.url)
+    run_scan.apply(args=("postgres", None)).get()
+    engine = worker_db._engine
+    checkouts = worker_db.POOL_CHECKOUTS._value.get()
+
+    run_scan.apply(args=("postgres", None)).get()
+    assert worker_db._engine is engine
+    assert worker_db.POOL_CHECKOUTS._value.get() > checkouts
+    assert worker_db.POOL_IN_USE._value.get() == 0
+
+
+def test_worker_process_init_rebuilds_engine(db_session: Session):
+    os.environ["DATABASE_URL"] = str(db_session.bind.url)
+    before = worker_db.get_sessionmaker().kw["bind"]
+    worker_db._init_worker_process()
+    assert worker_db._engine is not before
+
+
+def test_sessionmaker_compares_parsed_urls(db_session: Session, monkeypatch):
+    os.environ["DATABASE_URL"] = str(db_session.bind.url)
+    engine = worker_db.get_sessionmaker().kw["bind"]
+    # Same database, spelled differently (redundant query string): no rebuild
+    monkeypatch.setattr(worker_db, "init_engine", lambda url=None: pytest.fail("engine rebuilt"))
+    monkeypatch.setenv("DATABASE_URL", str(db_session.bind.url) + "?")
+    assert worker_db.get_sessionmaker().kw["bind"] is engine
+
+
+def test_metrics_server_serves_pool_metrics():
+    import socket
+    import urllib.request
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = worker_db.start_metrics_server(port)
+    try:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        assert "worker_db_pool_checkouts_total" in body and "worker_db_pool_wait_seconds" in body
+        # Port taken: logged, not raised
+        assert worker_db.start_metrics_server(port) is None
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert worker_db.start_metrics_server(0) is None
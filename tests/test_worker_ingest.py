@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import Session
+
+from backend.models import System, Asset, ColumnModel
+from workers.ingest import upsert_discovery
+
+
+def test_bulk_upsert_is_idempotent_and_revives(db_session: Session, monkeypatch):
+    monkeypatch.setenv("INGEST_BATCH_SIZE", "3")
+    assets = [{"system": "bulk_sys", "name": f"bulk.t{i}", "description": f"d{i}"} for i in range(5)]
+    columns = [{"asset": f"bulk.t{i}", "name": f"c{j}", "data_type": "int"} for i in range(5) for j in range(4)]
+    columns.append({"asset": "bulk.t0", "name": "c0", "description": "first column"})
+
+    conn = db_session.connection()
+    stats = upsert_discovery(conn, assets, columns, datetime.utcnow())
+    db_session.commit()
+    assert stats == {"systems": 1, "assets": 5, "columns": 20}
+
+    sys = db_session.query(System).filter(System.name == "bulk_sys").one()
+    t0 = db_session.query(Asset).filter(Asset.system_id == sys.id, Asset.name == "bulk.t0").one()
+    assert t0.column_names == "c0,c1,c2,c3"
+    c0 = db_session.query(ColumnModel).filter(ColumnModel.asset_id == t0.id, ColumnModel.name == "c0").one()
+    assert (c0.data_type, c0.description) == ("int", "first column")
+
+    # Soft-delete, then re-scan: same ids, rows revived, nothing duplicated
+    t0.deleted_at = datetime.utcnow()
+    c0.deleted_at = datetime.utcnow()
+    db_session.commit()
+    upsert_discovery(db_session.connection(), assets, columns, datetime.utcnow())
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.query(Asset).filter(Asset.system_id == sys.id).count() == 5
+    assert db_session.query(ColumnModel).join(Asset).filter(Asset.system_id == sys.id).count() == 20
+    assert db_session.get(Asset, t0.id).deleted_at is None
+    c0 = db_session.get(ColumnModel, c0.id)
+    assert c0.deleted_at is None and c0.description == "first column"
+
+
+def test_duplicate_asset_name_conflicts(client):
+    sid = client.post("/systems/", json={"name": "dup_sys"}).json()["id"]
+    assert client.post("/assets/", json={"system_id": sid, "name": "dup"}).status_code == 201
+    assert client.post("/assets/", json={"system_id": sid, "name": "dup"}).status_code == 409
+
+
+def test_create_revives_soft_deleted_rows(client):
+    sid = client.post("/systems/", json={"name": "revive_sys"}).json()["id"]
+    aid = client.post("/assets/", json={"system_id": sid, "name": "revive", "description": "old"}).json()["id"]
+    cid = client.post("/columns/", json={"asset_id": aid, "name": "c", "data_type": "int"}).json()["id"]
+    assert client.delete(f"/columns/{cid}").status_code == 204
+    assert client.delete(f"/assets/{aid}").status_code == 204
+
+    r = client.post("/assets/", json={"system_id": sid, "name": "revive", "description": "new"})
+    assert r.status_code == 201 and r.json()["id"] == aid and r.json()["description"] == "new"
+    r = client.post("/columns/", json={"asset_id": aid, "name": "c", "data_type": "text"})
+    assert r.status_code == 201 and r.json()["id"] == cid and r.json()["data_type"] == "text"
+    assert client.get(f"/assets/{aid}").json()["column_names"] == "c"
+    assert client.post("/columns/", json={"asset_id": aid, "name": "c"}).status_code == 409
+
+
+def test_stage_rows_and_sqlite_fallback(db_session: Session, monkeypatch):
+    from workers import ingest
+
+    assets = [{"system": "stage_sys", "name": "stage.t"}, {"system": None, "name": "orphan"}]
+    columns = [{"asset": "stage.t", "name": "a"}, {"asset": "orphan", "name": "b"}, {"asset": "stage.t", "name": None}]
+    asset_rows, column_rows = ingest.stage_rows(assets, columns)
+    assert asset_rows == [("stage_sys", "stage.t", None)]
+    assert list(column_rows) == [(0, "stage_sys", "stage.t", "a", None, None)]
+
+    # COPY is Postgres-only; SQLite always takes the batched upsert
+    monkeypatch.setenv("INGEST_COPY_THRESHOLD", "1")
+    monkeypatch.setattr(ingest, "copy_discovery", lambda *a, **k: pytest.fail("COPY path on SQLite"))
+    stats = ingest.load_discovery(db_session.connection(), assets, columns, datetime.utcnow())
+    db_session.commit()
+    assert stats["columns"] == 1
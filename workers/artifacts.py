@@ -0,0 +1,146 @@
+"""
+Chunked, compressed scan artifacts.
+
+A harvest page is stored as one `scan_artifact` row holding a small manifest (the payload
+without its items, plus codec, chunk and item counts) and its items as NDJSON in
+`scan_artifact_chunk` rows of ARTIFACT_CHUNK_ITEMS items each (default 1000), compressed
+with zstd when the `zstandard` package is installed and gzip otherwise (ARTIFACT_CODEC forces
+one). Manifests stay a few hundred bytes, so listing artifacts never drags query texts along.
+
+Readers stream: `iter_items` fetches and decompresses one chunk at a time. Artifacts written
+before chunking (items inline in `payload`) are read through the same API.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import JSON, Integer, LargeBinary, column, select, table
+from sqlalchemy.engine import Connection
+
+try:
+    import zstandard
+except Exception:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+_artifact = table(
+    "scan_artifact",
+    column("id", Integer),
+    column("source"),
+    column("payload", JSON),
+    column("created_at"),
+    column("updated_at"),
+)
+_chunk = table(
+    "scan_artifact_chunk",
+    column("artifact_id"),
+    column("seq"),
+    column("item_count"),
+    column("data", LargeBinary),
+)
+
+MANIFEST_KEY = "manifest"
+
+
+def _chunk_items() -> int:
+    try:
+        return max(1, int(os.getenv("ARTIFACT_CHUNK_ITEMS", "1000")))
+    except ValueError:
+        return 1000
+
+
+def _codec() -> str:
+    codec = (os.getenv("ARTIFACT_CODEC") or "").strip().lower()
+    if codec == "zstd" and zstandard is None:
+        raise RuntimeError("ARTIFACT_CODEC=zstd requires the zstandard package")
+    if codec in ("zstd", "gzip"):
+        return codec
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def _compress(codec: str, raw: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    return gzip.compress(raw, compresslevel=6)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("artifact is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def write_artifact(conn: Connection, source: str, payload: Dict[str, Any], now: datetime) -> int:
+    """Store one payload as a manifest row plus compressed item chunks. Returns the artifact id."""
+    items: List[Any] = list(payload.get("items") or [])
+    codec = _codec()
+    size = _chunk_items()
+    chunks = []
+    raw_bytes = stored_bytes = 0
+    for seq, start in enumerate(range(0, len(items), size)):
+        batch = items[start : start + size]
+        raw = "".join(json.dumps(item, separators=(",", ":")) + "\n" for item in batch).encode("utf-8")
+        data = _compress(codec, raw)
+        raw_bytes += len(raw)
+        stored_bytes += len(data)
+        chunks.append({"seq": seq, "item_count": len(batch), "data": data})
+    manifest = {
+        "codec": codec,
+        "format": "ndjson",
+        "chunks": len(chunks),
+        "items": len(items),
+        "raw_bytes": raw_bytes,
+        "stored_bytes": stored_bytes,
+    }
+    header = {k: v for k, v in payload.items() if k != "items"}
+    artifact_id = conn.execute(
+        _artifact.insert()
+        .values(source=source, payload={**header, MANIFEST_KEY: manifest}, created_at=now, updated_at=now)
+        .returning(_artifact.c.id)
+    ).scalar_one()
+    if chunks:
+        conn.execute(_chunk.insert(), [dict(c, artifact_id=artifact_id) for c in chunks])
+    return artifact_id
+
+
+def _payload(value: Any) -> Optional[Dict[str, Any]]:
+    # Rows written with json.dumps into a JSON column come back as a string
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    return value if isinstance(value, dict) else None
+
+
+def read_manifest(conn: Connection, artifact_id: int) -> Optional[Dict[str, Any]]:
+    """The artifact payload without items (including "manifest" for chunked artifacts)."""
+    row = conn.execute(select(_artifact.c.payload).where(_artifact.c.id == artifact_id)).first()
+    if row is None:
+        return None
+    payload = _payload(row[0]) or {}
+    return {k: v for k, v in payload.items() if k != "items"}
+
+
+def iter_items(conn: Connection, artifact_id: int) -> Iterator[Any]:
+    """Items of an artifact in order, decompressing one chunk at a time."""
+    row = conn.execute(select(_artifact.c.payload).where(_artifact.c.id == artifact_id)).first()
+    payload = _payload(row[0]) if row else None
+    if not payload:
+        return
+    manifest = payload.get(MANIFEST_KEY)
+    if not manifest:
+        yield from payload.get("items") or []
+        return
+    for seq in range(int(manifest.get("chunks") or 0)):
+        data = conn.execute(
+            select(_chunk.c.data).where(_chunk.c.artifact_id == artifact_id, _chunk.c.seq == seq)
+        ).scalar_one()
+        for line in _decompress(manifest.get("codec") or "gzip", bytes(data)).splitlines():
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,430 @@
+"""
+Set-based upsert of discovered systems, assets and columns.
+
+Rows are merged in batches of INGEST_BATCH_SIZE (default 1000) on the natural keys
+system(name), asset(system_id, name) and column(asset_id, name):
+
+- Postgres: one multi-row INSERT ... ON CONFLICT DO UPDATE ... RETURNING per batch
+- SQLite: executemany of the same INSERT ... ON CONFLICT, then one id lookup per batch
+
+Soft-deleted rows are revived (revived assets take their lineage back into the closure, and
+assets tombstoned by `tombstone_unseen` take it out). Existing live systems and assets keep their updated_at;
+columns take non-null data_type/description from discovery. Assets and columns get
+seen_at = scan start, which `tombstone_unseen` diffs against once a scan has finished.
+
+Columns are matched to their asset by (system, asset name); a column dict without "system"
+takes the system of the asset of that name in the same call.
+
+Discovery results of INGEST_COPY_THRESHOLD columns or more (default 50000) on Postgres with
+psycopg 3 take `copy_discovery` instead: rows are streamed into temp staging tables with
+COPY FROM STDIN and merged with one INSERT ... SELECT ... ON CONFLICT per table.
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import bindparam, case, column, func, select, table, text, tuple_, update
+from sqlalchemy.engine import Connection
+
+from backend.lineage_closure import remove_assets, restore_assets
+
+_system = table("system", column("id"), column("name"), column("description"), column("created_at"), column("updated_at"), column("deleted_at"))
+_asset = table(
+    "asset",
+    column("id"),
+    column("system_id"),
+    column("name"),
+    column("description"),
+    column("column_names"),
+    column("created_at"),
+    column("updated_at"),
+    column("deleted_at"),
+    column("seen_at"),
+)
+_column = table(
+    "column",
+    column("id"),
+    column("asset_id"),
+    column("name"),
+    column("data_type"),
+    column("description"),
+    column("created_at"),
+    column("updated_at"),
+    column("deleted_at"),
+    column("seen_at"),
+)
+
+
+def _batch_size() -> int:
+    try:
+        return max(1, int(os.getenv("INGEST_BATCH_SIZE", "1000")))
+    except ValueError:
+        return 1000
+
+
+def _copy_threshold() -> int:
+    try:
+        return int(os.getenv("INGEST_COPY_THRESHOLD", "50000"))
+    except ValueError:
+        return 50000
+
+
+def _chunks(rows: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for i in range(0, len(rows), size):
+        yield rows[i : i + size]
+
+
+def _insert(conn: Connection):
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert
+
+
+def _revive_set(tbl, stmt) -> dict:
+    # Revive soft-deleted rows; live rows keep their updated_at
+    return {
+        "deleted_at": None,
+        "updated_at": case((tbl.c.deleted_at.is_(None), tbl.c.updated_at), else_=stmt.excluded.updated_at),
+    }
+
+
+def _merge(
+    conn: Connection, tbl, keys: list[str], rows: list[dict], set_fn, size: int, want_ids: bool = True
+) -> dict[tuple, int]:
+    """Upsert rows on `keys` and return {key tuple: id} (empty unless want_ids). Rows must be unique on `keys`."""
+    ids: dict[tuple, int] = {}
+    if not rows:
+        return ids
+    dialect_insert = _insert(conn)
+    key_cols = [tbl.c[k] for k in keys]
+    for chunk in _chunks(rows, size):
+        if conn.dialect.name == "postgresql":
+            stmt = dialect_insert(tbl).values(list(chunk))
+            stmt = stmt.on_conflict_do_update(index_elements=keys, set_=set_fn(stmt))
+            if not want_ids:
+                conn.execute(stmt)
+                continue
+            for row in conn.execute(stmt.returning(tbl.c.id, *key_cols)):
+                ids[tuple(row[1:])] = row[0]
+        else:
+            stmt = dialect_insert(tbl)
+            stmt = stmt.on_conflict_do_update(index_elements=keys, set_=set_fn(stmt))
+            conn.execute(stmt, list(chunk))
+            if not want_ids:
+                continue
+            wanted = [tuple(r[k] for k in keys) for r in chunk]
+            where = key_cols[0].in_([w[0] for w in wanted]) if len(keys) == 1 else tuple_(*key_cols).in_(wanted)
+            for row in conn.execute(select(tbl.c.id, *key_cols).where(where)):
+                ids[tuple(row[1:])] = row[0]
+    return ids
+
+
+def _soft_deleted_assets(conn: Connection, keys: list[tuple[int, str]], size: int) -> list[int]:
+    """Ids of soft-deleted assets among (system_id, name) keys, i.e. those a merge will revive."""
+    out: list[int] = []
+    for chunk in _chunks(keys, size):
+        out.extend(
+            r[0]
+            for r in conn.execute(
+                select(_asset.c.id).where(
+                    tuple_(_asset.c.system_id, _asset.c.name).in_(list(chunk)), _asset.c.deleted_at.is_not(None)
+                )
+            )
+        )
+    return out
+
+
+def _refresh_column_names(conn: Connection, asset_ids: Sequence[int], now: datetime, size: int) -> None:
+    stmt = (
+        update(_asset)
+        .where(_asset.c.id == bindparam("b_id"))
+        .values(column_names=bindparam("b_names"), updated_at=bindparam("b_now"))
+    )
+    for chunk in _chunks(asset_ids, size):
+        names_by_asset: dict[int, list[str]] = {aid: [] for aid in chunk}
+        for aid, cname in conn.execute(
+            select(_column.c.asset_id, _column.c.name).where(_column.c.asset_id.in_(chunk), _column.c.deleted_at.is_(None))
+        ):
+            names_by_asset[aid].append(cname)
+        conn.execute(
+            stmt, [{"b_id": aid, "b_names": ",".join(sorted(names)), "b_now": now} for aid, names in names_by_asset.items()]
+        )
+
+
+def upsert_discovery(conn: Connection, assets: list[dict], columns: list[dict], now: datetime) -> dict[str, int]:
+    """
+    Merge one discovery result (or streamed chunk). Refreshes asset.column_names of every asset
+    that received columns.
+    Returns row counts per kind. The caller commits.
+    """
+    size = _batch_size()
+
+    # 1) Systems
+    sys_names = sorted({r.get("system") for r in (*assets, *columns) if r.get("system")})
+    sys_ids = _merge(
+        conn,
+        _system,
+        ["name"],
+        [{"name": s, "description": None, "created_at": now, "updated_at": now} for s in sys_names],
+        lambda stmt: _revive_set(_system, stmt),
+        size,
+    )
+    sys_name_to_id = {k[0]: v for k, v in sys_ids.items()}
+
+    # 2) Assets, plus placeholders for columns whose asset was not listed on its own.
+    # Streamed columns carry their system; otherwise it comes from the discovered asset of that name.
+    asset_rows: dict[tuple[int, str], dict] = {}
+    asset_to_system_id: dict[str, int] = {}
+    for a in assets:
+        sid = sys_name_to_id.get(a.get("system")) if a.get("system") else None
+        aname = a.get("name")
+        if not sid or not aname:
+            continue
+        asset_to_system_id[aname] = sid
+        asset_rows.setdefault(
+            (sid, aname),
+            {"system_id": sid, "name": aname, "description": a.get("description"), "created_at": now, "updated_at": now, "seen_at": now},
+        )
+
+    def _column_system(c: dict) -> int | None:
+        return sys_name_to_id.get(c["system"]) if c.get("system") else asset_to_system_id.get(c.get("asset"))
+
+    for c in columns:
+        sid = _column_system(c)
+        if sid and c.get("asset") and c.get("name"):
+            asset_rows.setdefault(
+                (sid, c["asset"]),
+                {"system_id": sid, "name": c["asset"], "description": None, "created_at": now, "updated_at": now, "seen_at": now},
+            )
+    revived = _soft_deleted_assets(conn, list(asset_rows), size)
+    asset_ids = _merge(
+        conn,
+        _asset,
+        ["system_id", "name"],
+        list(asset_rows.values()),
+        lambda stmt: {**_revive_set(_asset, stmt), "seen_at": stmt.excluded.seen_at},
+        size,
+    )
+    if revived:
+        restore_assets(conn, revived)
+
+    # 3) Columns; repeated entries merge, later non-null values winning
+    col_rows: dict[tuple[int, str], dict] = {}
+    for c in columns:
+        aname, cname = c.get("asset"), c.get("name")
+        sid = _column_system(c)
+        aid = asset_ids.get((sid, aname)) if sid else None
+        if not aid or not cname:
+            continue
+        row = col_rows.get((aid, cname))
+        if row is None:
+            col_rows[(aid, cname)] = {
+                "asset_id": aid,
+                "name": cname,
+                "data_type": c.get("data_type"),
+                "description": c.get("description"),
+                "created_at": now,
+                "updated_at": now,
+                "seen_at": now,
+            }
+        else:
+            row["data_type"] = c.get("data_type") or row["data_type"]
+            row["description"] = c.get("description") or row["description"]
+
+    def _column_set(stmt) -> dict:
+        return {
+            "deleted_at": None,
+            "data_type": func.coalesce(stmt.excluded.data_type, _column.c.data_type),
+            "description": func.coalesce(stmt.excluded.description, _column.c.description),
+            "updated_at": stmt.excluded.updated_at,
+            "seen_at": stmt.excluded.seen_at,
+        }
+
+    _merge(conn, _column, ["asset_id", "name"], list(col_rows.values()), _column_set, size, want_ids=False)
+
+    # 4) Refresh asset.column_names cache from the live columns of every touched asset, so an
+    # asset whose columns span several streamed chunks ends up with all of them
+    _refresh_column_names(conn, sorted({aid for aid, _ in col_rows}), now, size)
+
+    return {"systems": len(sys_ids), "assets": len(asset_ids), "columns": len(col_rows)}
+
+
+# -- COPY fast path (Postgres + psycopg 3) -------------------------------------------------
+
+# Temp tables are not WAL-logged, so this is the "unlogged staging table" without the DDL of
+# a permanent one; ON COMMIT DROP cleans up with the transaction.
+_STAGE_DDL = (
+    "CREATE TEMP TABLE ingest_stage_asset (system text NOT NULL, name text NOT NULL, description text) ON COMMIT DROP",
+    "CREATE TEMP TABLE ingest_stage_column (seq bigint NOT NULL, system text NOT NULL, asset text NOT NULL,"
+    " name text NOT NULL, data_type text, description text) ON COMMIT DROP",
+)
+
+_MERGE_SQL = (
+    # Systems
+    """
+    INSERT INTO system (name, created_at, updated_at)
+    SELECT x.system, :now, :now
+    FROM (SELECT system FROM ingest_stage_asset UNION SELECT system FROM ingest_stage_column) x
+    ON CONFLICT (name) DO UPDATE SET deleted_at = NULL,
+        updated_at = CASE WHEN system.deleted_at IS NULL THEN system.updated_at ELSE excluded.updated_at END
+    """,
+    # Assets, plus placeholders for columns whose asset was not listed on its own
+    """
+    INSERT INTO asset (system_id, name, description, created_at, updated_at, seen_at)
+    SELECT s.id, x.name, max(x.description), :now, :now, :now
+    FROM (
+        SELECT system, name, description FROM ingest_stage_asset
+        UNION ALL
+        SELECT DISTINCT system, asset, NULL FROM ingest_stage_column
+    ) x
+    JOIN system s ON s.name = x.system
+    GROUP BY s.id, x.name
+    ON CONFLICT (system_id, name) DO UPDATE SET deleted_at = NULL, seen_at = excluded.seen_at,
+        updated_at = CASE WHEN asset.deleted_at IS NULL THEN asset.updated_at ELSE excluded.updated_at END
+    """,
+    # Columns; repeated entries merge, later non-null values winning
+    """
+    INSERT INTO "column" (asset_id, name, data_type, description, created_at, updated_at, seen_at)
+    SELECT a.id, c.name,
+        (array_agg(c.data_type ORDER BY c.seq DESC) FILTER (WHERE c.data_type IS NOT NULL))[1],
+        (array_agg(c.description ORDER BY c.seq DESC) FILTER (WHERE c.description IS NOT NULL))[1],
+        :now, :now, :now
+    FROM ingest_stage_column c
+    JOIN system s ON s.name = c.system
+    JOIN asset a ON a.system_id = s.id AND a.name = c.asset
+    GROUP BY a.id, c.name
+    ON CONFLICT (asset_id, name) DO UPDATE SET deleted_at = NULL,
+        data_type = COALESCE(excluded.data_type, "column".data_type),
+        description = COALESCE(excluded.description, "column".description),
+        updated_at = excluded.updated_at, seen_at = excluded.seen_at
+    """,
+    # asset.column_names cache, from the live columns of every touched asset
+    """
+    UPDATE asset SET column_names = x.names, updated_at = :now
+    FROM (
+        SELECT col.asset_id AS id, string_agg(col.name, ',' ORDER BY col.name) AS names
+        FROM "column" col
+        WHERE col.deleted_at IS NULL AND col.asset_id IN (
+            SELECT a.id
+            FROM ingest_stage_column c
+            JOIN system s ON s.name = c.system
+            JOIN asset a ON a.system_id = s.id AND a.name = c.asset
+        )
+        GROUP BY col.asset_id
+    ) x
+    WHERE asset.id = x.id
+    """,
+)
+
+
+# Soft-deleted assets the merge is about to revive (their lineage re-enters the closure)
+_REVIVED_SQL = """
+    SELECT DISTINCT a.id
+    FROM (
+        SELECT system, name FROM ingest_stage_asset
+        UNION
+        SELECT system, asset FROM ingest_stage_column
+    ) x
+    JOIN system s ON s.name = x.system
+    JOIN asset a ON a.system_id = s.id AND a.name = x.name
+    WHERE a.deleted_at IS NOT NULL
+"""
+
+
+def stage_rows(assets: Iterable[dict], columns: Iterable[dict]) -> tuple[list[tuple], Iterable[tuple]]:
+    """
+    Staging tuples for copy_discovery: (system, name, description) per asset and
+    (seq, system, asset, name, data_type, description) per column, dropping rows
+    upsert_discovery would skip.
+    """
+    asset_rows: list[tuple] = []
+    asset_to_system: dict[str, str] = {}
+    for a in assets:
+        sname, aname = a.get("system"), a.get("name")
+        if not sname or not aname:
+            continue
+        asset_to_system[aname] = sname
+        asset_rows.append((sname, aname, a.get("description")))
+
+    def _columns() -> Iterable[tuple]:
+        for seq, c in enumerate(columns):
+            sname = c.get("system") or asset_to_system.get(c.get("asset"))
+            if sname and c.get("name"):
+                yield (seq, sname, c["asset"], c["name"], c.get("data_type"), c.get("description"))
+
+    return asset_rows, _columns()
+
+
+def copy_discovery(conn: Connection, assets: list[dict], columns: list[dict], now: datetime) -> dict[str, int]:
+    """Postgres-only equivalent of upsert_discovery through COPY-loaded staging tables. The caller commits."""
+    for ddl in _STAGE_DDL:
+        conn.execute(text(ddl))
+    asset_rows, column_rows = stage_rows(assets, columns)
+    raw = conn.connection.driver_connection
+    with raw.cursor() as cur:
+        with cur.copy("COPY ingest_stage_asset (system, name, description) FROM STDIN") as cp:
+            for row in asset_rows:
+                cp.write_row(row)
+        with cur.copy("COPY ingest_stage_column (seq, system, asset, name, data_type, description) FROM STDIN") as cp:
+            for row in column_rows:
+                cp.write_row(row)
+    conn.execute(text("ANALYZE ingest_stage_asset"))
+    conn.execute(text("ANALYZE ingest_stage_column"))
+    revived = [r[0] for r in conn.execute(text(_REVIVED_SQL))]
+    counts = [conn.execute(text(sql), {"now": now}).rowcount for sql in _MERGE_SQL]
+    if revived:
+        restore_assets(conn, revived)
+    return {"systems": counts[0], "assets": counts[1], "columns": counts[2]}
+
+
+def load_discovery(conn: Connection, assets: list[dict], columns: list[dict], now: datetime) -> dict[str, int]:
+    """Pick the COPY path for large results on Postgres/psycopg, batched upserts otherwise."""
+    threshold = _copy_threshold()
+    if (
+        conn.dialect.name == "postgresql"
+        and conn.dialect.driver == "psycopg"
+        and threshold > 0
+        and len(columns) >= threshold
+    ):
+        return copy_discovery(conn, assets, columns, now)
+    return upsert_discovery(conn, assets, columns, now)
+
+
+def tombstone_unseen(
+    conn: Connection, namespaces: Iterable[tuple[str, str]], scan_started: datetime, now: datetime
+) -> dict[str, int]:
+    """
+    Soft-delete assets and columns in the covered (system, name prefix) namespaces that an
+    earlier scan listed (seen_at set) but the scan started at `scan_started` did not. Columns of
+    tombstoned assets go with them, and so do lineage closure paths through those assets.
+    Returns counts; the caller commits.
+    """
+    assets = columns = 0
+    size = _batch_size()
+    for system, prefix in sorted(set(namespaces)):
+        sid = conn.execute(select(_system.c.id).where(_system.c.name == system)).scalar()
+        if sid is None:
+            continue
+        in_ns = [_asset.c.system_id == sid]
+        if prefix:
+            # substr rather than LIKE: "_" is common in identifiers and a LIKE wildcard
+            in_ns.append(func.substr(_asset.c.name, 1, len(prefix)) == prefix)
+        unseen_cols = [
+            _column.c.asset_id.in_(select(_asset.c.id).where(*in_ns)),
+            _column.c.deleted_at.is_(None),
+            _column.c.seen_at < scan_started,
+        ]
+        affected = [r[0] for r in conn.execute(select(_column.c.asset_id).where(*unseen_cols).distinct())]
+        columns += conn.execute(update(_column).where(*unseen_cols).values(deleted_at=now, updated_at=now)).rowcount
+        unseen_assets = [*in_ns, _asset.c.deleted_at.is_(None), _asset.c.seen_at < scan_started]
+        dead = [r[0] for r in conn.execute(select(_asset.c.id).where(*unseen_assets))]
+        if dead:
+            assets += conn.execute(update(_asset).where(*unseen_assets).values(deleted_at=now, updated_at=now)).rowcount
+            # Paths through tombstoned assets leave the lineage closure in the same transaction
+            remove_assets(conn, dead)
+        _refresh_column_names(conn, sorted(affected), now, size)
+    return {"assets": assets, "columns": columns}
@@ -0,0 +1,148 @@
+"""
+Table-level lineage edges from harvested INSERT / CTAS / MERGE statements.
+
+The harvest parse (connectors.sql_parse) already carries `targets` and `sources` per item.
+For each page, run_scan hands the items to `derive_edges`, which works per statement
+fingerprint rather than per execution:
+
+- fingerprints whose `query_parse.lineage_at` is set were fully resolved by an earlier
+  harvest and are skipped, so re-harvesting an overlapping window does no work
+- source/target names are resolved against the asset name index (exact name, then last
+  segment; Snowflake names are retried upper-cased, as unquoted identifiers fold to upper)
+- edges missing from the live table-level edge set are inserted in one batch with a
+  confidence score (90 for exact names on both ends, 20 less per end matched on its last
+  segment only), predicate "harvest" and the statement fingerprint in `query_fingerprint`
+- fingerprints whose every pair resolved get `lineage_at`; the rest are retried next harvest,
+  when the missing assets may have been discovered
+
+The lineage closure is extended on the same connection; the caller commits.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import column, select, table, tuple_, update
+from sqlalchemy.orm import Session
+
+from backend.lineage_closure import add_edges
+from backend.lineage_persist import AssetNameIndex, resolve_pair
+from workers.ingest import _batch_size, _chunks
+
+_edge = table(
+    "lineage_edge",
+    column("id"),
+    column("src_asset_id"),
+    column("src_column"),
+    column("dst_asset_id"),
+    column("dst_column"),
+    column("confidence"),
+    column("predicate"),
+    column("query_fingerprint"),
+    column("created_at"),
+    column("updated_at"),
+    column("deleted_at"),
+)
+_query_parse = table("query_parse", column("fingerprint"), column("lineage_at"))
+
+PREDICATE = "harvest"
+
+
+def _exact(index: AssetNameIndex, name: str, asset_id: int) -> bool:
+    return any(aid == asset_id for aid, _ in index.by_name.get(name, ()))
+
+
+def _resolve(index: AssetNameIndex, source: str, target: str) -> Optional[tuple[int, int, int]]:
+    """(src_id, dst_id, confidence) for one source -> target reference, or None."""
+    for src, dst in ((source, target), (source.upper(), target.upper())):
+        pair = resolve_pair(index, src, dst)
+        if pair is not None:
+            return pair[0], pair[1], 90 - 20 * (not _exact(index, src, pair[0])) - 20 * (not _exact(index, dst, pair[1]))
+    return None
+
+
+def _pending(db: Session, fingerprints: List[str]) -> set[str]:
+    done: set[str] = set()
+    for batch in _chunks(fingerprints, _batch_size()):
+        done.update(
+            fp
+            for (fp,) in db.execute(
+                select(_query_parse.c.fingerprint).where(
+                    _query_parse.c.fingerprint.in_(batch), _query_parse.c.lineage_at.is_not(None)
+                )
+            )
+        )
+    return {fp for fp in fingerprints if fp not in done}
+
+
+def derive_edges(db: Session, items: Iterable[Dict[str, Any]], now: datetime) -> Dict[str, int]:
+    """Insert edges for the lineage-bearing statements among `items`. Returns counts."""
+    statements: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        fp = item.get("fingerprint")
+        if fp and item.get("targets") and item.get("sources") and not item.get("timed_out"):
+            statements.setdefault(fp, item)
+    if not statements:
+        return {"statements": 0, "created": 0, "unresolved": 0}
+    pending = _pending(db, list(statements))
+    if not pending:
+        return {"statements": 0, "created": 0, "unresolved": 0}
+
+    index = AssetNameIndex.current(db)
+    wanted: Dict[tuple[int, int], tuple[int, str]] = {}
+    resolved: List[str] = []
+    unresolved = 0
+    for fp in pending:
+        item = statements[fp]
+        complete = True
+        for target in item["targets"]:
+            for source in item["sources"]:
+                hit = _resolve(index, source, target)
+                if hit is None:
+                    complete = False
+                    continue
+                src, dst, confidence = hit
+                # The same pair from several statements keeps its best-scored fingerprint
+                if (src, dst) not in wanted or confidence > wanted[(src, dst)][0]:
+                    wanted[(src, dst)] = (confidence, fp)
+        if complete:
+            resolved.append(fp)
+        else:
+            unresolved += 1
+
+    conn = db.connection()
+    pairs = sorted(wanted)
+    existing: set[tuple[int, int]] = set()
+    for batch in _chunks(pairs, 500):
+        existing.update(
+            tuple(row)  # type: ignore[misc]
+            for row in conn.execute(
+                select(_edge.c.src_asset_id, _edge.c.dst_asset_id).where(
+                    tuple_(_edge.c.src_asset_id, _edge.c.dst_asset_id).in_(list(batch)),
+                    _edge.c.dst_column.is_(None),
+                    _edge.c.deleted_at.is_(None),
+                )
+            )
+        )
+    new = [p for p in pairs if p not in existing]
+    rows = [
+        {
+            "src_asset_id": src,
+            "src_column": None,
+            "dst_asset_id": dst,
+            "dst_column": None,
+            "confidence": wanted[(src, dst)][0],
+            "predicate": PREDICATE,
+            "query_fingerprint": wanted[(src, dst)][1],
+            "created_at": now,
+            "updated_at": now,
+        }
+        for src, dst in new
+    ]
+    for batch in _chunks(rows, _batch_size()):
+        conn.execute(_edge.insert(), list(batch))
+    if new:
+        add_edges(conn, new)
+    for batch in _chunks(resolved, _batch_size()):
+        conn.execute(update(_query_parse).where(_query_parse.c.fingerprint.in_(list(batch))).values(lineage_at=now))
+    return {"statements": len(pending), "created": len(new), "unresolved": unresolved}
@@ -0,0 +1,50 @@
+"""
+Persistent store behind connectors.sql_parse.HarvestParser: one `query_parse` row per
+normalized statement fingerprint, holding the extracted tables and lineage.
+
+Rows are written with INSERT ... ON CONFLICT DO NOTHING, so concurrent scans that parse the
+same new statement both succeed and the first parse wins.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import JSON, column, select, table
+from sqlalchemy.orm import Session
+
+from workers.ingest import _batch_size, _chunks, _insert
+
+_query_parse = table(
+    "query_parse",
+    column("id"),
+    column("fingerprint"),
+    column("sample_sql"),
+    column("parsed", JSON),
+    column("created_at"),
+    column("updated_at"),
+)
+
+
+class DbParseStore:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load(self, fingerprints: List[str]) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for batch in _chunks(fingerprints, _batch_size()):
+            rows = self.db.execute(
+                select(_query_parse.c.fingerprint, _query_parse.c.parsed).where(_query_parse.c.fingerprint.in_(batch))
+            )
+            out.update({fp: parsed for fp, parsed in rows if parsed is not None})
+        return out
+
+    def save(self, entries: Dict[str, tuple[str, Dict[str, Any]]]) -> None:
+        now = datetime.utcnow()
+        rows = [
+            {"fingerprint": fp, "sample_sql": sql, "parsed": parsed, "created_at": now, "updated_at": now}
+            for fp, (sql, parsed) in entries.items()
+        ]
+        conn = self.db.connection()
+        for batch in _chunks(rows, _batch_size()):
+            conn.execute(_insert(conn)(_query_parse).on_conflict_do_nothing(index_elements=["fingerprint"]), list(batch))
@@ -0,0 +1,118 @@
+"""
+Retention for scan history: artifacts (with their chunks) and finished scan jobs.
+
+Policies are per source, in days, from env:
+
+  SCAN_ARTIFACT_RETENTION_DAYS (default "30"), SCAN_JOB_RETENTION_DAYS (default "90")
+
+Each is either a number of days for every source or a list such as "snowflake=7,s3=14,*=30"
+("*" covers unlisted sources; 0 or a missing "*" keeps them forever). Only finished jobs
+(success/failed) expire, by updated_at; pending and running jobs are never touched.
+
+Rows go in set-based batches of RETENTION_BATCH_SIZE ids (default 5000), each batch deleted
+with one statement per table along the (source, created_at) / (source, updated_at) indexes
+and committed on its own, so purges neither lock the tables for long nor build huge
+transactions. `workers.app.purge_scan_history` runs this on Celery beat.
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import column, delete, select, table
+from sqlalchemy.orm import Session
+
+_artifact = table("scan_artifact", column("id"), column("source"), column("created_at"))
+_chunk = table("scan_artifact_chunk", column("artifact_id"))
+_job = table("scan_job", column("id"), column("source"), column("status"), column("updated_at"))
+
+FINISHED = ("success", "failed")
+
+
+def retention_policy(env: str, default: str) -> Dict[str, int]:
+    """{source: days} from a "days" or "source=days,...,*=days" spec; invalid entries are skipped."""
+    spec = (os.getenv(env) or default).strip()
+    out: Dict[str, int] = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        source, sep, days = part.rpartition("=") if "=" in part else ("*", "", part)
+        try:
+            out[(source.strip() or "*").lower()] = max(0, int(days))
+        except ValueError:
+            continue
+    return out
+
+
+def _batch_size() -> int:
+    try:
+        return max(1, int(os.getenv("RETENTION_BATCH_SIZE", "5000")))
+    except ValueError:
+        return 5000
+
+
+def _cutoffs(db: Session, tbl, policy: Dict[str, int], now: datetime) -> Dict[str, datetime]:
+    # Distinct sources come from the small set of values in the (source, ...) index
+    sources = [s for (s,) in db.execute(select(tbl.c.source).distinct())]
+    out: Dict[str, datetime] = {}
+    for source in sources:
+        days = policy.get((source or "").lower(), policy.get("*", 0))
+        if days > 0:
+            out[source] = now - timedelta(days=days)
+    return out
+
+
+def purge_artifacts(db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+    now = now or datetime.utcnow()
+    size = _batch_size()
+    purged: Dict[str, int] = {}
+    policy = retention_policy("SCAN_ARTIFACT_RETENTION_DAYS", "30")
+    for source, cutoff in _cutoffs(db, _artifact, policy, now).items():
+        while True:
+            ids = [
+                i
+                for (i,) in db.execute(
+                    select(_artifact.c.id)
+                    .where(_artifact.c.source == source, _artifact.c.created_at < cutoff)
+                    .order_by(_artifact.c.created_at)
+                    .limit(size)
+                )
+            ]
+            if not ids:
+                break
+            # Chunks first: SQLite does not enforce the ON DELETE CASCADE
+            db.execute(delete(_chunk).where(_chunk.c.artifact_id.in_(ids)))
+            db.execute(delete(_artifact).where(_artifact.c.id.in_(ids)))
+            db.commit()
+            purged[source] = purged.get(source, 0) + len(ids)
+            if len(ids) < size:
+                break
+    return purged
+
+
+def purge_jobs(db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+    now = now or datetime.utcnow()
+    size = _batch_size()
+    purged: Dict[str, int] = {}
+    policy = retention_policy("SCAN_JOB_RETENTION_DAYS", "90")
+    for source, cutoff in _cutoffs(db, _job, policy, now).items():
+        while True:
+            ids = [
+                i
+                for (i,) in db.execute(
+                    select(_job.c.id)
+                    .where(_job.c.source == source, _job.c.updated_at < cutoff, _job.c.status.in_(FINISHED))
+                    .order_by(_job.c.updated_at)
+                    .limit(size)
+                )
+            ]
+            if not ids:
+                break
+            db.execute(delete(_job).where(_job.c.id.in_(ids)))
+            db.commit()
+            purged[source] = purged.get(source, 0) + len(ids)
+            if len(ids) < size:
+                break
+    return purged